@@ -4,5 +4,9 @@ from . import log
 from . import auth
 from . import company
 from . import finance
+from . import export
+from . import health
+from . import scanner
+from . import events
 
-__all__ = ['inventory', 'user', 'log', 'auth', 'company', 'finance'] 
\ No newline at end of file
+__all__ = ['inventory', 'user', 'log', 'auth', 'company', 'finance', 'export', 'health', 'scanner', 'events'] 
\ No newline at end of file
@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.db.session import get_db
+from app.db.replica import read_db
 from app.core.auth import get_current_active_user
+from app.core.http_cache import http_cache
 from app.models.user import User
 from app.models.inventory import StockOrder
 from app.models.company import Payment
@@ -16,7 +18,7 @@ from app.services.company import CompanyService
 
 router = APIRouter(prefix="/api/v1")
 
-@router.get("/companies/", response_model=CompanyListResponse)
+@router.get("/companies/", response_model=CompanyListResponse, dependencies=[Depends(http_cache("companies"))])
 def list_companies(
     db: Session = Depends(get_db),
     type: Optional[str] = None,
@@ -37,13 +39,13 @@ def list_companies(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/companies/balance", response_model=CompanyBalanceResponse)
+@router.get("/companies/balance", response_model=CompanyBalanceResponse, dependencies=[Depends(http_cache("companies", "ledger"))])
 def get_company_balances(
     skip: int = 0,
     limit: int = 10,
     type: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(read_db("companies", "ledger")),
     current_user = Depends(get_current_active_user)
 ):
     """获取所有公司的应收应付情况"""
@@ -56,7 +58,7 @@ def get_company_balances(
         search=search
     )
 
-@router.get("/companies/total-balance", response_model=dict)
+@router.get("/companies/total-balance", response_model=dict, dependencies=[Depends(http_cache("companies", "ledger"))])
 def get_company_total_balance(
     type: Optional[str] = None,
     db: Session = Depends(get_db),
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+
+from app.core.auth import get_active_user_from_token
+from app.core.responses import dumps
+from app.services.stock_events import stock_event_hub
+
+router = APIRouter(prefix="/api/v1")
+
+# 心跳间隔（秒），防止代理因空闲断开连接
+HEARTBEAT_INTERVAL = 15
+
+
+@router.get("/events/stock")
+async def stock_events(
+    request: Request,
+    token: Optional[str] = Query(None)
+):
+    """以 SSE 推送本店的库存变动 {inventory_id, stock}
+
+    EventSource 无法设置请求头，访问令牌可通过 token 查询参数传递。
+    收到 resync 事件时客户端应重新拉取完整列表。
+    用户在线程池中查询，连接期间不占用数据库会话。
+    """
+    if token is None:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    user = await get_active_user_from_token(token) if token else None
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    store_id = user.store_id
+
+    async def event_stream():
+        queue = stock_event_hub.subscribe(store_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {dumps(event).decode()}\n\n"
+        finally:
+            stock_event_hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+from functools import partial
+
+from app.core.auth import get_current_active_user
+from app.services.export import ExportService, EXPORT_FORMATS
+
+router = APIRouter(prefix="/api/v1")
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"日期格式错误: {value}")
+
+def _export_response(source, format: str, name: str, title: str) -> StreamingResponse:
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{format}"
+    return StreamingResponse(
+        ExportService.stream(source, format, title),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/export/transactions")
+def export_transactions(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    type: Optional[str] = None,
+    current_user = Depends(get_current_active_user)
+):
+    """导出出入库流水"""
+    source = partial(
+        ExportService.transaction_rows,
+        store_id=current_user.store_id,
+        start_date=_parse_date(start_date),
+        end_date=_parse_date(end_date),
+        type=type
+    )
+    return _export_response(source, format, "transactions", "出入库流水")
+
+@router.get("/export/stock-orders")
+def export_stock_orders(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user = Depends(get_current_active_user)
+):
+    """导出出入库单（按明细行）"""
+    source = partial(
+        ExportService.stock_order_rows,
+        store_id=current_user.store_id,
+        start_date=_parse_date(start_date),
+        end_date=_parse_date(end_date),
+        type=type,
+        status=status
+    )
+    return _export_response(source, format, "stock_orders", "出入库单")
+
+@router.get("/export/payments")
+def export_payments(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    type: Optional[str] = None,
+    current_user = Depends(get_current_active_user)
+):
+    """导出收付款记录"""
+    source = partial(
+        ExportService.payment_rows,
+        store_id=current_user.store_id,
+        start_date=_parse_date(start_date),
+        end_date=_parse_date(end_date),
+        type=type
+    )
+    return _export_response(source, format, "payments", "收付款记录")
@@ -3,15 +3,17 @@ from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
 from app.db.session import get_db
+from app.db.replica import read_db
 from app.core.auth import get_current_active_user
+from app.core.http_cache import http_cache
 from app.services.finance import FinanceService
-from app.schemas.finance import OtherTransactionCreate, OtherTransaction, PaginatedOtherTransactionResponse, ProfitStatistics, PaymentRecordOut
+from app.schemas.finance import OtherTransactionCreate, OtherTransaction, PaginatedOtherTransactionResponse, ProfitStatistics, MonthlyProfitStatement, PaymentRecordOut
 from app.schemas.company import CompanyType
 from app.schemas.finance import Page
 
 router = APIRouter(prefix="/api/v1")
 
-@router.get("/finance/transactions", response_model=PaginatedOtherTransactionResponse)
+@router.get("/finance/transactions", response_model=PaginatedOtherTransactionResponse, dependencies=[Depends(http_cache("finance"))])
 def get_transactions(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user),
@@ -20,27 +22,33 @@ def get_transactions(
     type: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    before_id: Optional[int] = Query(None, ge=1, description="上一页最后一条记录的 id，传入时按游标分页"),
 ):
-    """获取收支记录列表"""
+    """获取收支记录列表
+
+    按页码分页时返回总数；传入 before_id 时按游标分页（忽略 page，不返回总数），下一页游标为 next_before_id。
+    """
     skip = (page - 1) * page_size
     start = datetime.fromisoformat(start_date) if start_date else None
     end = datetime.fromisoformat(end_date) if end_date else None
     
-    items, total = FinanceService.get_transactions(
+    items, total, next_before_id = FinanceService.get_transactions(
         db,
         current_user.store_id,
         skip=skip,
         limit=page_size,
         type=type,
         start_date=start,
-        end_date=end
+        end_date=end,
+        before_id=before_id
     )
     
     return {
         "items": items,
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "next_before_id": next_before_id
     }
 
 @router.post("/finance/transactions", response_model=OtherTransaction)
@@ -72,11 +80,11 @@ def delete_transaction(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/finance/profit", response_model=ProfitStatistics)
+@router.get("/finance/profit", response_model=ProfitStatistics, dependencies=[Depends(http_cache("finance", "companies"))])
 def get_profit_statistics(
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(read_db("finance", "companies")),
     current_user = Depends(get_current_active_user)
 ):
     """获取利润统计"""
@@ -90,15 +98,30 @@ def get_profit_statistics(
         end
     )
 
+@router.get("/finance/profit/monthly", response_model=MonthlyProfitStatement, dependencies=[Depends(http_cache("finance", "companies"))])
+def get_monthly_profit_statement(
+    year: int = Query(..., ge=2000, le=2100),
+    db: Session = Depends(read_db("finance", "companies")),
+    current_user = Depends(get_current_active_user)
+):
+    """获取全年按月利润表"""
+    return FinanceService.get_monthly_profit_statement(db, current_user.store_id, year)
+
 @router.get("/finance/payment-records", response_model=Page[PaymentRecordOut])
 async def get_payment_records(
     start_date: str,
     end_date: str,
     company_type: CompanyType,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    before_id: Optional[int] = Query(None, ge=1, description="上一页最后一条记录的 id，传入时按游标分页"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """获取收付款记录"""
+    """获取收付款记录
+
+    按页码分页时返回总数；传入 before_id 时按游标分页（忽略 page，不返回总数），下一页游标为 next_before_id。
+    """
     start = datetime.strptime(start_date, '%Y-%m-%d').date()
     end = datetime.strptime(end_date, '%Y-%m-%d').date()
     
@@ -107,5 +130,8 @@ async def get_payment_records(
         store_id=current_user.store_id,
         start_date=start,
         end_date=end,
-        type=company_type
-    )
\ No newline at end of file
+        type=company_type,
+        skip=(page - 1) * page_size,
+        limit=page_size,
+        before_id=before_id
+    )
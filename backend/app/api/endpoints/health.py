@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+import time
+
+from app.core.health import health_state, check_readiness
+
+router = APIRouter()
+
+# 健康检查不允许缓存
+NO_CACHE = {"Cache-Control": "no-store"}
+
+
+@router.get("/healthz")
+async def liveness(request: Request):
+    """存活检查：进程能处理请求即返回 200，不访问数据库"""
+    return JSONResponse(
+        {
+            "status": "ok",
+            "uptime_s": round(time.time() - health_state.started_at, 1),
+            "boot_ms": getattr(request.app.state, "boot_ms", None),
+        },
+        headers=NO_CACHE
+    )
+
+
+@router.get("/readyz")
+async def readiness():
+    """就绪检查：数据库往返、连接池占用、事件循环延迟和预热状态，任一不满足返回 503"""
+    ready, checks = await check_readiness(health_state)
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=200 if ready else 503,
+        headers=NO_CACHE
+    )
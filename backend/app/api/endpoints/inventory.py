@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from app.db.session import get_db
+from app.db.replica import read_db
 from app.services.inventory import InventoryService
 from app.services.stock_order import StockOrderService
+from app.services.inventory_import import InventoryImportService
+from app.services.low_stock import LowStockService
+from app.services.hot_products import HOT_PRODUCT_WINDOWS
 from app.core.auth import get_current_active_user, get_current_user
+from app.core.http_cache import http_cache
+from app.core.responses import FastJSONResponse
+from app.core.config import settings
 from app.models.user import User
 from app.schemas.inventory import (
-    Inventory, InventoryCreate, InventoryUpdate,
-    Transaction, StockIn, StockOut, InventoryStats,
+    Inventory, InventoryCreate, InventoryUpdate, InventoryImportResult,
+    Transaction, StockIn, StockOut, InventoryStats, DailySalesPoint, HotProduct, StockAlertFeed,
     TransactionResponse, PerformanceStats, ProductAnalysis,
     StockOrderCreate, StockOrder, StockOrderList,
     StockOrderUpdate, StockOrderConfirmation, UpdateStockOrderRequest
@@ -26,8 +33,9 @@ class InventoryResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/inventory/", response_model=InventoryResponse)
+@router.get("/inventory/", response_model=InventoryResponse, dependencies=[Depends(http_cache("inventory"))])
 def list_inventory(
+    response: Response,
     page: int = Query(1, gt=0),
     page_size: int = Query(20, gt=0),
     search: Optional[str] = None,
@@ -36,7 +44,7 @@ def list_inventory(
 ):
     """获取库存列表"""
     skip = (page - 1) * page_size
-    items = InventoryService.get_inventory(
+    items = InventoryService.get_inventory_rows(
         db, 
         store_id=current_user.store_id,
         skip=skip,
@@ -48,7 +56,8 @@ def list_inventory(
         store_id=current_user.store_id,
         search=search
     )
-    return InventoryResponse(items=items, total=total)
+    # 行数据已按 InventoryResponse 结构组装，直接序列化（带上缓存策略设置的响应头）
+    return FastJSONResponse({"items": items, "total": total}, headers=dict(response.headers))
 
 @router.get("/inventory/barcode/{barcode}", response_model=Inventory)
 def get_inventory_by_barcode(
@@ -104,6 +113,28 @@ def create_inventory(
             detail=f"创建商品失败: {str(e)}"
         )
 
+@router.post("/inventory/import", response_model=InventoryImportResult)
+def import_inventory(
+    file: UploadFile = File(...),
+    update_existing: bool = Query(True, description="条形码已存在时是否更新商品资料"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量导入商品资料（CSV / XLSX），返回逐行错误报告
+
+    名称冲突按导入前的商品名称检查：名称已被店内其他条形码的商品使用时该行失败，
+    因此同一文件中互换两个已有商品的名称会被拒绝，需要分两次导入。
+    """
+    content = file.file.read()
+    return InventoryImportService.import_file(
+        db,
+        filename=file.filename or "",
+        content=content,
+        store_id=current_user.store_id,
+        update_existing=update_existing,
+        operator_id=current_user.id
+    )
+
 @router.put("/inventory/{barcode}", response_model=Inventory)
 def update_inventory(
     barcode: str,
@@ -112,7 +143,7 @@ def update_inventory(
     current_user = Depends(get_current_active_user)
 ):
     """更新商品信息"""
-    db_inventory = InventoryService.update_inventory(db, barcode, inventory, current_user.store_id)
+    db_inventory = InventoryService.update_inventory(db, barcode, inventory, current_user.store_id, current_user.id)
     if db_inventory is None:
         raise HTTPException(status_code=404, detail="商品不存在")
     return db_inventory
@@ -145,7 +176,7 @@ def stock_out(
         current_user.id
     )
 
-@router.get("/stats", response_model=InventoryStats)
+@router.get("/stats", response_model=InventoryStats, dependencies=[Depends(http_cache("inventory", "ledger", ttl=settings.HOT_PRODUCTS_TTL))])
 def get_inventory_stats(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -153,8 +184,47 @@ def get_inventory_stats(
     """获取库存统计信息"""
     return InventoryService.get_inventory_stats(db, current_user.store_id)
 
-@router.get("/transactions", response_model=TransactionResponse)
+@router.get("/stats/daily-sales", response_model=List[DailySalesPoint], dependencies=[Depends(http_cache("ledger"))])
+def get_daily_sales(
+    days: int = Query(7, ge=1, le=366),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """获取近N天（7/30/90）每日销售汇总"""
+    return InventoryService.get_daily_sales(db, current_user.store_id, days)
+
+@router.get("/stock-alerts", response_model=StockAlertFeed)
+def get_stock_alerts(
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """获取库存预警事件（按 after_id 增量拉取）
+
+    事件在创建 STOCK_ALERT_FEED_LAG 秒后才会返回，不使用协商缓存：
+    事件变为可见时数据版本不会变化。
+    """
+    return LowStockService.get_alerts(db, current_user.store_id, after_id, limit)
+
+@router.get("/stats/hot-products", response_model=List[HotProduct], dependencies=[Depends(http_cache("inventory", "ledger", ttl=settings.HOT_PRODUCTS_TTL))])
+def get_hot_products(
+    days: int = Query(7),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """获取热销商品排行（支持近1/7/30天）"""
+    if days not in HOT_PRODUCT_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"统计天数只能为 {'/'.join(str(d) for d in HOT_PRODUCT_WINDOWS)}"
+        )
+    return InventoryService.get_hot_products(db, current_user.store_id, days, limit)
+
+@router.get("/transactions", response_model=TransactionResponse, dependencies=[Depends(http_cache("inventory", "ledger", "companies"))])
 def list_transactions(
+    response: Response,
     barcode: Optional[str] = None,
     type: Optional[str] = None,
     company_id: Optional[str] = None,
@@ -166,7 +236,7 @@ def list_transactions(
     current_user = Depends(get_current_active_user)
 ):
     """获取交易记录"""
-    return InventoryService.get_transactions(
+    result = InventoryService.get_transactions(
         db,
         current_user.store_id,
         barcode=barcode,
@@ -177,6 +247,7 @@ def list_transactions(
         skip=skip,
         limit=limit
     )
+    return FastJSONResponse(result, headers=dict(response.headers))
 
 @router.delete("/transactions/{transaction_id}", response_model=Inventory)
 def cancel_transaction(
@@ -206,7 +277,7 @@ def cancel_transaction(
 async def get_performance_stats(
     start_date: str = None,
     end_date: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(read_db("inventory", "ledger")),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取业绩统计"""
@@ -233,7 +304,7 @@ def get_product_analysis(
     barcode: str,
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(read_db("inventory", "ledger")),
     current_user = Depends(get_current_active_user)
 ):
     """获取商品分析数据"""
@@ -256,10 +327,10 @@ def get_product_analysis(
         current_user.store_id
     )
 
-@router.get("/statistics")
+@router.get("/statistics", dependencies=[Depends(http_cache("inventory", "ledger", ttl=settings.HOT_PRODUCTS_TTL))])
 async def get_statistics(
     current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(read_db("inventory", "ledger"))
 ):
     try:
         # 打印调试信息
@@ -329,8 +400,9 @@ def get_stock_out_records(
     return records 
 
 # 获取出入库单列表
-@router.get("/stock-orders", response_model=StockOrderList)
+@router.get("/stock-orders", response_model=StockOrderList, dependencies=[Depends(http_cache("orders", "companies"))])
 def get_stock_orders(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     page: int = Query(1, gt=0),
@@ -344,7 +416,7 @@ def get_stock_orders(
     """获取出入库单列表"""
     # 计算skip
     skip = (page - 1) * limit
-    orders = StockOrderService.get_orders(
+    orders = StockOrderService.get_order_rows(
         db=db,
         store_id=current_user.store_id,
         skip=skip,
@@ -355,7 +427,7 @@ def get_stock_orders(
         start_date=start_date,
         end_date=end_date
     )
-    return orders
+    return FastJSONResponse(orders, headers=dict(response.headers))
 
 # 获取出入库单详情
 @router.get("/stock-orders/{order_id}", response_model=StockOrder)
@@ -479,7 +551,7 @@ def get_inventory_by_id(
     return inventory 
 
 # 添加获取总数的接口
-@router.get("/inventory/count")
+@router.get("/inventory/count", dependencies=[Depends(http_cache("inventory"))])
 def get_inventory_count(
     search: Optional[str] = None,
     db: Session = Depends(get_db),
@@ -1,34 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import tuple_
+from typing import Optional
 from datetime import datetime, timedelta
 from app.db.session import get_db
 from app.models.log import OperationLog
 from app.core.auth import get_current_active_user
-from app.schemas.log import OperationLogResponse
+from app.schemas.log import OperationLogPage
 
 # 添加路由前缀
 router = APIRouter(prefix="/api/v1")
 
-@router.get("/logs", response_model=List[OperationLogResponse])
+@router.get("/logs", response_model=OperationLogPage)
 def get_operation_logs(
     start_date: datetime = None,
     end_date: datetime = None,
     operation_type: str = None,
+    barcode: Optional[str] = None,
+    transaction_id: Optional[int] = None,
+    before_id: Optional[int] = Query(None, ge=1, description="上一页最后一条日志的 id"),
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """获取操作日志（仅店主可用）"""
+    """获取操作日志（仅店主可用）
+
+    按时间倒序分页，下一页的 before_id 为返回的 next_before_id（没有更多时为空）。
+    """
     if not current_user.is_owner:
         raise HTTPException(status_code=403, detail="只有店主可以查看操作日志")
-    
-    query = db.query(OperationLog).filter(OperationLog.store_id == current_user.store_id)
-    
+
+    query = db.query(OperationLog).options(
+        joinedload(OperationLog.operator)
+    ).filter(OperationLog.store_id == current_user.store_id)
+
     if start_date:
         query = query.filter(OperationLog.created_at >= start_date)
     if end_date:
         query = query.filter(OperationLog.created_at <= end_date)
     if operation_type:
         query = query.filter(OperationLog.operation_type == operation_type)
-    
-    return query.order_by(OperationLog.created_at.desc()).all() 
\ No newline at end of file
+
+    # 详情字段过滤使用 JSONB 包含查询，走 GIN 索引
+    details = {}
+    if barcode:
+        details["barcode"] = barcode
+    if transaction_id is not None:
+        details["transaction_id"] = transaction_id
+    if details:
+        query = query.filter(OperationLog.details.contains(details))
+
+    if before_id is not None:
+        cursor = db.query(OperationLog.created_at, OperationLog.id).filter(
+            OperationLog.id == before_id,
+            OperationLog.store_id == current_user.store_id
+        ).first()
+        if not cursor:
+            raise HTTPException(status_code=400, detail="无效的分页参数")
+        query = query.filter(
+            tuple_(OperationLog.created_at, OperationLog.id) < tuple_(cursor.created_at, cursor.id)
+        )
+
+    # 多取一条判断是否还有下一页
+    logs = query.order_by(
+        OperationLog.created_at.desc(),
+        OperationLog.id.desc()
+    ).limit(limit + 1).all()
+
+    next_before_id = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_before_id = logs[-1].id
+    return {"items": logs, "next_before_id": next_before_id}
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+import asyncio
+
+from app.core.auth import get_current_active_user, get_active_user_from_token
+from app.core.config import settings
+from app.core.responses import dumps
+from app.services.scan_events import scan_hub
+from app.utils.scanner import scanner
+
+router = APIRouter(prefix="/api/v1")
+
+# 关闭码：令牌无效（1008）、服务端扫码枪未启用（4000），客户端收到后不再重连
+CLOSE_INVALID_TOKEN = 1008
+CLOSE_SCANNER_DISABLED = 4000
+
+
+@router.get("/scanner/status")
+def get_scanner_status(current_user = Depends(get_current_active_user)):
+    """服务端扫码枪状态和计数"""
+    return {
+        "enabled": settings.SCANNER_ENABLED,
+        "connected": scanner.connected,
+        "subscribers": scan_hub.subscriber_count,
+        **scanner.stats.snapshot()
+    }
+
+
+async def _wait_disconnect(websocket: WebSocket):
+    """读取并丢弃客户端消息，直到连接断开"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/ws/scanner")
+async def scanner_events(websocket: WebSocket, token: str = Query(...)):
+    """推送扫码事件，每条事件附带商品快照，前端无需再按条形码查询
+
+    浏览器无法为 WebSocket 设置请求头，访问令牌通过 token 查询参数传递。
+    握手前关闭会被拒绝为 HTTP 403，浏览器只能看到 1006，因此先接受连接再以关闭码说明原因。
+    """
+    await websocket.accept()
+    if not settings.SCANNER_ENABLED:
+        await websocket.close(code=CLOSE_SCANNER_DISABLED)
+        return
+    user = await get_active_user_from_token(token)
+    if user is None:
+        await websocket.close(code=CLOSE_INVALID_TOKEN)
+        return
+
+    queue = scan_hub.subscribe(user.store_id)
+    disconnected = asyncio.create_task(_wait_disconnect(websocket))
+    try:
+        await websocket.send_text(dumps({
+            "type": "hello",
+            "connected": scanner.connected
+        }).decode())
+        while True:
+            next_event = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                next_event.cancel()
+                break
+            await websocket.send_text(dumps(next_event.result()).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        scan_hub.unsubscribe(queue)
+        disconnected.cancel()
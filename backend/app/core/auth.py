@@ -3,9 +3,10 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.services.user import UserService
 import logging
 
@@ -24,6 +25,28 @@ def create_access_token(data: dict) -> str:
     )
     return encoded_jwt
 
+def get_user_from_token(db: Session, token: str):
+    """校验访问令牌并返回用户，无效时返回 None（用于 WebSocket 等无法使用依赖注入认证的场景）"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    username = payload.get("sub")
+    if username is None:
+        return None
+    return UserService.get_user_by_username(db, username)
+
+async def get_active_user_from_token(token: str):
+    """在线程池中校验令牌，返回有效的启用用户，否则返回 None（供 async 的 WebSocket/SSE 处理函数使用，不阻塞事件循环）"""
+    def load():
+        db = SessionLocal()
+        try:
+            user = get_user_from_token(db, token)
+            return user if user is not None and user.is_active else None
+        finally:
+            db.close()
+    return await run_in_threadpool(load)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db = Depends(get_db)
@@ -24,6 +24,15 @@ class Settings(BaseSettings):
     # 扫码枪配置
     SCANNER_PORT: Optional[str] = "COM1"
     SCANNER_BAUDRATE: int = 9600
+    SCANNER_READ_TIMEOUT: float = 0.5   # 串口阻塞读取超时（秒）
+    SCANNER_QUEUE_SIZE: int = 256       # 读线程与消费者之间的队列长度
+    SCANNER_DEBOUNCE_MS: int = 300      # 同一条码在该时间内重复出现视为连扫抖动
+    SCANNER_RECONNECT_MAX: float = 30   # 重连退避的最长间隔（秒）
+    # 通过 PostgreSQL NOTIFY 接收库存变动并以 SSE 推送（每个工作进程占用一条数据库连接）
+    STOCK_EVENTS_ENABLED: bool = True
+    
+    # 启用服务端扫码枪并通过 WebSocket 推送扫码事件；串口只能被一个进程占用，仅在单工作进程部署中开启
+    SCANNER_ENABLED: bool = False
     
     # 数据库配置
     DB_POOL_SIZE: int = 20
@@ -32,6 +41,48 @@ class Settings(BaseSettings):
     DB_POOL_RECYCLE: int = 1800
     SQL_ECHO: bool = False  # 是否打印SQL语句
     
+    # 只读副本：配置后业绩、商品分析、仪表盘、往来余额和利润报表从副本读取
+    READ_DATABASE_URL: Optional[str] = None
+    READ_REPLICA_MAX_LAG: float = 5.0          # 复制延迟超过该值（秒）时改读主库
+    READ_REPLICA_LAG_CHECK_INTERVAL: float = 1.0  # 复制延迟的测量间隔（秒）
+    
+    # 启动配置
+    # 为 True 时每个进程启动时建表（开发环境）；生产环境由 python -m app.db.migrate 统一执行
+    DB_AUTO_MIGRATE: bool = True
+    PRINT_ROUTES: bool = False  # 启动时打印所有路由
+    
+    # 健康检查配置
+    DB_POOL_WARMUP: int = 2                  # 启动后预先建立的数据库连接数，完成前 /readyz 返回未就绪
+    READINESS_DB_TIMEOUT: float = 1.0        # 数据库往返超时（秒）
+    READINESS_POOL_SATURATION: float = 0.9   # 连接池占用比例达到该值视为饱和
+    READINESS_MAX_LOOP_LAG: float = 0.5      # 事件循环延迟超过该值（秒）视为繁忙
+    
+    # 流水表按月分区
+    TRANSACTION_PARTITIONS_AHEAD: int = 3                   # 预建当前月份之后的分区数
+    TRANSACTION_PARTITION_CHECK_INTERVAL: float = 6 * 3600  # 后台检查预建分区的间隔（秒）
+    
+    # 账期归档：至少保留最近几个月的流水在热表中
+    ARCHIVE_RETAIN_MONTHS: int = 12
+    
+    # 操作日志异步批量写入
+    AUDIT_QUEUE_SIZE: int = 10000      # 进程内待写入日志的队列长度，满时改为同步写入
+    AUDIT_BATCH_SIZE: int = 200        # 攒够该条数立即写入
+    AUDIT_FLUSH_INTERVAL: float = 1.0  # 最长攒批时间（秒）
+    AUDIT_DRAIN_TIMEOUT: float = 10.0  # 关闭时等待队列写完的最长时间（秒）
+    
+    # 预警事件流只返回创建超过该时间（秒）的事件，等待较早开始的事务提交，按提交顺序分页
+    STOCK_ALERT_FEED_LAG: float = 5.0
+
+    # 热销排行缓存时间（秒），过期后由后台线程重新加载
+    HOT_PRODUCTS_TTL: int = 60
+    
+    # 数据版本进程内镜像有效期（秒），0 表示每次读取数据库
+    DATA_VERSION_MIRROR_TTL: float = 0
+    
+    # 响应压缩配置
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # 小于该字节数的响应不压缩
+    COMPRESSION_LEVEL: int = 6
+    
     # 并发和重试配置
     MAX_RETRIES: int = 3
     RETRY_DELAY: float = 0.1
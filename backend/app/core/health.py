@@ -0,0 +1,149 @@
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from collections import deque
+from typing import Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.db.session import engine
+from app.db.replica import replica_router
+from app.services.hot_products import hot_products_leaderboard
+from app.services import data_version
+from app.services.audit import audit_writer
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """周期性休眠并测量实际唤醒延迟，反映事件循环的繁忙程度"""
+
+    def __init__(self, interval: float = 0.5, window: int = 20):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def max_lag(self) -> float:
+        return max(self.samples, default=0.0)
+
+
+class HealthState:
+    """工作进程的健康状态：启动时间、连接池预热和事件循环延迟"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.warm = False
+        self.loop_lag = LoopLagMonitor()
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.loop_lag.start()
+        self._warmup_task = asyncio.create_task(self._warm_up())
+
+    def stop(self):
+        self.loop_lag.stop()
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+
+    async def _warm_up(self):
+        """在后台预先建立连接，不阻塞启动"""
+        try:
+            await run_in_threadpool(_open_connections, settings.DB_POOL_WARMUP)
+            self.warm = True
+        except Exception as e:
+            logger.error(f"数据库连接预热失败: {str(e)}")
+
+
+def _open_connections(count: int):
+    connections = [engine.connect() for _ in range(max(1, count))]
+    try:
+        for conn in connections:
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+def _ping() -> float:
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return (time.perf_counter() - started) * 1000
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 1.0,
+    }
+
+
+async def check_readiness(state: HealthState) -> Tuple[bool, dict]:
+    """返回 (是否就绪, 各项检查详情)"""
+    checks = {}
+
+    pool = pool_status()
+    pool["ok"] = pool["saturation"] < settings.READINESS_POOL_SATURATION
+    checks["pool"] = pool
+
+    # 连接池已饱和时不再取连接，避免健康检查本身排队等待 pool_timeout
+    if pool["ok"]:
+        try:
+            latency = await asyncio.wait_for(run_in_threadpool(_ping), timeout=settings.READINESS_DB_TIMEOUT)
+            checks["database"] = {"ok": True, "latency_ms": round(latency, 2)}
+        except asyncio.TimeoutError:
+            checks["database"] = {"ok": False, "error": f"超过 {settings.READINESS_DB_TIMEOUT}s 未响应"}
+        except Exception as e:
+            checks["database"] = {"ok": False, "error": str(e)}
+    else:
+        checks["database"] = {"ok": False, "error": "连接池已饱和，跳过检查"}
+
+    lag = state.loop_lag.max_lag
+    checks["event_loop"] = {
+        "ok": lag < settings.READINESS_MAX_LOOP_LAG,
+        "max_lag_ms": round(lag * 1000, 1),
+    }
+
+    checks["cache"] = {
+        "ok": state.warm,
+        "pool_warmed": state.warm,
+        "hot_products": hot_products_leaderboard.stats(),
+        "data_versions": data_version.mirror_size(),
+    }
+
+    # 操作日志队列积压情况（写入线程不可用时改为同步写入，不影响就绪）
+    checks["audit"] = {"ok": True, **audit_writer.stats()}
+
+    # 只读副本不可用时报表自动改读主库，不影响就绪
+    checks["replica"] = {"ok": True, **replica_router.stats()}
+
+    return all(check["ok"] for check in checks.values()), checks
+
+
+# 当前工作进程的健康状态
+health_state = HealthState()
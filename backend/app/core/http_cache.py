@@ -0,0 +1,62 @@
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from datetime import date
+import hashlib
+import time
+
+from app.db.session import get_db
+from app.core.auth import get_current_active_user
+from app.services.data_version import DataVersionService, DATA_DOMAINS
+
+
+def get_store_stamp(db: Session, store_id: int, domains) -> str:
+    """获取店铺若干数据域的版本戳"""
+    versions = DataVersionService.get_versions(db, store_id, domains)
+    return ";".join(f"{domain}={versions[domain]}" for domain in domains)
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # 弱比较：忽略 W/ 前缀（压缩等传输编码不影响语义）
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def http_cache(*domains: str, cache_control: str = "private, no-cache", ttl: int = 0):
+    """路由级 HTTP 缓存策略
+
+    根据店铺数据版本戳生成 ETag，命中 If-None-Match 时直接返回 304，不再执行业务查询。
+    响应中含有进程内定时刷新的数据（如热销排行）时传入 ttl，ETag 每个 ttl 周期更换一次。
+    用法: @router.get(..., dependencies=[Depends(http_cache("inventory"))])
+    """
+    unknown = set(domains) - set(DATA_DOMAINS)
+    if unknown:
+        raise ValueError(f"未知的数据域: {', '.join(sorted(unknown))}")
+
+    def dependency(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_db),
+        current_user = Depends(get_current_active_user)
+    ):
+        stamp = get_store_stamp(db, current_user.store_id, domains)
+        # 包含日期，保证“今日/近7天”等按日滚动的数据跨天后失效
+        raw = f"{request.url.path}?{request.url.query}|{current_user.store_id}|{date.today()}|{stamp}"
+        if ttl:
+            raw += f"|{int(time.time() // ttl)}"
+        etag = f'W/"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Authorization",
+        }
+        if _matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+
+    return dependency
@@ -0,0 +1,45 @@
+from fastapi.responses import JSONResponse
+from decimal import Decimal
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+import json
+
+# orjson 为可选依赖，未安装时退回标准库 json
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(obj: Any):
+    """序列化 orjson/json 不支持的类型，与 Pydantic 的 JSON 输出保持一致"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """高性能 JSON 响应
+
+    直接序列化由查询行构造的 dict，跳过 response_model 的逐行校验；
+    用于返回成百上千行的列表接口。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
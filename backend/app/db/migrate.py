@@ -0,0 +1,76 @@
+"""数据库结构迁移
+
+在部署时作为独立步骤执行一次（gunicorn 主进程的 on_starting 钩子中也会调用），
+工作进程启动时不再各自建表。
+
+用法:
+    python -m app.db.migrate
+"""
+from sqlalchemy import text
+import logging
+import time
+
+from app.db.session import engine, Base
+from app.db.partitions import is_partitioned, partition_existing_table, ensure_partitions
+import app.models  # noqa: F401  注册所有模型
+
+logger = logging.getLogger(__name__)
+
+# 迁移使用的 PostgreSQL 咨询锁，多个进程同时迁移时串行执行
+MIGRATION_LOCK_ID = 0x6B75636E
+
+# 已存在的表需要调整的列类型：(表, 列, 旧类型, 新类型)
+COLUMN_TYPE_UPGRADES = [
+    ("operation_logs", "details", "json", "jsonb"),
+]
+
+# 已被替换、需要删除的旧索引
+DROPPED_INDEXES = [
+    "idx_stock_alert_store_id",  # 预警事件流改为按 (store_id, created_at, id) 分页
+]
+
+
+def _upgrade_column_types(conn) -> None:
+    """create_all 不会修改已存在的列，这里按 information_schema 判断后转换"""
+    for table, column, old_type, new_type in COLUMN_TYPE_UPGRADES:
+        current = conn.execute(text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column
+        """), {"table": table, "column": column}).scalar()
+        if current == old_type:
+            logger.info(f"转换列类型 {table}.{column}: {old_type} -> {new_type}")
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {new_type} USING {column}::{new_type}"))
+
+
+def migrate() -> float:
+    """创建缺失的表和索引，返回耗时（毫秒）"""
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        # 事务级锁随提交或回滚释放，迁移失败时不会把锁留在连接池中的连接上
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            # 旧版本的流水表是普通表，先改造为分区表
+            if is_partitioned(conn) is False:
+                partition_existing_table(conn)
+            Base.metadata.create_all(bind=conn)
+            ensure_partitions(conn)
+            _upgrade_column_types(conn)
+            # create_all 不会为已存在的表补建新增的索引
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+            for name in DROPPED_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info(f"数据库迁移完成，用时 {elapsed:.0f} ms")
+    return elapsed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+    engine.dispose()
@@ -0,0 +1,219 @@
+"""流水表按月分区
+
+transactions 按 timestamp 做 RANGE 分区，每月一个分区（transactions_yYYYYmMM），
+另有一个默认分区兜底尚未建好分区的时间段。按时间范围过滤的查询只扫描涉及的月份。
+"""
+from sqlalchemy import text
+from datetime import date
+from typing import Optional
+import logging
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+
+
+def _month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn) -> Optional[bool]:
+    """transactions 是否为分区表，表不存在时返回 None"""
+    relkind = conn.execute(text("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relname = :name
+    """), {"name": PARENT_TABLE}).scalar()
+    if relkind is None:
+        return None
+    return relkind == "p"
+
+
+def _existing_partitions(conn) -> set:
+    return set(conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :parent
+    """), {"parent": PARENT_TABLE}).scalars())
+
+
+def _create_month_partition(conn, month: date, existing: set) -> bool:
+    """创建单月分区；默认分区中已有该月数据时先迁入新分区"""
+    name = partition_name(month)
+    if name in existing:
+        return False
+    start, end = month.isoformat(), _add_months(month, 1).isoformat()
+
+    moved = 0
+    if DEFAULT_PARTITION in existing:
+        moved = conn.execute(text(
+            f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end"
+        ), {"start": start, "end": end}).scalar()
+
+    if moved:
+        # 默认分区中有该月的行时不能直接建分区：先摘下默认分区，建好后把行搬过去
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """), {"start": start, "end": end})
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        logger.info(f"创建分区 {name}，从默认分区迁入 {moved} 行")
+    else:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        logger.info(f"创建分区 {name}")
+    existing.add(name)
+    return True
+
+
+def ensure_partitions(conn, start: Optional[date] = None, months_ahead: Optional[int] = None) -> int:
+    """确保 start 所在月份到当前月份之后 months_ahead 个月的分区都已存在（不提交），返回新建的分区数
+
+    未指定 start 时从默认分区中最早的数据或当前月份开始。
+    """
+    if not is_partitioned(conn):
+        return 0
+    if months_ahead is None:
+        months_ahead = settings.TRANSACTION_PARTITIONS_AHEAD
+
+    existing = _existing_partitions(conn)
+    if DEFAULT_PARTITION not in existing:
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+        existing.add(DEFAULT_PARTITION)
+
+    today = date.today()
+    if start is None:
+        earliest = conn.execute(text(f"SELECT min(timestamp) FROM {DEFAULT_PARTITION}")).scalar()
+        start = min(earliest.date(), today) if earliest else today
+
+    created = 0
+    month = _month_start(start)
+    last = _add_months(_month_start(today), months_ahead)
+    while month <= last:
+        if _create_month_partition(conn, month, existing):
+            created += 1
+        month = _add_months(month, 1)
+    return created
+
+
+def partition_existing_table(conn) -> int:
+    """把普通表 transactions 改造为分区表并迁入原有数据（不提交），返回迁移的行数"""
+    from app.models.inventory import Transaction
+
+    columns = [column.name for column in Transaction.__table__.columns]
+    select_list = ", ".join("coalesce(timestamp, now())" if name == "timestamp" else name for name in columns)
+    legacy = f"{PARENT_TABLE}_unpartitioned"
+
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {legacy}"))
+    # 索引和主键名在模式内唯一，先删掉旧表上的，新表建同名索引；序列保留给新表继续使用
+    for index_name, is_constraint in conn.execute(text("""
+        SELECT i.relname, EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = current_schema() AND t.relname = :legacy
+    """), {"legacy": legacy}).all():
+        if is_constraint:
+            conn.execute(text(f'ALTER TABLE {legacy} DROP CONSTRAINT "{index_name}"'))
+        else:
+            conn.execute(text(f'DROP INDEX "{index_name}"'))
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": legacy}).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+
+    Transaction.__table__.create(bind=conn)
+    if sequence:
+        # 新表的 id 沿用原序列，保证 id 不重复
+        new_sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": PARENT_TABLE}).scalar()
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ALTER COLUMN id SET DEFAULT nextval('{sequence}')"))
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT_TABLE}.id"))
+        conn.execute(text(f"DROP SEQUENCE IF EXISTS {new_sequence}"))
+
+    earliest = conn.execute(text(f"SELECT min(timestamp) FROM {legacy}")).scalar()
+    ensure_partitions(conn, start=earliest.date() if earliest else None)
+
+    moved = conn.execute(text(f"""
+        INSERT INTO {PARENT_TABLE} ({", ".join(columns)})
+        SELECT {select_list} FROM {legacy}
+    """)).rowcount
+    conn.execute(text(f"DROP TABLE {legacy}"))
+    logger.info(f"transactions 已改为按月分区，迁移 {moved} 行")
+    return moved
+
+
+class PartitionMaintainer:
+    """定期预建未来月份的分区
+
+    长时间不重新部署时，迁移时预建的分区会用完；后台线程每隔
+    TRANSACTION_PARTITION_CHECK_INTERVAL 秒检查一次。多个进程同时检查时只有拿到咨询锁的一个执行。
+    """
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def run_once(self) -> int:
+        from app.db.session import engine
+        from app.db.migrate import MIGRATION_LOCK_ID
+
+        # 与迁移共用咨询锁，迁移进行中或其他进程正在维护时跳过本次
+        with engine.connect() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID}).scalar():
+                return 0
+            try:
+                created = ensure_partitions(conn)
+                conn.commit()
+                return created
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                conn.commit()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"分区维护失败: {str(e)}")
+            self._stop.wait(settings.TRANSACTION_PARTITION_CHECK_INTERVAL)
+
+
+# 全局实例（每个工作进程一份）
+partition_maintainer = PartitionMaintainer()
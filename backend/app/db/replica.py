@@ -0,0 +1,150 @@
+"""报表查询的只读副本路由
+
+配置 READ_DATABASE_URL 后，耗时的只读报表通过 read_db 依赖从副本读取，避免与扫码、出入库等
+写操作争用主库。以下情况改读主库：
+- 副本复制延迟超过 READ_REPLICA_MAX_LAG，或无法连接、无法测量延迟；
+- 副本上该店铺相关数据域的版本落后于主库（刚提交的写入尚未同步，保证读到自己的写入）。
+"""
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.core.auth import get_current_active_user
+from app.db import session as db_session
+from app.db.session import get_db
+from app.models.version import DataVersion
+from app.services.data_version import DataVersionService, DATA_DOMAINS
+
+logger = logging.getLogger(__name__)
+
+# 副本已回放完收到的全部 WAL 时视为无延迟，否则取最后回放事务距今的时间；
+# 不处于恢复模式（独立库充当副本）时为 0
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class ReplicaRouter:
+    """决定只读请求使用副本还是主库，复制延迟按间隔测量并在进程内共享"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._lag: Optional[float] = None
+        self._error: Optional[str] = None
+        self.routed = {"replica": 0, "primary": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return db_session.ReadSessionLocal is not None
+
+    def lag(self) -> Optional[float]:
+        """副本复制延迟（秒），每 READ_REPLICA_LAG_CHECK_INTERVAL 秒最多测量一次；不可用时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < settings.READ_REPLICA_LAG_CHECK_INTERVAL:
+                return self._lag
+            # 测量期间其他请求沿用上次的结果
+            self._checked_at = now
+
+        lag, error = None, None
+        try:
+            lag = self._measure_lag()
+        except Exception as e:
+            error = str(e)
+            logger.warning(f"测量副本复制延迟失败: {error}")
+        with self._lock:
+            self._lag, self._error = lag, error
+        return lag
+
+    def _measure_lag(self) -> Optional[float]:
+        with db_session.read_engine.connect() as conn:
+            value = conn.execute(text(LAG_SQL)).scalar()
+        return float(value) if value is not None else None
+
+    def _count(self, target: str):
+        with self._lock:
+            self.routed[target] += 1
+
+    def session_for(self, primary: Session, store_id: int, domains: Iterable[str]) -> Session:
+        """返回可用于只读查询的会话：副本可用且数据足够新时返回新的副本会话，否则返回 primary"""
+        if not self.enabled:
+            return primary
+        lag = self.lag()
+        if lag is None or lag > settings.READ_REPLICA_MAX_LAG:
+            self._count("primary")
+            return primary
+
+        replica = db_session.ReadSessionLocal()
+        try:
+            domains = tuple(domains)
+            if domains:
+                # 直接查询副本，不经过进程内镜像（镜像反映的是主库）
+                rows = replica.query(DataVersion.domain, DataVersion.version).filter(
+                    DataVersion.store_id == store_id,
+                    DataVersion.domain.in_(domains)
+                ).all()
+                replica_versions = {row.domain: row.version for row in rows}
+                primary_versions = DataVersionService.get_versions(primary, store_id, domains)
+                if any(replica_versions.get(domain, 0) < version for domain, version in primary_versions.items()):
+                    replica.close()
+                    self._count("primary")
+                    return primary
+        except Exception as e:
+            logger.warning(f"副本不可用，改读主库: {str(e)}")
+            replica.close()
+            self._count("primary")
+            return primary
+
+        self._count("replica")
+        return replica
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "lag_s": round(self._lag, 3) if self._lag is not None else None,
+                "max_lag_s": settings.READ_REPLICA_MAX_LAG,
+                "error": self._error,
+                "routed": dict(self.routed),
+            }
+
+
+def read_db(*domains: str):
+    """只读报表的数据库会话依赖
+
+    domains 为报表依赖的数据域，副本上这些数据域的版本落后于主库时改读主库。
+    路由只用于不写入的查询，写操作仍使用 get_db。
+    用法: db: Session = Depends(read_db("inventory", "ledger"))
+    """
+    unknown = set(domains) - set(DATA_DOMAINS)
+    if unknown:
+        raise ValueError(f"未知的数据域: {', '.join(sorted(unknown))}")
+
+    def dependency(
+        db: Session = Depends(get_db),
+        current_user = Depends(get_current_active_user)
+    ):
+        session = replica_router.session_for(db, current_user.store_id, domains)
+        if session is db:
+            yield db
+            return
+        try:
+            yield session
+        finally:
+            session.close()
+
+    return dependency
+
+
+# 全局实例（每个工作进程一份）
+replica_router = ReplicaRouter()
@@ -8,19 +8,22 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 创建数据库引擎
-try:
-    engine = create_engine(
-        settings.DATABASE_URL,
+def _create_engine(url: str):
+    return create_engine(
+        url,
         poolclass=QueuePool,
-        pool_size=20,               # 增加连接池大小
-        max_overflow=30,            # 增加最大溢出连接数
-        pool_timeout=30,            # 获取连接超时时间
-        pool_recycle=1800,          # 连接回收时间
+        pool_size=settings.DB_POOL_SIZE,          # 连接池大小
+        max_overflow=settings.DB_MAX_OVERFLOW,    # 最大溢出连接数
+        pool_timeout=settings.DB_POOL_TIMEOUT,    # 获取连接超时时间
+        pool_recycle=settings.DB_POOL_RECYCLE,    # 连接回收时间
         pool_pre_ping=True,         # 自动检测断开的连接
         isolation_level="READ COMMITTED",  # 设置隔离级别
         echo=settings.SQL_ECHO     # 根据配置决定是否打印SQL
     )
+
+# 创建数据库引擎
+try:
+    engine = _create_engine(settings.DATABASE_URL)
     logger.info("Database engine created successfully")
 except Exception as e:
     logger.error(f"Failed to create database engine: {str(e)}")
@@ -34,6 +37,26 @@ SessionLocal = sessionmaker(
     expire_on_commit=False  # 提交后不过期对象
 )
 
+# 只读副本（可选）：报表类查询通过 app.db.replica.read_db 路由到这里，写操作始终使用主库
+read_engine = None
+ReadSessionLocal = None
+if settings.READ_DATABASE_URL:
+    try:
+        read_engine = _create_engine(settings.READ_DATABASE_URL).execution_options(
+            postgresql_readonly=True
+        )
+        logger.info("Read replica engine created successfully")
+    except Exception as e:
+        logger.error(f"Failed to create read replica engine: {str(e)}")
+        raise
+
+    ReadSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=read_engine,
+        expire_on_commit=False
+    )
+
 # 创建基类
 Base = declarative_base()
 
@@ -1,12 +1,24 @@
+import time
+
+# 记录进程开始导入应用的时间，用于统计启动耗时
+_import_started = time.perf_counter()
+
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import inventory, user, log, auth, company, finance
-from app.db.session import engine, Base
+from app.api.endpoints import inventory, user, log, auth, company, finance, export, health, scanner, events
+from app.db.session import engine, read_engine
+from app.core.health import health_state
+from app.services.scan_events import scan_hub
+from app.services.stock_events import stock_event_hub
+from app.services.audit import audit_writer
+from app.services.hot_products import hot_products_leaderboard
+from app.db.partitions import partition_maintainer
+from app.utils.scanner import scanner as barcode_scanner
+import asyncio
 from app.middleware.logging import logging_middleware
+from app.middleware.compression import CompressionMiddleware
 from contextlib import asynccontextmanager
-import signal
-import sys
 import logging
 from app.core.config import settings
 
@@ -14,36 +26,68 @@ from app.core.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def log_routes(app: FastAPI):
+    """打印所有路由（PRINT_ROUTES=true 时启用）"""
+    lines = ["=== Registered Routes ==="]
+    for route in app.routes:
+        if hasattr(route, "methods"):
+            endpoint = getattr(route, "endpoint", None)
+            lines.append(f"{sorted(route.methods)}: {route.path} -> {getattr(endpoint, '__name__', '')}")
+    logger.info("\n".join(lines))
+
 # 添加启动和关闭事件管理器
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时的操作
-    print("\n=== Server Starting ===")
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created")
+    started = time.perf_counter()
+    if settings.DB_AUTO_MIGRATE:
+        # 开发环境自动建表；生产环境在部署时单独执行 python -m app.db.migrate
+        from app.db.migrate import migrate
+        migrate()
+    if settings.PRINT_ROUTES:
+        log_routes(app)
+    
+    # 事件循环延迟监控和连接池预热在后台进行，/readyz 据此判断是否就绪
+    health_state.start()
+    
+    # 操作日志在事务提交后由后台线程批量写入
+    audit_writer.start()
     
-    # 注册信号处理
-    def signal_handler(sig, frame):
-        print("\n=== Graceful Shutdown ===")
-        print("Closing database connections...")
-        try:
-            engine.dispose()
-            print("Database connections closed")
-        except Exception as e:
-            print(f"Error closing database: {e}")
-        print("Server shutdown complete")
-        sys.exit(0)
+    # 定期预建流水表未来月份的分区
+    partition_maintainer.start()
     
-    signal.signal(signal.SIGINT, signal_handler)  # Ctrl+C
-    signal.signal(signal.SIGTERM, signal_handler) # 终止信号
+    # 热销排行过期后在后台重新加载
+    hot_products_leaderboard.start()
+    
+    # 库存变动推送：监听其他工作进程/本进程提交的变动
+    if settings.STOCK_EVENTS_ENABLED:
+        stock_event_hub.start(asyncio.get_running_loop())
+    
+    # 服务端扫码枪：扫码事件经 WebSocket 推送给收银页面
+    if settings.SCANNER_ENABLED:
+        scan_hub.attach(asyncio.get_running_loop())
+        barcode_scanner.start_reading()
+    
+    app.state.boot_ms = round(_import_ms + (time.perf_counter() - started) * 1000, 1)
+    logger.info(f"工作进程就绪，启动用时 {app.state.boot_ms} ms（导入 {_import_ms:.0f} ms）")
     
     yield
     
-    # 关闭时的操作
-    print("\n=== Server Shutting Down ===")
+    # 关闭时的操作（信号由 uvicorn/gunicorn 处理，这里只释放连接）
+    if settings.SCANNER_ENABLED:
+        barcode_scanner.stop_reading()
+        scan_hub.detach()
+    if settings.STOCK_EVENTS_ENABLED:
+        stock_event_hub.stop()
+    # 写完队列中剩余的操作日志后再释放连接
+    audit_writer.stop()
+    partition_maintainer.stop()
+    hot_products_leaderboard.stop()
+    health_state.stop()
     engine.dispose()
-    print("Database connections closed")
+    if read_engine is not None:
+        read_engine.dispose()
+    logger.info("数据库连接已关闭")
 
 # 创建应用实例时添加 lifespan
 app = FastAPI(
@@ -71,6 +115,13 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# 最后添加压缩中间件（最外层，压缩 CORS/日志处理后的最终响应）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    level=settings.COMPRESSION_LEVEL
+)
+
 # 添加一个简单的根路由
 @app.get("/api")
 async def root():
@@ -81,6 +132,24 @@ async def root():
 async def test_route():
     return {"message": "Test route works!"}
 
+# 存活/就绪检查（供负载均衡使用）
+app.include_router(
+    health.router,
+    tags=["health"]
+)
+
+# 扫码枪事件推送
+app.include_router(
+    scanner.router,
+    tags=["scanner"]
+)
+
+# 库存变动推送
+app.include_router(
+    events.router,
+    tags=["events"]
+)
+
 # 用户相关路由
 app.include_router(
     user.router, 
@@ -118,19 +187,14 @@ app.include_router(
     tags=["finance"]
 )
 
-# 打印所有路由
-@app.on_event("startup")
-async def print_routes():
-    print("\n=== Registered Routes ===")
-    for route in app.routes:
-        if hasattr(route, "methods"):
-            methods = route.methods
-            path = route.path
-            print(f"{methods}: {path}")
-            # 添加更多调试信息
-            if hasattr(route, "endpoint"):
-                print(f"  Endpoint: {route.endpoint.__name__}")
-    print("=======================\n")
+# 导出相关路由
+app.include_router(
+    export.router,
+    tags=["export"]
+)
+
+# 应用导入完成（含全部路由注册）
+_import_ms = (time.perf_counter() - _import_started) * 1000
 
 # 添加启动脚本
 if __name__ == "__main__":
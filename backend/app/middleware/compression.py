@@ -0,0 +1,198 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# brotli / zstd 为可选依赖，未安装时只使用 gzip
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# 值得压缩的响应类型
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "text/",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        # wbits=31 输出 gzip 格式
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, level: int):
+        # brotli 质量 0-11，中等质量兼顾速度和压缩率
+        self._compressor = brotli.Compressor(quality=min(level, 5))
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=min(level, 9)).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> list:
+    """按优先级返回当前环境可用的编码"""
+    encoders = []
+    if zstandard is not None:
+        encoders.append(_ZstdEncoder)
+    if brotli is not None:
+        encoders.append(_BrotliEncoder)
+    encoders.append(_GzipEncoder)
+    return encoders
+
+
+def _choose_encoder(accept_encoding: str):
+    """根据 Accept-Encoding 选择编码（忽略 q=0 的编码）"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip())
+    for encoder in available_encodings():
+        if encoder.name in accepted or "*" in accepted:
+            return encoder
+    return None
+
+
+class CompressionMiddleware:
+    """响应压缩中间件
+
+    支持 gzip，安装 brotli / zstandard 后自动启用 br / zstd。
+    小于 minimum_size 的一次性响应不压缩；分块发送的流式响应逐块压缩。
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoder_cls = _choose_encoder(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder_cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self.app, encoder_cls, self.minimum_size, self.level)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoder_cls, minimum_size: int, level: int):
+        self.app = app
+        self.encoder_cls = encoder_cls
+        self.minimum_size = minimum_size
+        self.level = level
+        self.send: Send = None
+        self.start_message: Message = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    def _should_skip(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return True
+        content_type = headers.get("content-type", "")
+        # 事件流需要逐条实时送达，不做压缩缓冲
+        if content_type.startswith("text/event-stream"):
+            return True
+        return not content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _start_compressed(self) -> MutableHeaders:
+        self.encoder = self.encoder_cls(self.level)
+        headers = MutableHeaders(raw=self.start_message.setdefault("headers", []))
+        headers["Content-Encoding"] = self.encoder.name
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+        return headers
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # 先暂存响应头，等拿到第一块数据再决定是否压缩
+            self.start_message = message
+            self.passthrough = self._should_skip(Headers(raw=message.get("headers", [])))
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if self.start_message is not None:
+                await self.send(self.start_message)
+                self.start_message = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.minimum_size:
+                # 小响应直接发送
+                self.passthrough = True
+                await self.send(self.start_message)
+                self.start_message = None
+                await self.send(message)
+                return
+
+            headers = self._start_compressed()
+            if not more_body:
+                data = self.encoder.compress(body) + self.encoder.flush()
+                headers["Content-Length"] = str(len(data))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": data})
+                return
+
+            await self.send(self.start_message)
+
+        # 流式响应逐块压缩
+        data = self.encoder.compress(body)
+        if not more_body:
+            data += self.encoder.flush()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -50,9 +50,11 @@ async def logging_middleware(request: Request, call_next):
         headers = MutableHeaders(response.headers)
         headers["Access-Control-Allow-Origin"] = "http://localhost:5173"
         headers["Access-Control-Allow-Credentials"] = "true"
-        headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
-        headers["Pragma"] = "no-cache"
-        headers["Expires"] = "0"
+        # 路由未设置缓存策略时默认禁止缓存（见 app/core/http_cache.py）
+        if "cache-control" not in headers:
+            headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
+            headers["Pragma"] = "no-cache"
+            headers["Expires"] = "0"
         
         # 6. 包装响应发送函数
         async def wrapped_send(message: Message) -> None:
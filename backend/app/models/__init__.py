@@ -1,9 +1,11 @@
 from .user import User
 from .store import Store
-from .inventory import Inventory, Transaction, StockOrder, StockOrderItem
+from .inventory import Inventory, Transaction, StockOrder, StockOrderItem, DailySales, StockAlert
 from .company import Company, Payment
 from .log import OperationLog
 from .finance import OtherTransaction  # 添加这行
+from .version import DataVersion
+from .archive import ArchivePeriod, InventorySnapshot, CompanySnapshot
 
 # 为了避免循环导入，我们在这里导入所有模型
 __all__ = [
@@ -15,6 +17,12 @@ __all__ = [
     "Payment",
     "StockOrder",
     "StockOrderItem",
+    "DailySales",
+    "StockAlert",
     "OperationLog",
-    "OtherTransaction"
+    "OtherTransaction",
+    "DataVersion",
+    "ArchivePeriod",
+    "InventorySnapshot",
+    "CompanySnapshot"
 ] 
\ No newline at end of file
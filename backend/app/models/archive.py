@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ArchivePeriod(Base):
+    """已归档的账期：closed_before 之前的流水、收付款和操作日志已移入归档表"""
+    __tablename__ = "archive_periods"
+
+    id = Column(Integer, primary_key=True, index=True)
+    closed_before = Column(DateTime(timezone=True), nullable=False, unique=True)
+    transactions = Column(Integer, nullable=False, default=0)    # 本次归档的流水行数
+    payments = Column(Integer, nullable=False, default=0)
+    operation_logs = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class InventorySnapshot(Base):
+    """商品期初快照：截至 as_of 的累计出入库和 FIFO 剩余批次，每个商品只保留最新一行"""
+    __tablename__ = "inventory_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"), nullable=False)
+    barcode = Column(String(13), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    in_quantity = Column(Integer, nullable=False, default=0)
+    in_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    out_quantity = Column(Integer, nullable=False, default=0)
+    out_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    last_in_price = Column(Numeric(10, 2))
+    fifo_layers = Column(JSONB, nullable=False, default=list)  # 尚未售出的进货批次 [[数量, "单价"], ...]
+
+    __table_args__ = (
+        UniqueConstraint('store_id', 'inventory_id', name='uq_inventory_snapshot'),
+    )
+
+class CompanySnapshot(Base):
+    """往来单位期初快照：截至 as_of 的累计应收应付和收付款，每个单位只保留最新一行"""
+    __tablename__ = "company_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    receivable = Column(Numeric(14, 2), nullable=False, default=0)          # 出库金额合计
+    payable = Column(Numeric(14, 2), nullable=False, default=0)             # 入库金额合计
+    initial_receivable = Column(Numeric(14, 2), nullable=False, default=0)  # 期初应收
+    initial_payable = Column(Numeric(14, 2), nullable=False, default=0)     # 期初应付
+    received = Column(Numeric(14, 2), nullable=False, default=0)
+    paid = Column(Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('store_id', 'company_id', name='uq_company_snapshot'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Enum, UniqueConstraint, Boolean
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Enum, UniqueConstraint, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -43,6 +43,11 @@ class Payment(Base):
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        Index('idx_payment_store_created', store_id, created_at, id),  # 按时间范围统计、倒序分页
+        Index('idx_payment_company', company_id),                      # 单位往来明细和余额
+    )
+    
     # 关联关系
     company = relationship("Company", back_populates="payments")
     operator = relationship("User", back_populates="payments")
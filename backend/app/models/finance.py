@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -23,6 +23,10 @@ class OtherTransaction(Base):
     created_at = Column(DateTime, default=datetime.now, nullable=False)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
 
+    __table_args__ = (
+        Index('idx_other_transaction_store_date', store_id, transaction_date, id),  # 按日期范围统计、倒序分页
+    )
+
     # 关联关系
     store = relationship("Store", back_populates="other_transactions")
     operator = relationship("User", back_populates="other_transactions") 
\ No newline at end of file
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, CheckConstraint, Boolean, UniqueConstraint, Index, Enum, Text
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Date, ForeignKey, CheckConstraint, Boolean, UniqueConstraint, Index, Enum, Text
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 import enum
@@ -85,6 +85,8 @@ class Inventory(Base):
         CheckConstraint('warning_stock >= 0', name='check_warning_stock_positive'),
         CheckConstraint('stock >= 0', name='check_stock_positive'),  # 添加库存非负检查
         Index('idx_inventory_store_name', store_id),  # 用于店铺内商品名称搜索
+        # 部分索引只包含低于警戒库存的商品，查询预警列表不扫描整个商品目录
+        Index('idx_inventory_low_stock', store_id, postgresql_where=text('stock <= warning_stock')),
     )
     
     # 关联关系
@@ -92,10 +94,11 @@ class Inventory(Base):
     transactions = relationship("Transaction", back_populates="inventory")
     order_items = relationship("StockOrderItem", back_populates="inventory")
 
+# 按 timestamp 每月一个分区（见 app/db/partitions.py），分区表的主键必须包含分区键
 class Transaction(Base):
     __tablename__ = "transactions"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     inventory_id = Column(Integer, ForeignKey("inventory.id"))
     barcode = Column(String)
     type = Column(String)  # in/out
@@ -105,7 +108,7 @@ class Transaction(Base):
     store_id = Column(Integer, ForeignKey("stores.id"))
     operator_id = Column(Integer, ForeignKey("users.id"))
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
     notes = Column(String(200), nullable=True)  # 添加备注字段
     
     # 关联关系
@@ -119,5 +122,45 @@ class Transaction(Base):
         CheckConstraint('quantity > 0', name='check_quantity_positive'),
         CheckConstraint('price >= 0', name='check_price_positive'),
         CheckConstraint('total = quantity * price', name='check_total_calculation'),
-        Index('idx_trans_store_time', store_id)
+        Index('idx_trans_store_time', store_id, timestamp),
+        {'postgresql_partition_by': 'RANGE (timestamp)'}
+    )
+
+# 销售日汇总表（按 店铺/商品/日期/类型 汇总交易流水，供仪表盘和报表读取）
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    type = Column(String(3), nullable=False)  # in/out
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)  # 销售额（出库）
+    cost = Column(Numeric(14, 2), nullable=False, default=0)  # 进货额（入库）或按最近进价估算的销售成本（出库）
+    
+    __table_args__ = (
+        UniqueConstraint('store_id', 'inventory_id', 'day', 'type', name='uq_daily_sales_key'),
+        CheckConstraint(type.in_(['in', 'out']), name='check_daily_sales_type'),
+        Index('idx_daily_sales_store_day', store_id, day)
+    )
+
+# 库存预警事件（库存跨越警戒线时记录一条：低于警戒库存为 low，恢复为 recovered）
+class StockAlert(Base):
+    __tablename__ = "stock_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"), nullable=False)
+    type = Column(String(10), nullable=False)  # low/recovered
+    stock = Column(Integer, nullable=False)
+    warning_stock = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 新建商品的预警在刷新时才能拿到 inventory_id
+    inventory = relationship("Inventory")
+
+    __table_args__ = (
+        CheckConstraint(type.in_(['low', 'recovered']), name='check_stock_alert_type'),
+        Index('idx_stock_alert_store_created', store_id, created_at, id)
     )
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -9,9 +10,16 @@ class OperationLog(Base):
     id = Column(Integer, primary_key=True, index=True)
     operation_type = Column(String(50), nullable=False)  # 操作类型，如 'cancel_transaction'
     operator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    details = Column(JSON, nullable=False)  # 存储操作详情
+    details = Column(JSONB, nullable=False)  # 存储操作详情
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+
+    __table_args__ = (
+        Index('idx_operation_log_store_created', store_id, created_at, id),  # 按时间倒序分页
+        Index('idx_operation_log_store_type', store_id, operation_type),
+        # details @> '{"barcode": ...}' 包含查询
+        Index('idx_operation_log_details', details, postgresql_using='gin', postgresql_ops={'details': 'jsonb_path_ops'}),
+    )
     
     # 关联
     operator = relationship("User", back_populates="operation_logs")
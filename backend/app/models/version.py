@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class DataVersion(Base):
+    """店铺数据版本号，每个 (店铺, 数据域) 一行，写操作在同一事务内递增"""
+    __tablename__ = "data_versions"
+    
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    domain = Column(String(20), primary_key=True)  # inventory/ledger/orders/companies/finance
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -26,9 +26,10 @@ class OtherTransaction(OtherTransactionBase):
 
 class PaginatedOtherTransactionResponse(BaseModel):
     items: List[OtherTransaction]
-    total: int
+    total: Optional[int] = None           # 按游标分页时不统计总数
     page: int
     page_size: int
+    next_before_id: Optional[int] = None  # 下一页的游标，没有更多时为空
 
 class ProfitStatistics(BaseModel):
     """利润统计"""
@@ -45,6 +46,16 @@ class ProfitStatistics(BaseModel):
     # 利润
     profit: Decimal = 0             # 利润(总收入-总支出) 
 
+class MonthlyProfit(ProfitStatistics):
+    """单月利润"""
+    month: int                      # 月份 1-12
+
+class MonthlyProfitStatement(BaseModel):
+    """全年按月利润表"""
+    year: int
+    months: List[MonthlyProfit]     # 1-12 月，没有发生额的月份为 0
+    total: ProfitStatistics         # 全年合计
+
 class PaymentDetail(BaseModel):
     """付款明细"""
     id: int
@@ -65,7 +76,8 @@ T = TypeVar('T')
 
 class Page(BaseModel, Generic[T]):
     items: List[T]
-    total: int
+    total: Optional[int] = None           # 按游标分页时不统计总数
+    next_before_id: Optional[int] = None  # 下一页的游标，没有更多时为空
 
     class Config:
         from_attributes = True
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, constr, validator, Field
 from decimal import Decimal
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 from enum import Enum
 
 # 商品基础模式
@@ -66,12 +66,28 @@ class Transaction(TransactionBase):
 
 # 库存预警商品
 class LowStockItem(BaseModel):
+    id: int
     barcode: str
     name: str
     stock: int
     warning_stock: int
     unit: Optional[str]
 
+# 库存预警事件（跨越警戒线时记录）
+class StockAlertItem(BaseModel):
+    id: int
+    inventory_id: int
+    barcode: str
+    name: str
+    type: str            # low: 降到警戒线以下  recovered: 恢复到警戒线以上
+    stock: int
+    warning_stock: int
+    created_at: datetime
+
+class StockAlertFeed(BaseModel):
+    items: List[StockAlertItem]
+    next_after_id: Optional[int] = None   # 下次请求传入的 after_id
+
 # 热销商品
 class HotProduct(BaseModel):
     barcode: str
@@ -87,6 +103,29 @@ class InventoryStats(BaseModel):
     low_stock_items: List[LowStockItem]  # 库存预警商品列表
     hot_products: List[HotProduct]  # 近7天热销产品
 
+# 每日销售汇总
+class DailySalesPoint(BaseModel):
+    date: date
+    quantity: int    # 销售数量
+    sales: Decimal   # 销售额
+    cost: Decimal    # 估算成本
+    profit: Decimal  # 毛利
+
+# 商品导入错误行
+class InventoryImportError(BaseModel):
+    row: int                       # 文件中的行号（表头为第 1 行）
+    barcode: Optional[str] = None
+    name: Optional[str] = None
+    error: str
+
+# 商品导入结果
+class InventoryImportResult(BaseModel):
+    total: int      # 数据行数（不含空行，含校验失败的行）
+    created: int    # 新建商品数
+    updated: int    # 更新商品数
+    failed: int     # 失败行数
+    errors: List[InventoryImportError]
+
 # 交易记录响应模型
 class TransactionResponse(BaseModel):
     items: List[Transaction]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 class OperatorResponse(BaseModel):
     id: int
@@ -17,4 +17,8 @@ class OperationLogResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class OperationLogPage(BaseModel):
+    items: List[OperationLogResponse]
+    next_before_id: Optional[int] = None  # 下一页的游标，没有更多时为空
@@ -0,0 +1,419 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, text, select, union_all, Table, Column, MetaData
+from sqlalchemy.dialects.postgresql import insert
+from fastapi import HTTPException
+from collections import deque
+from decimal import Decimal
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from app.core.config import settings
+from app.db.migrate import MIGRATION_LOCK_ID
+from app.db.partitions import PARENT_TABLE, DEFAULT_PARTITION, is_partitioned
+from app.models.archive import ArchivePeriod, InventorySnapshot, CompanySnapshot
+from app.models.inventory import Transaction
+from app.services.data_version import DataVersionService, LEDGER, COMPANIES
+
+logger = logging.getLogger(__name__)
+
+# 归档表，与原表列相同，不带外键
+ARCHIVE_TABLES = {
+    "transactions": "transactions_archive",
+    "payments": "payments_archive",
+    "operation_logs": "operation_logs_archive",
+}
+
+
+# 归档表的查询用表对象（与原表同名列，不参与建表）
+_archive_metadata = MetaData()
+
+
+def archive_table(table: Table) -> Table:
+    """原表对应的归档表对象，只用于查询"""
+    name = ARCHIVE_TABLES[table.name]
+    if name not in _archive_metadata.tables:
+        Table(name, _archive_metadata, *[Column(column.name, column.type) for column in table.columns])
+    return _archive_metadata.tables[name]
+
+
+def fifo_cost(lots: Iterable[Tuple[int, Decimal]], skip_quantity: int, quantity: int) -> Decimal:
+    """按先进先出计算成本
+
+    lots 为按时间排序的进货批次 (数量, 单价)；先跳过此前已售出的 skip_quantity 件，再累计 quantity 件的成本。
+    """
+    cost = Decimal('0')
+    for lot_quantity, price in lots:
+        if quantity <= 0:
+            break
+        if skip_quantity >= lot_quantity:
+            skip_quantity -= lot_quantity
+            continue
+        available = lot_quantity - skip_quantity
+        skip_quantity = 0
+        used = min(available, quantity)
+        cost += used * Decimal(str(price))
+        quantity -= used
+    return cost
+
+
+def _month_floor(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def _shift_months(day: date, count: int) -> date:
+    index = day.year * 12 + day.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class ArchiveService:
+    """账期归档
+
+    按月关账：closed_before 之前的流水、收付款和操作日志移入 *_archive 表，热表只保留未关账的数据。
+    移走之前先把每个商品的累计出入库和 FIFO 剩余批次、每个往来单位的累计应收应付写入期初快照，
+    成本、往来余额和库存核对读取「快照 + 热表」即可得到与归档前相同的结果。
+
+    已归档账期的明细：流水/收付款导出和利润统计通过 with_archive 合并归档表；
+    业绩统计和商品分析的区间不能早于归档截止日期（ensure_not_archived）；
+    页面上的流水、往来明细和收付款记录列表只显示未关账的数据。
+    """
+
+    @staticmethod
+    def closed_before(db: Session) -> Optional[datetime]:
+        """最近一次归档的截止时间，未归档过返回 None"""
+        return db.query(func.max(ArchivePeriod.closed_before)).scalar()
+
+    @staticmethod
+    def with_archive(db: Session, model):
+        """热表与归档表合并后的查询来源（UNION ALL 子查询，列名与原表相同）
+
+        用于需要覆盖已归档账期的导出和汇总；未归档过时直接返回原表。
+        条件会下推到两侧，热表一侧仍可裁剪分区、使用索引。
+        """
+        table = model.__table__
+        if ArchiveService.closed_before(db) is None:
+            return table
+        return union_all(select(table), select(archive_table(table))).subquery(f"{table.name}_all")
+
+    @staticmethod
+    def ensure_not_archived(db: Session, start_date: datetime) -> None:
+        """统计区间从已归档账期开始时报错：这些流水已移出热表，基于热表的统计会漏算"""
+        closed_before = ArchiveService.closed_before(db)
+        if closed_before is not None and start_date.date() < closed_before.date():
+            raise HTTPException(
+                status_code=400,
+                detail=f"{closed_before:%Y-%m-%d} 之前的流水已归档，统计起始日期不能早于该日期"
+            )
+
+    @staticmethod
+    def get_inventory_snapshots(
+        db: Session,
+        store_id: int,
+        barcodes: Optional[Iterable[str]] = None
+    ) -> Dict[str, InventorySnapshot]:
+        """按条形码返回商品期初快照"""
+        query = db.query(InventorySnapshot).filter(InventorySnapshot.store_id == store_id)
+        if barcodes is not None:
+            query = query.filter(InventorySnapshot.barcode.in_(set(barcodes)))
+        return {snapshot.barcode: snapshot for snapshot in query.all()}
+
+    @staticmethod
+    def get_company_snapshots(
+        db: Session,
+        store_id: int,
+        company_ids: Optional[Iterable[int]] = None
+    ) -> Dict[int, CompanySnapshot]:
+        """按往来单位返回期初快照"""
+        query = db.query(CompanySnapshot).filter(CompanySnapshot.store_id == store_id)
+        if company_ids is not None:
+            query = query.filter(CompanySnapshot.company_id.in_(set(company_ids)))
+        return {snapshot.company_id: snapshot for snapshot in query.all()}
+
+    @staticmethod
+    def opening_lots(snapshot: Optional[InventorySnapshot]) -> List[Tuple[int, Decimal]]:
+        """快照中的 FIFO 剩余批次"""
+        if snapshot is None:
+            return []
+        return [(quantity, Decimal(price)) for quantity, price in snapshot.fifo_layers]
+
+    @staticmethod
+    def archive(db: Session, closed_before: date) -> dict:
+        """归档 closed_before（某月 1 日）之前的账期并提交，返回各表归档行数"""
+        if closed_before.day != 1:
+            raise HTTPException(status_code=400, detail="归档截止日期必须是某月 1 日")
+        latest_allowed = _shift_months(_month_floor(date.today()), -settings.ARCHIVE_RETAIN_MONTHS)
+        if closed_before > latest_allowed:
+            raise HTTPException(
+                status_code=400,
+                detail=f"至少保留最近 {settings.ARCHIVE_RETAIN_MONTHS} 个月的数据，截止日期不能晚于 {latest_allowed}"
+            )
+
+        try:
+            # 与迁移、分区维护互斥
+            db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            # 分区边界按数据库时区解释，截止时间同样交给数据库换算
+            cutoff = db.execute(text("SELECT CAST(:day AS timestamptz)"), {"day": closed_before.isoformat()}).scalar()
+            previous = ArchiveService.closed_before(db)
+            if previous is not None and cutoff <= previous:
+                raise HTTPException(status_code=400, detail=f"{closed_before} 之前的数据已归档")
+
+            store_ids = [row[0] for row in db.execute(text("""
+                SELECT store_id FROM transactions WHERE timestamp < :cutoff
+                UNION
+                SELECT store_id FROM payments WHERE created_at < :cutoff
+            """), {"cutoff": cutoff})]
+            for store_id in store_ids:
+                ArchiveService._snapshot_inventory(db, store_id, cutoff)
+                ArchiveService._snapshot_companies(db, store_id, cutoff)
+
+            counts = {
+                "transactions": ArchiveService._archive_transactions(db, cutoff),
+                "payments": ArchiveService._move_rows(db, "payments", "created_at", cutoff),
+                "operation_logs": ArchiveService._move_rows(db, "operation_logs", "created_at", cutoff),
+            }
+            db.add(ArchivePeriod(closed_before=cutoff, **counts))
+            # 流水和收付款移出热表，相关列表的结果会变化；其他收支不归档，利润统计合并归档表，结果不变
+            for store_id in store_ids:
+                DataVersionService.bump(db, store_id, LEDGER, COMPANIES)
+            db.commit()
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"归档失败: {str(e)}")
+
+        logger.info(f"已归档 {closed_before} 之前的账期（{len(store_ids)} 个店铺）: {counts}")
+        return {"closed_before": cutoff, "stores": len(store_ids), **counts}
+
+    @staticmethod
+    def _snapshot_inventory(db: Session, store_id: int, cutoff: datetime) -> None:
+        """在上一期快照基础上累加本期流水，按 FIFO 推进剩余批次"""
+        previous = {
+            snapshot.inventory_id: snapshot
+            for snapshot in db.query(InventorySnapshot).filter(InventorySnapshot.store_id == store_id)
+        }
+        states: Dict[int, dict] = {}
+
+        rows = db.query(
+            Transaction.inventory_id,
+            Transaction.barcode,
+            Transaction.type,
+            Transaction.quantity,
+            Transaction.price,
+            Transaction.total
+        ).filter(
+            Transaction.store_id == store_id,
+            Transaction.timestamp < cutoff,
+            Transaction.inventory_id.isnot(None)
+        ).order_by(
+            Transaction.inventory_id, Transaction.timestamp, Transaction.id
+        ).yield_per(5000)
+
+        for row in rows:
+            state = states.get(row.inventory_id)
+            if state is None:
+                snapshot = previous.get(row.inventory_id)
+                state = states[row.inventory_id] = {
+                    "store_id": store_id,
+                    "inventory_id": row.inventory_id,
+                    "barcode": row.barcode,
+                    "as_of": cutoff,
+                    "in_quantity": snapshot.in_quantity if snapshot else 0,
+                    "in_amount": snapshot.in_amount if snapshot else Decimal('0'),
+                    "out_quantity": snapshot.out_quantity if snapshot else 0,
+                    "out_amount": snapshot.out_amount if snapshot else Decimal('0'),
+                    "last_in_price": snapshot.last_in_price if snapshot else None,
+                    "lots": deque(ArchiveService.opening_lots(snapshot)),
+                }
+
+            if row.type == 'in':
+                state["in_quantity"] += row.quantity
+                state["in_amount"] += row.total
+                state["last_in_price"] = row.price
+                lots = state["lots"]
+                if lots and lots[-1][1] == row.price:
+                    lots[-1] = (lots[-1][0] + row.quantity, row.price)
+                else:
+                    lots.append((row.quantity, row.price))
+            else:
+                state["out_quantity"] += row.quantity
+                state["out_amount"] += row.total
+                remaining = row.quantity
+                lots = state["lots"]
+                while remaining > 0 and lots:
+                    quantity, price = lots[0]
+                    if quantity <= remaining:
+                        remaining -= quantity
+                        lots.popleft()
+                    else:
+                        lots[0] = (quantity - remaining, price)
+                        remaining = 0
+
+        if not states:
+            return
+        values = []
+        for state in states.values():
+            lots = state.pop("lots")
+            state["fifo_layers"] = [[quantity, str(price)] for quantity, price in lots]
+            values.append(state)
+
+        stmt = insert(InventorySnapshot).values(values)
+        db.execute(stmt.on_conflict_do_update(
+            constraint="uq_inventory_snapshot",
+            set_={
+                column: stmt.excluded[column]
+                for column in ("barcode", "as_of", "in_quantity", "in_amount", "out_quantity",
+                               "out_amount", "last_in_price", "fifo_layers")
+            }
+        ))
+
+    @staticmethod
+    def _snapshot_companies(db: Session, store_id: int, cutoff: datetime) -> None:
+        """在上一期快照基础上累加本期往来金额"""
+        params = {"store_id": store_id, "cutoff": cutoff}
+        totals: Dict[int, dict] = {}
+
+        def entry(company_id: int) -> dict:
+            return totals.setdefault(company_id, {
+                "receivable": Decimal('0'), "payable": Decimal('0'),
+                "received": Decimal('0'), "paid": Decimal('0'),
+                "initial_receivable": None, "initial_payable": None,
+            })
+
+        for row in db.execute(text("""
+            SELECT company_id,
+                   coalesce(sum(total) FILTER (WHERE type = 'out'), 0) AS receivable,
+                   coalesce(sum(total) FILTER (WHERE type = 'in'), 0) AS payable
+            FROM transactions
+            WHERE store_id = :store_id AND timestamp < :cutoff AND company_id IS NOT NULL
+            GROUP BY company_id
+        """), params):
+            item = entry(row.company_id)
+            item["receivable"] += row.receivable
+            item["payable"] += row.payable
+
+        for row in db.execute(text("""
+            SELECT company_id,
+                   coalesce(sum(amount) FILTER (WHERE type = 'receive'), 0) AS received,
+                   coalesce(sum(amount) FILTER (WHERE type = 'pay'), 0) AS paid
+            FROM payments
+            WHERE store_id = :store_id AND created_at < :cutoff
+            GROUP BY company_id
+        """), params):
+            item = entry(row.company_id)
+            item["received"] += row.received
+            item["paid"] += row.paid
+
+        # 期初余额以最后一次登记为准
+        for row in db.execute(text("""
+            SELECT DISTINCT ON (company_id, type) company_id, type, amount
+            FROM payments
+            WHERE store_id = :store_id AND created_at < :cutoff AND type IN ('init_recv', 'init_pay')
+            ORDER BY company_id, type, id DESC
+        """), params):
+            key = "initial_receivable" if row.type == 'init_recv' else "initial_payable"
+            entry(row.company_id)[key] = row.amount
+
+        if not totals:
+            return
+        previous = ArchiveService.get_company_snapshots(db, store_id, totals.keys())
+        values = []
+        for company_id, item in totals.items():
+            snapshot = previous.get(company_id)
+            values.append({
+                "store_id": store_id,
+                "company_id": company_id,
+                "as_of": cutoff,
+                "receivable": item["receivable"] + (snapshot.receivable if snapshot else 0),
+                "payable": item["payable"] + (snapshot.payable if snapshot else 0),
+                "received": item["received"] + (snapshot.received if snapshot else 0),
+                "paid": item["paid"] + (snapshot.paid if snapshot else 0),
+                "initial_receivable": item["initial_receivable"] if item["initial_receivable"] is not None
+                else (snapshot.initial_receivable if snapshot else 0),
+                "initial_payable": item["initial_payable"] if item["initial_payable"] is not None
+                else (snapshot.initial_payable if snapshot else 0),
+            })
+
+        stmt = insert(CompanySnapshot).values(values)
+        db.execute(stmt.on_conflict_do_update(
+            constraint="uq_company_snapshot",
+            set_={
+                column: stmt.excluded[column]
+                for column in ("as_of", "receivable", "payable", "received", "paid",
+                               "initial_receivable", "initial_payable")
+            }
+        ))
+
+    @staticmethod
+    def _ensure_archive_table(db: Session, table: str, partitioned: bool = False) -> str:
+        archive = ARCHIVE_TABLES[table]
+        if partitioned:
+            db.execute(text(f"CREATE TABLE IF NOT EXISTS {archive} (LIKE {table}) PARTITION BY RANGE (timestamp)"))
+            db.execute(text(f"CREATE TABLE IF NOT EXISTS {archive}_default PARTITION OF {archive} DEFAULT"))
+        else:
+            db.execute(text(f"CREATE TABLE IF NOT EXISTS {archive} (LIKE {table})"))
+        return archive
+
+    @staticmethod
+    def _move_rows(db: Session, table: str, column: str, cutoff: datetime, source: Optional[str] = None) -> int:
+        """把 cutoff 之前的行移入归档表"""
+        archive = ARCHIVE_TABLES[table]
+        if source is None:
+            ArchiveService._ensure_archive_table(db, table)
+        return db.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {source or table} WHERE {column} < :cutoff RETURNING *
+            )
+            INSERT INTO {archive} SELECT * FROM moved
+        """), {"cutoff": cutoff}).rowcount
+
+    @staticmethod
+    def _archive_transactions(db: Session, cutoff: datetime) -> int:
+        """整月分区直接从流水表摘下挂到归档表（只改元数据），默认分区中的零散行逐行移动"""
+        conn = db.connection()
+        if not is_partitioned(conn):
+            return ArchiveService._move_rows(db, "transactions", "timestamp", cutoff)
+
+        archive = ArchiveService._ensure_archive_table(db, "transactions", partitioned=True)
+        partitions = db.execute(text("""
+            SELECT c.relname,
+                   (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \\(''([^'']+)''\\) TO \\(''([^'']+)''\\)'))
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :parent AND c.relname <> :default
+        """), {"parent": PARENT_TABLE, "default": DEFAULT_PARTITION}).all()
+
+        moved = 0
+        for name, bounds in partitions:
+            if not bounds:
+                continue
+            start, end = bounds
+            upper = db.execute(text("SELECT CAST(:end AS timestamptz)"), {"end": end}).scalar()
+            if upper > cutoff:
+                continue
+            moved += db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+            db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            # 归档后商品、往来单位仍可删除，去掉从流水表继承的外键
+            for (constraint,) in db.execute(text("""
+                SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'
+            """), {"name": name}).all():
+                db.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+            archived_name = name.replace(PARENT_TABLE, archive, 1)
+            db.execute(text(f"ALTER TABLE {name} RENAME TO {archived_name}"))
+            db.execute(text(
+                f"ALTER TABLE {archive} ATTACH PARTITION {archived_name} FOR VALUES FROM ('{start}') TO ('{end}')"
+            ))
+
+        moved += ArchiveService._move_rows(db, "transactions", "timestamp", cutoff, source=DEFAULT_PARTITION)
+        return moved
+
+    @staticmethod
+    def purge_store(db: Session, store_id: int) -> None:
+        """删除店铺的快照和归档数据（不提交）"""
+        db.query(InventorySnapshot).filter(InventorySnapshot.store_id == store_id).delete()
+        db.query(CompanySnapshot).filter(CompanySnapshot.store_id == store_id).delete()
+        for archive in ARCHIVE_TABLES.values():
+            if db.execute(text("SELECT to_regclass(:name)"), {"name": archive}).scalar():
+                db.execute(text(f"DELETE FROM {archive} WHERE store_id = :store_id"), {"store_id": store_id})
@@ -0,0 +1,194 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, insert
+from datetime import datetime, timezone
+from typing import List, Optional
+import logging
+import queue
+import threading
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.log import OperationLog
+
+logger = logging.getLogger(__name__)
+
+# 写入失败时的重试次数
+FLUSH_ATTEMPTS = 3
+
+
+class AuditLogWriter:
+    """操作日志异步批量写入
+
+    业务事务提交后，日志放入进程内有界队列，由后台线程攒批后以多行 INSERT 写入；
+    攒够 AUDIT_BATCH_SIZE 条或等待超过 AUDIT_FLUSH_INTERVAL 秒即写入一次。
+    队列已满或写入线程未运行时在调用线程中同步写入，不丢弃日志。
+    """
+
+    def __init__(self):
+        self._queue: Optional[queue.Queue] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.enqueued = 0        # 进入队列的条数
+        self.written = 0         # 已写入的条数
+        self.batches = 0         # 写入批次数
+        self.overflow = 0        # 队列已满时同步写入的条数
+        self.failed = 0          # 重试后仍写入失败的条数
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._queue = queue.Queue(maxsize=settings.AUDIT_QUEUE_SIZE)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止接收并写完队列中剩余的日志"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=settings.AUDIT_DRAIN_TIMEOUT)
+        if self._thread.is_alive():
+            logger.error(f"操作日志队列未能在 {settings.AUDIT_DRAIN_TIMEOUT}s 内写完，剩余 {self._queue.qsize()} 条")
+        self._thread = None
+
+    def submit(self, entries: List[dict]):
+        """放入写入队列（已提交事务中的日志）"""
+        if not self.running or self._stop.is_set():
+            self._flush(entries)
+            return
+        overflow = []
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                overflow.append(entry)
+        with self._lock:
+            self.enqueued += len(entries) - len(overflow)
+            self.overflow += len(overflow)
+        if overflow:
+            self._flush(overflow)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "depth": self._queue.qsize() if self._queue is not None else 0,
+                "capacity": settings.AUDIT_QUEUE_SIZE,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "overflow": self.overflow,
+                "failed": self.failed,
+                "last_batch_size": self.last_batch_size,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+            }
+
+    def _run(self):
+        batch: List[dict] = []
+        deadline = 0.0
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                if stopping:
+                    entry = self._queue.get_nowait()
+                else:
+                    timeout = max(0.0, deadline - time.monotonic()) if batch else settings.AUDIT_FLUSH_INTERVAL
+                    entry = self._queue.get(timeout=timeout)
+                if not batch:
+                    deadline = time.monotonic() + settings.AUDIT_FLUSH_INTERVAL
+                batch.append(entry)
+            except queue.Empty:
+                pass
+
+            if batch and (
+                len(batch) >= settings.AUDIT_BATCH_SIZE
+                or time.monotonic() >= deadline
+                or (stopping and self._queue.empty())
+            ):
+                self._flush(batch)
+                batch = []
+            if stopping and not batch and self._queue.empty():
+                break
+
+    def _flush(self, entries: List[dict]):
+        if not entries:
+            return
+        started = time.perf_counter()
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            db = SessionLocal()
+            try:
+                db.execute(insert(OperationLog), entries)
+                db.commit()
+                with self._lock:
+                    self.written += len(entries)
+                    self.batches += 1
+                    self.last_batch_size = len(entries)
+                    self.last_flush_ms = (time.perf_counter() - started) * 1000
+                return
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"写入操作日志失败（第 {attempt} 次）: {str(e)}")
+                if attempt < FLUSH_ATTEMPTS:
+                    time.sleep(0.2 * attempt)
+            finally:
+                db.close()
+
+        with self._lock:
+            self.failed += len(entries)
+        # 保留在应用日志中，便于人工补录
+        logger.error(f"操作日志写入失败，丢弃 {len(entries)} 条: {entries}")
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_committed_logs(session: Session) -> None:
+    pending = session.info.pop("audit_logs", None)
+    if pending:
+        audit_writer.submit(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_logs(session: Session) -> None:
+    session.info.pop("audit_logs", None)
+
+
+class AuditService:
+    """操作日志记录"""
+
+    @staticmethod
+    def record(
+        db: Session,
+        store_id: int,
+        operator_id: int,
+        operation_type: str,
+        details: dict,
+        durable: bool = False
+    ) -> None:
+        """记录一条操作日志（不提交）
+
+        默认在事务提交后异步批量写入，事务回滚时丢弃；
+        durable=True 时作为业务事务的一部分写入，与业务数据同时提交，用于不允许丢失的操作。
+        """
+        entry = {
+            "operation_type": operation_type,
+            "operator_id": operator_id,
+            "store_id": store_id,
+            "details": details,
+            "created_at": datetime.now(timezone.utc),
+        }
+        if durable or not audit_writer.running:
+            db.add(OperationLog(**entry))
+        else:
+            db.info.setdefault("audit_logs", []).append(entry)
+
+
+# 全局实例（每个工作进程一份）
+audit_writer = AuditLogWriter()
@@ -11,8 +11,59 @@ from app.models.user import User
 from sqlalchemy import literal
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
+from app.services.data_version import DataVersionService, COMPANIES
+from app.services.archive import ArchiveService
 
 class CompanyService:
+    @staticmethod
+    def _get_balance(db: Session, company_id: int, store_id: int, snapshot=None):
+        """计算往来单位的 (应收, 应付)：已归档账期取期初快照，未归档部分读取热表"""
+        # 计算应收总额（出库金额）
+        receivable = db.query(func.sum(Transaction.total)).filter(
+            Transaction.company_id == company_id,
+            Transaction.type == "out",
+            Transaction.store_id == store_id
+        ).scalar() or Decimal('0')
+        
+        # 计算应付总额（入库金额）
+        payable = db.query(func.sum(Transaction.total)).filter(
+            Transaction.company_id == company_id,
+            Transaction.type == "in",
+            Transaction.store_id == store_id
+        ).scalar() or Decimal('0')
+        
+        # 计算收付款记录
+        payments = db.query(Payment).filter(
+            Payment.company_id == company_id,
+            Payment.store_id == store_id
+        ).all()
+        
+        # 分别计算初始余额和后续收付款
+        initial_receivable = Decimal('0')
+        initial_payable = Decimal('0')
+        received = Decimal('0')
+        paid = Decimal('0')
+        if snapshot is not None:
+            receivable += snapshot.receivable
+            payable += snapshot.payable
+            initial_receivable = snapshot.initial_receivable
+            initial_payable = snapshot.initial_payable
+            received = snapshot.received
+            paid = snapshot.paid
+        
+        for payment in payments:
+            if payment.type == 'init_recv':
+                initial_receivable = payment.amount
+            elif payment.type == 'init_pay':
+                initial_payable = payment.amount
+            elif payment.type == 'receive':
+                received += payment.amount
+            elif payment.type == 'pay':
+                paid += payment.amount
+        
+        # 计算最终应收应付
+        return initial_receivable + receivable - received, initial_payable + payable - paid
+
     @staticmethod
     def get_companies(db: Session, store_id: int, type: Optional[str] = None):
         """获取公司列表，支持按类型过滤"""
@@ -58,6 +109,7 @@ class CompanyService:
         
         try:
             db.add(db_company)
+            DataVersionService.bump(db, store_id, COMPANIES)
             db.commit()
             db.refresh(db_company)
         except IntegrityError:
@@ -91,6 +143,7 @@ class CompanyService:
             )
             db.add(initial_payable)
 
+        DataVersionService.bump(db, store_id, COMPANIES)
         db.commit()
 
         return {
@@ -128,46 +181,11 @@ class CompanyService:
         companies = query.offset(skip).limit(limit).all()
         
         balances = []
+        snapshots = ArchiveService.get_company_snapshots(db, store_id, [company.id for company in companies])
         for company in companies:
-            # 计算应收总额（出库金额）
-            receivable = db.query(func.sum(Transaction.total)).filter(
-                Transaction.company_id == company.id,
-                Transaction.type == "out",
-                Transaction.store_id == store_id
-            ).scalar() or Decimal('0')
-            
-            # 计算应付总额（入库金额）
-            payable = db.query(func.sum(Transaction.total)).filter(
-                Transaction.company_id == company.id,
-                Transaction.type == "in",
-                Transaction.store_id == store_id
-            ).scalar() or Decimal('0')
-            
-            # 计算收付款记录
-            payments = db.query(Payment).filter(
-                Payment.company_id == company.id,
-                Payment.store_id == store_id
-            ).all()
-            
-            # 分别计算初始余额和后续收付款
-            initial_receivable = Decimal('0')
-            initial_payable = Decimal('0')
-            received = Decimal('0')
-            paid = Decimal('0')
-            
-            for payment in payments:
-                if payment.type == 'init_recv':
-                    initial_receivable = payment.amount
-                elif payment.type == 'init_pay':
-                    initial_payable = payment.amount
-                elif payment.type == 'receive':
-                    received += payment.amount
-                elif payment.type == 'pay':
-                    paid += payment.amount
-            
-            # 计算最终应收应付
-            final_receivable = initial_receivable + receivable - received
-            final_payable = initial_payable + payable - paid
+            final_receivable, final_payable = CompanyService._get_balance(
+                db, company.id, store_id, snapshots.get(company.id)
+            )
             
             balances.append({
                 "company": company,
@@ -194,6 +212,7 @@ class CompanyService:
             operator_id=operator_id
         )
         db.add(db_payment)
+        DataVersionService.bump(db, store_id, COMPANIES)
         db.commit()
         db.refresh(db_payment)
         return db_payment
@@ -323,6 +342,7 @@ class CompanyService:
             setattr(db_company, key, value)
         
         try:
+            DataVersionService.bump(db, store_id, COMPANIES)
             db.commit()
             db.refresh(db_company)
             return db_company
@@ -346,47 +366,12 @@ class CompanyService:
         companies = query.all()
         total_receivable = Decimal('0')
         total_payable = Decimal('0')
+        snapshots = ArchiveService.get_company_snapshots(db, store_id)
         
         for company in companies:
-            # 计算应收总额（出库金额）
-            receivable = db.query(func.sum(Transaction.total)).filter(
-                Transaction.company_id == company.id,
-                Transaction.type == "out",
-                Transaction.store_id == store_id
-            ).scalar() or Decimal('0')
-            
-            # 计算应付总额（入库金额）
-            payable = db.query(func.sum(Transaction.total)).filter(
-                Transaction.company_id == company.id,
-                Transaction.type == "in",
-                Transaction.store_id == store_id
-            ).scalar() or Decimal('0')
-            
-            # 计算收付款记录
-            payments = db.query(Payment).filter(
-                Payment.company_id == company.id,
-                Payment.store_id == store_id
-            ).all()
-            
-            # 分别计算初始余额和后续收付款
-            initial_receivable = Decimal('0')
-            initial_payable = Decimal('0')
-            received = Decimal('0')
-            paid = Decimal('0')
-            
-            for payment in payments:
-                if payment.type == 'init_recv':
-                    initial_receivable = payment.amount
-                elif payment.type == 'init_pay':
-                    initial_payable = payment.amount
-                elif payment.type == 'receive':
-                    received += payment.amount
-                elif payment.type == 'pay':
-                    paid += payment.amount
-            
-            # 计算最终应收应付
-            final_receivable = initial_receivable + receivable - received
-            final_payable = initial_payable + payable - paid
+            final_receivable, final_payable = CompanyService._get_balance(
+                db, company.id, store_id, snapshots.get(company.id)
+            )
             
             total_receivable += final_receivable
             total_payable += final_payable
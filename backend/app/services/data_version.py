@@ -0,0 +1,110 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+from typing import Dict, Iterable
+import threading
+import time
+
+from app.core.config import settings
+from app.models.version import DataVersion
+
+# 可版本化的数据域
+INVENTORY = "inventory"      # 商品资料和库存数量
+LEDGER = "ledger"            # 出入库流水
+ORDERS = "orders"            # 出入库单
+COMPANIES = "companies"      # 往来单位及收付款
+FINANCE = "finance"          # 其他收支
+DATA_DOMAINS = (INVENTORY, LEDGER, ORDERS, COMPANIES, FINANCE)
+
+# 进程内镜像: (store_id, domain) -> (version, 写入时间)
+_mirror: Dict[tuple, tuple] = {}
+_mirror_lock = threading.Lock()
+
+
+def _update_mirror(versions: Dict[tuple, int]) -> None:
+    now = time.monotonic()
+    with _mirror_lock:
+        for key, version in versions.items():
+            current = _mirror.get(key)
+            # 版本只增不减，避免并发提交时旧值覆盖新值
+            if current is None or current[0] <= version:
+                _mirror[key] = (version, now)
+
+
+def mirror_size() -> int:
+    """进程内镜像的条目数"""
+    with _mirror_lock:
+        return len(_mirror)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_versions(session: Session) -> None:
+    pending = session.info.pop("data_versions", None)
+    if pending:
+        _update_mirror(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_versions(session: Session) -> None:
+    session.info.pop("data_versions", None)
+
+
+class DataVersionService:
+    """店铺数据版本计数器
+
+    每个写操作在提交前调用 bump，与业务数据在同一事务内递增 (store_id, domain) 的版本号；
+    读取时一次主键查询即可判断数据是否变化。本进程提交的版本会同步到进程内镜像，
+    DATA_VERSION_MIRROR_TTL > 0 时在有效期内直接读取镜像。
+    """
+
+    @staticmethod
+    def bump(db: Session, store_id: int, *domains: str) -> Dict[str, int]:
+        """递增版本号（不提交），返回新版本"""
+        unknown = set(domains) - set(DATA_DOMAINS)
+        if unknown:
+            raise ValueError(f"未知的数据域: {', '.join(sorted(unknown))}")
+        if not domains:
+            return {}
+
+        # 固定加锁顺序，避免多个数据域同时递增时死锁
+        stmt = insert(DataVersion).values([
+            {"store_id": store_id, "domain": domain, "version": 1}
+            for domain in sorted(set(domains))
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DataVersion.store_id, DataVersion.domain],
+            set_={"version": DataVersion.version + 1}
+        ).returning(DataVersion.domain, DataVersion.version)
+        versions = {row.domain: row.version for row in db.execute(stmt)}
+
+        pending = db.info.setdefault("data_versions", {})
+        for domain, version in versions.items():
+            pending[(store_id, domain)] = version
+        return versions
+
+    @staticmethod
+    def get_versions(db: Session, store_id: int, domains: Iterable[str]) -> Dict[str, int]:
+        """获取店铺各数据域的当前版本（从未写入的数据域为 0）"""
+        domains = tuple(domains)
+        ttl = settings.DATA_VERSION_MIRROR_TTL
+        if ttl > 0:
+            now = time.monotonic()
+            with _mirror_lock:
+                cached = {domain: _mirror.get((store_id, domain)) for domain in domains}
+            if all(entry and now - entry[1] < ttl for entry in cached.values()):
+                return {domain: entry[0] for domain, entry in cached.items()}
+
+        rows = db.query(DataVersion.domain, DataVersion.version).filter(
+            DataVersion.store_id == store_id,
+            DataVersion.domain.in_(domains)
+        ).all()
+        versions = {domain: 0 for domain in domains}
+        versions.update({row.domain: row.version for row in rows})
+        _update_mirror({(store_id, domain): version for domain, version in versions.items()})
+        return versions
+
+    @staticmethod
+    def changed_since(db: Session, store_id: int, known: Dict[str, int]) -> bool:
+        """判断店铺数据自 known 记录的版本以来是否有变化"""
+        current = DataVersionService.get_versions(db, store_id, known.keys())
+        return any(current[domain] != version for domain, version in known.items())
@@ -0,0 +1,232 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import csv
+import io
+import os
+import tempfile
+
+from app.db.session import SessionLocal
+from app.models.inventory import Transaction, Inventory, StockOrder, StockOrderItem
+from app.models.company import Company, Payment
+from app.models.user import User
+from app.services.archive import ArchiveService
+
+# 每批从服务端游标取回的行数
+BATCH_SIZE = 1000
+
+# 支持的导出格式
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+RowSource = Callable[[Session], Tuple[List[str], Iterable[tuple]]]
+
+
+def _stream(db: Session, stmt) -> Iterator[tuple]:
+    """使用服务端游标分批读取，内存占用与总行数无关"""
+    result = db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+    for row in result:
+        yield tuple(row)
+
+
+def _cell(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        # Excel 不支持带时区的时间
+        return value.replace(tzinfo=None)
+    return value
+
+
+class ExportService:
+    """出入库流水、出入库单和收付款的流式导出
+
+    流水和收付款同时读取热表和归档表，导出已关账的账期时不会缺行。
+    """
+
+    @staticmethod
+    def transaction_rows(
+        db: Session,
+        store_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        type: Optional[str] = None
+    ) -> Tuple[List[str], Iterable[tuple]]:
+        ledger = ArchiveService.with_archive(db, Transaction).c
+        stmt = select(
+            ledger.id,
+            ledger.timestamp,
+            ledger.type,
+            ledger.barcode,
+            Inventory.name,
+            ledger.quantity,
+            ledger.price,
+            ledger.total,
+            Company.name,
+            User.name,
+            ledger.notes
+        ).join(
+            Inventory, ledger.inventory_id == Inventory.id
+        ).join(
+            User, ledger.operator_id == User.id
+        ).outerjoin(
+            Company, ledger.company_id == Company.id
+        ).where(ledger.store_id == store_id)
+
+        if start_date:
+            stmt = stmt.where(ledger.timestamp >= start_date)
+        if end_date:
+            stmt = stmt.where(ledger.timestamp <= end_date)
+        if type:
+            stmt = stmt.where(ledger.type == type)
+        stmt = stmt.order_by(ledger.timestamp, ledger.id)
+
+        headers = ["编号", "时间", "类型", "条形码", "商品名称", "数量", "单价", "金额", "往来单位", "操作人", "备注"]
+        return headers, _stream(db, stmt)
+
+    @staticmethod
+    def stock_order_rows(
+        db: Session,
+        store_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Tuple[List[str], Iterable[tuple]]:
+        """按明细行导出出入库单，每行带上单据信息"""
+        operator = aliased(User)
+        stmt = select(
+            StockOrder.order_no,
+            StockOrder.created_at,
+            StockOrder.type,
+            StockOrder.status,
+            Company.name,
+            operator.name,
+            StockOrderItem.barcode,
+            Inventory.name,
+            StockOrderItem.quantity,
+            StockOrderItem.price,
+            StockOrderItem.total,
+            StockOrder.total_amount,
+            StockOrder.notes
+        ).join(
+            StockOrderItem, StockOrderItem.order_id == StockOrder.id
+        ).join(
+            Inventory, StockOrderItem.inventory_id == Inventory.id
+        ).outerjoin(
+            Company, StockOrder.company_id == Company.id
+        ).outerjoin(
+            operator, StockOrder.operator_id == operator.id
+        ).where(StockOrder.store_id == store_id)
+
+        if start_date:
+            stmt = stmt.where(StockOrder.created_at >= start_date)
+        if end_date:
+            stmt = stmt.where(StockOrder.created_at <= end_date)
+        if type:
+            stmt = stmt.where(StockOrder.type == type)
+        if status:
+            stmt = stmt.where(StockOrder.status == status)
+        stmt = stmt.order_by(StockOrder.created_at, StockOrder.id, StockOrderItem.id)
+
+        headers = ["单据编号", "创建时间", "类型", "状态", "往来单位", "操作人",
+                   "条形码", "商品名称", "数量", "单价", "金额", "单据总金额", "单据备注"]
+        return headers, _stream(db, stmt)
+
+    @staticmethod
+    def payment_rows(
+        db: Session,
+        store_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        type: Optional[str] = None
+    ) -> Tuple[List[str], Iterable[tuple]]:
+        payments = ArchiveService.with_archive(db, Payment).c
+        stmt = select(
+            payments.id,
+            payments.created_at,
+            payments.type,
+            Company.name,
+            payments.amount,
+            User.name,
+            payments.notes
+        ).join(
+            Company, payments.company_id == Company.id
+        ).join(
+            User, payments.operator_id == User.id
+        ).where(payments.store_id == store_id)
+
+        if start_date:
+            stmt = stmt.where(payments.created_at >= start_date)
+        if end_date:
+            stmt = stmt.where(payments.created_at <= end_date)
+        if type:
+            stmt = stmt.where(payments.type == type)
+        stmt = stmt.order_by(payments.created_at, payments.id)
+
+        headers = ["编号", "时间", "类型", "往来单位", "金额", "操作人", "备注"]
+        return headers, _stream(db, stmt)
+
+    @staticmethod
+    def iter_csv(headers: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+        """逐批生成 CSV（带 BOM，Excel 可直接打开中文）"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write("\ufeff")
+        writer.writerow(headers)
+
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count % BATCH_SIZE == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def iter_xlsx(title: str, headers: List[str], rows: Iterable[tuple], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """以只写模式生成 XLSX，写入临时文件后分块读出"""
+        # openpyxl 导入较慢，只在导出 XLSX 时加载
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title)
+        sheet.append(headers)
+        for row in rows:
+            sheet.append([_cell(value) for value in row])
+
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            workbook.save(path)
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def stream(source: RowSource, format: str, title: str) -> Iterator[bytes]:
+        """在独立会话中执行导出
+
+        流式响应在路由返回后才开始发送，此时请求级的数据库会话已关闭，因此这里自行创建会话。
+        """
+        db = SessionLocal()
+        try:
+            headers, rows = source(db)
+            if format == "xlsx":
+                yield from ExportService.iter_xlsx(title, headers, rows)
+            else:
+                yield from ExportService.iter_csv(headers, rows)
+        finally:
+            db.close()
@@ -1,17 +1,21 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, text, desc
+from sqlalchemy import func, text, desc, select, case, literal, union_all, and_, tuple_, Numeric
 from typing import Optional, Tuple, List
 from datetime import date
 from decimal import Decimal
 from fastapi import HTTPException
-from app.models.finance import OtherTransaction
+from app.models.finance import OtherTransaction, TransactionType
 from app.models.user import User
 from app.models.company import Payment, Company
 from app.schemas.company import CompanyType
 from app.schemas.finance import (
     OtherTransactionCreate, 
     ProfitStatistics,
+    MonthlyProfit,
+    MonthlyProfitStatement,
 )
+from app.services.data_version import DataVersionService, FINANCE
+from app.services.archive import ArchiveService
 
 class FinanceService:
     @staticmethod
@@ -23,8 +27,13 @@ class FinanceService:
         type: Optional[str] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
-    ) -> Tuple[List[OtherTransaction], int]:
-        """获取收支记录列表"""
+        before_id: Optional[int] = None,
+    ) -> Tuple[List[OtherTransaction], Optional[int], Optional[int]]:
+        """获取收支记录列表，返回 (记录, 总数, 下一页游标)
+
+        传入 before_id（上一页最后一条记录的 id）时按 (transaction_date, id) 游标分页，
+        不再 count 和 offset，总数返回 None。
+        """
         query = db.query(OtherTransaction).options(
             joinedload(OtherTransaction.operator)
         ).filter(OtherTransaction.store_id == store_id)
@@ -38,16 +47,39 @@ class FinanceService:
         if end_date:
             query = query.filter(OtherTransaction.transaction_date <= end_date)
             
-        total = query.count()
-        items = query.order_by(OtherTransaction.transaction_date.desc())\
-            .offset(skip).limit(limit).all()
+        if before_id is not None:
+            cursor = db.query(OtherTransaction.transaction_date, OtherTransaction.id).filter(
+                OtherTransaction.id == before_id,
+                OtherTransaction.store_id == store_id
+            ).first()
+            if not cursor:
+                raise HTTPException(status_code=400, detail="无效的分页参数")
+            query = query.filter(
+                tuple_(OtherTransaction.transaction_date, OtherTransaction.id) < tuple_(cursor.transaction_date, cursor.id)
+            )
+            total = None
+        else:
+            total = query.count()
+
+        query = query.order_by(
+            OtherTransaction.transaction_date.desc(),
+            OtherTransaction.id.desc()
+        )
+        if before_id is None:
+            query = query.offset(skip)
+        # 多取一条判断是否还有下一页
+        items = query.limit(limit + 1).all()
+        next_before_id = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_before_id = items[-1].id
             
         # 手动设置 operator_name
         for item in items:
             if item.operator:
                 item.operator_name = item.operator.name
             
-        return items, total
+        return items, total, next_before_id
 
     @staticmethod
     def create_transaction(
@@ -67,6 +99,7 @@ class FinanceService:
         )
         
         db.add(db_transaction)
+        DataVersionService.bump(db, store_id, FINANCE)
         db.commit()
         db.refresh(db_transaction)
         return db_transaction
@@ -88,54 +121,59 @@ class FinanceService:
         
         try:
             db.delete(transaction)
+            DataVersionService.bump(db, store_id, FINANCE)
             db.commit()
         except Exception as e:
             db.rollback()
             raise HTTPException(status_code=400, detail=str(e))
 
     @staticmethod
-    def get_profit_statistics(
-        db: Session,
-        store_id: int,
-        start_date: date,
-        end_date: date
-    ) -> ProfitStatistics:
-        """获取利润统计"""
-        # 1. 统计已收货款
-        received_payments = db.query(func.sum(Payment.amount))\
-            .join(Company)\
-            .filter(
-                Payment.store_id == store_id,
-                Payment.type == 'receive',
-                Payment.created_at.between(start_date, end_date)
-            ).scalar() or Decimal('0')
+    def _profit_sums(db: Session, store_id: int, start_date: date, end_date: date, monthly: bool = False) -> list:
+        """一次往返统计收付款和其他收支
 
-        # 2. 统计其他收入
-        other_income = db.query(func.sum(OtherTransaction.amount))\
-            .filter(
-                OtherTransaction.store_id == store_id,
-                OtherTransaction.type == 'income',
-                OtherTransaction.transaction_date.between(start_date, end_date)
-            ).scalar() or Decimal('0')
-
-        # 3. 统计已付货款
-        paid_payments = db.query(func.sum(Payment.amount))\
-            .join(Company)\
-            .filter(
-                Payment.store_id == store_id,
-                Payment.type == 'pay',
-                Payment.created_at.between(start_date, end_date)
-            ).scalar() or Decimal('0')
+        两张表各用一条条件聚合，UNION ALL 合并。收付款同时读取归档表，已关账的账期也能统计。
+        默认统计 [start_date, end_date] 闭区间；monthly 为 True 时统计 [start_date, end_date)
+        并按月分组，每行带 month 列。
+        """
+        payment = ArchiveService.with_archive(db, Payment).c
+        if monthly:
+            payment_range = and_(payment.created_at >= start_date, payment.created_at < end_date)
+            other_range = and_(OtherTransaction.transaction_date >= start_date, OtherTransaction.transaction_date < end_date)
+        else:
+            payment_range = payment.created_at.between(start_date, end_date)
+            other_range = OtherTransaction.transaction_date.between(start_date, end_date)
 
-        # 4. 统计其他支出
-        other_expense = db.query(func.sum(OtherTransaction.amount))\
-            .filter(
-                OtherTransaction.store_id == store_id,
-                OtherTransaction.type == 'expense',
-                OtherTransaction.transaction_date.between(start_date, end_date)
-            ).scalar() or Decimal('0')
+        zero = literal(0, Numeric)
+        payment_columns = [
+            func.sum(case((payment.type == 'receive', payment.amount), else_=0)).label('received_payments'),
+            func.sum(case((payment.type == 'pay', payment.amount), else_=0)).label('paid_payments'),
+            zero.label('other_income'),
+            zero.label('other_expense'),
+        ]
+        other_columns = [
+            zero.label('received_payments'),
+            zero.label('paid_payments'),
+            func.sum(case((OtherTransaction.type == TransactionType.INCOME, OtherTransaction.amount), else_=0)).label('other_income'),
+            func.sum(case((OtherTransaction.type == TransactionType.EXPENSE, OtherTransaction.amount), else_=0)).label('other_expense'),
+        ]
+        payments = select(*payment_columns).where(payment.store_id == store_id, payment_range)
+        others = select(*other_columns).where(OtherTransaction.store_id == store_id, other_range)
+        if monthly:
+            payment_month = func.extract('month', payment.created_at)
+            other_month = func.extract('month', OtherTransaction.transaction_date)
+            payments = payments.add_columns(payment_month.label('month')).group_by(payment_month)
+            others = others.add_columns(other_month.label('month')).group_by(other_month)
+        return db.execute(union_all(payments, others)).all()
 
-        # 5. 计算总收入、总支出和利润
+    @staticmethod
+    def _build_profit(rows) -> ProfitStatistics:
+        """汇总 _profit_sums 的结果行"""
+        received_payments = sum((row.received_payments or Decimal('0') for row in rows), Decimal('0'))
+        other_income = sum((row.other_income or Decimal('0') for row in rows), Decimal('0'))
+        paid_payments = sum((row.paid_payments or Decimal('0') for row in rows), Decimal('0'))
+        other_expense = sum((row.other_expense or Decimal('0') for row in rows), Decimal('0'))
+
+        # 计算总收入、总支出和利润
         total_income = received_payments + other_income
         total_expense = paid_payments + other_expense
         profit = total_income - total_expense
@@ -150,6 +188,32 @@ class FinanceService:
             profit=profit
         )
 
+    @staticmethod
+    def get_profit_statistics(
+        db: Session,
+        store_id: int,
+        start_date: date,
+        end_date: date
+    ) -> ProfitStatistics:
+        """获取利润统计：已收货款 + 其他收入 - 已付货款 - 其他支出"""
+        rows = FinanceService._profit_sums(db, store_id, start_date, end_date)
+        return FinanceService._build_profit(rows)
+
+    @staticmethod
+    def get_monthly_profit_statement(db: Session, store_id: int, year: int) -> MonthlyProfitStatement:
+        """获取全年按月的利润表，一次查询返回 12 个月"""
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+        rows = FinanceService._profit_sums(db, store_id, start, end, monthly=True)
+
+        by_month = {month: [] for month in range(1, 13)}
+        for row in rows:
+            by_month[int(row.month)].append(row)
+        months = [
+            MonthlyProfit(month=month, **FinanceService._build_profit(month_rows).model_dump())
+            for month, month_rows in by_month.items()
+        ]
+        return MonthlyProfitStatement(year=year, months=months, total=FinanceService._build_profit(rows))
+
     @staticmethod
     def get_payment_records(
         db: Session, 
@@ -158,11 +222,16 @@ class FinanceService:
         end_date: date,
         type: Optional[CompanyType] = None,
         skip: int = 0,
-        limit: int = 10 
+        limit: int = 10,
+        before_id: Optional[int] = None
     ):
-        """获取收付款记录列表"""
+        """获取收付款记录列表
+
+        传入 before_id（上一页最后一条记录的 id）时按 (created_at, id) 游标分页，不再 count 和 offset。
+        """
         payments = (
             db.query(
+                Payment.id,
                 func.date(Payment.created_at).label('payment_date'),
                 Company.name.label("company_name"),
                 Payment.amount,
@@ -176,11 +245,31 @@ class FinanceService:
                 Payment.created_at.between(start_date, end_date),
                 Company.type == type
             )
-            .order_by(Payment.created_at.desc())
         )
 
-        total = payments.count()
-        records = payments.offset(skip).limit(limit).all()
+        if before_id is not None:
+            cursor = db.query(Payment.created_at, Payment.id).filter(
+                Payment.id == before_id,
+                Payment.store_id == store_id
+            ).first()
+            if not cursor:
+                raise HTTPException(status_code=400, detail="无效的分页参数")
+            payments = payments.filter(
+                tuple_(Payment.created_at, Payment.id) < tuple_(cursor.created_at, cursor.id)
+            )
+            total = None
+        else:
+            total = payments.count()
+
+        payments = payments.order_by(Payment.created_at.desc(), Payment.id.desc())
+        if before_id is None:
+            payments = payments.offset(skip)
+        # 多取一条判断是否还有下一页
+        records = payments.limit(limit + 1).all()
+        next_before_id = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_before_id = records[-1].id
 
         return {
             "items": [
@@ -193,5 +282,6 @@ class FinanceService:
                 }
                 for record in records
             ],
-            "total": total
-        }
\ No newline at end of file
+            "total": total,
+            "next_before_id": next_before_id
+        }
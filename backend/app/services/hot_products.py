@@ -0,0 +1,264 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional, Tuple
+from datetime import date, timedelta
+import heapq
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.inventory import DailySales, Inventory
+
+logger = logging.getLogger(__name__)
+
+# 支持的统计窗口（天）
+HOT_PRODUCT_WINDOWS = (1, 7, 30)
+
+# 每个排行保留的商品数，与接口 limit 的上限一致
+TOP_N = 100
+
+
+def _revenue(item: dict) -> Decimal:
+    return item["revenue"]
+
+
+class _Board:
+    """单个店铺单个窗口的商品销售聚合和按销售额排好序的前 TOP_N"""
+
+    def __init__(self, day: date, products: Dict[str, dict]):
+        self.day = day
+        self.loaded_at = time.monotonic()
+        self.read_at = self.loaded_at
+        self.products = products
+        self.rank()
+
+    def rank(self):
+        self.top = heapq.nlargest(
+            TOP_N,
+            (item for item in self.products.values() if item["quantity"] > 0),
+            key=_revenue
+        )
+
+    def update(self, item: dict, increased: bool):
+        """商品销售额变化后调整前 TOP_N"""
+        if any(entry is item for entry in self.top):
+            if increased and item["quantity"] > 0:
+                # 只会上升，在前 TOP_N 内重新排序即可
+                self.top.sort(key=_revenue, reverse=True)
+            else:
+                # 下降后可能被榜外的商品超过
+                self.rank()
+        elif increased and item["quantity"] > 0 and (
+            len(self.top) < TOP_N or item["revenue"] > self.top[-1]["revenue"]
+        ):
+            self.top.append(item)
+            self.top.sort(key=_revenue, reverse=True)
+            del self.top[TOP_N:]
+
+
+class _Load:
+    """进行中的一次加载：记录加载期间到达的销售，加载完成后补记到新排行"""
+
+    def __init__(self):
+        self.sales: List[tuple] = []
+        self.invalidated = False
+
+
+class HotProductsLeaderboard:
+    """热销商品排行
+
+    每个 (店铺, 窗口) 在进程内保留窗口内所有已售商品的聚合和排好序的前 TOP_N，读取时直接截取。
+    出库/撤销提交后增量更新聚合和排行；超过 TTL 或跨天的排行由后台线程从销售日汇总重新加载，
+    以滑出过期的日期，请求中只在首次读取时同步加载。
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._boards: Dict[Tuple[int, int], _Board] = {}
+        self._loads: Dict[Tuple[int, int], List[_Load]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hot-products-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    @staticmethod
+    def _load(db: Session, store_id: int, days: int) -> Dict[str, dict]:
+        """从销售日汇总加载窗口内的商品销售聚合"""
+        start_day = date.today() - timedelta(days=days - 1)
+        rows = db.query(
+            Inventory.barcode,
+            Inventory.name,
+            func.sum(DailySales.quantity).label('quantity'),
+            func.sum(DailySales.revenue).label('revenue')
+        ).join(
+            Inventory, DailySales.inventory_id == Inventory.id
+        ).filter(
+            DailySales.type == 'out',
+            DailySales.store_id == store_id,
+            DailySales.day >= start_day
+        ).group_by(
+            Inventory.barcode,
+            Inventory.name
+        ).all()
+
+        return {
+            row.barcode: {
+                "barcode": row.barcode,
+                "name": row.name,
+                "quantity": int(row.quantity),
+                "revenue": Decimal(str(row.revenue))
+            }
+            for row in rows
+        }
+
+    def _is_fresh(self, board: _Board) -> bool:
+        return board.day == date.today() and time.monotonic() - board.loaded_at < self.ttl
+
+    def refresh(self, db: Session, store_id: int, days: int) -> _Board:
+        """从销售日汇总重新加载一个排行
+
+        加载在锁外进行，期间 record_sale 记到旧排行的销售会同时记入 load，替换前补记到新排行，
+        不会丢失到下次刷新；加载期间被 invalidate 的排行替换后仍标记为过期。
+        """
+        key = (store_id, days)
+        load = _Load()
+        with self._lock:
+            self._loads.setdefault(key, []).append(load)
+        try:
+            board = _Board(date.today(), self._load(db, store_id, days))
+        except Exception:
+            with self._lock:
+                self._end_load(key, load)
+            raise
+
+        # 补记和替换在同一次加锁内完成，其间不会有新的销售漏记
+        with self._lock:
+            self._end_load(key, load)
+            for sale in load.sales:
+                self._apply(board, *sale)
+            if load.invalidated:
+                board.loaded_at = float("-inf")
+            self._boards[key] = board
+        return board
+
+    def _end_load(self, key: Tuple[int, int], load: _Load) -> None:
+        loads = self._loads[key]
+        loads.remove(load)
+        if not loads:
+            del self._loads[key]
+
+    def refresh_stale(self) -> int:
+        """重新加载所有过期的排行，长时间未读取的直接丢弃；返回加载的数量"""
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, board in self._boards.items() if now - board.read_at > self.ttl * 10]:
+                del self._boards[key]
+            stale = [key for key, board in self._boards.items() if not self._is_fresh(board)]
+        if not stale:
+            return 0
+
+        db = SessionLocal()
+        try:
+            for store_id, days in stale:
+                self.refresh(db, store_id, days)
+                db.rollback()
+        finally:
+            db.close()
+        return len(stale)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.ttl)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh_stale()
+            except Exception as e:
+                logger.warning(f"刷新热销排行失败: {str(e)}")
+
+    def get_top(self, db: Session, store_id: int, days: int = 7, limit: int = 10) -> List[dict]:
+        """获取店铺近 days 天销售额前 limit 的商品（limit 不超过 TOP_N）"""
+        key = (store_id, days)
+        with self._lock:
+            board = self._boards.get(key)
+
+        if board is None:
+            board = self.refresh(db, store_id, days)
+        elif not self._is_fresh(board):
+            # 先返回现有排行，由后台线程重新加载
+            self._wake.set()
+
+        with self._lock:
+            board.read_at = time.monotonic()
+            return [
+                {
+                    **item,
+                    "revenue": item["revenue"].quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+                }
+                for item in board.top[:limit]
+            ]
+
+    @staticmethod
+    def _apply(board: _Board, barcode: str, name: str, quantity: int, revenue: Decimal) -> None:
+        item = board.products.setdefault(barcode, {
+            "barcode": barcode,
+            "name": name,
+            "quantity": 0,
+            "revenue": Decimal('0')
+        })
+        item["quantity"] += quantity
+        item["revenue"] += revenue
+        board.update(item, increased=revenue >= 0 and quantity >= 0)
+
+    def record_sale(self, store_id: int, barcode: str, name: str, quantity: int, revenue: Decimal) -> None:
+        """出库提交后累加到已加载的排行（撤销时传入负数）"""
+        sale = (barcode, name, quantity, Decimal(str(revenue)))
+        with self._lock:
+            for days in HOT_PRODUCT_WINDOWS:
+                key = (store_id, days)
+                for load in self._loads.get(key, ()):
+                    load.sales.append(sale)
+                board = self._boards.get(key)
+                if board is not None:
+                    self._apply(board, *sale)
+
+    def stats(self) -> dict:
+        """进程内已加载的排行数量（健康检查展示缓存预热情况）"""
+        with self._lock:
+            return {
+                "boards": len(self._boards),
+                "stores": len({store_id for store_id, _ in self._boards})
+            }
+
+    def invalidate(self, store_id: int) -> None:
+        """标记店铺的排行过期，由后台线程重新加载"""
+        with self._lock:
+            for days in HOT_PRODUCT_WINDOWS:
+                board = self._boards.get((store_id, days))
+                if board is not None:
+                    board.loaded_at = float("-inf")
+                for load in self._loads.get((store_id, days), ()):
+                    load.invalidated = True
+        self._wake.set()
+
+
+# 创建全局排行实例（每个工作进程一份）
+hot_products_leaderboard = HotProductsLeaderboard(settings.HOT_PRODUCTS_TTL)
@@ -8,9 +8,8 @@ from fastapi import HTTPException
 from contextlib import contextmanager
 import time
 
-from app.models.inventory import Inventory, Transaction, StockOrder, StockOrderItem
+from app.models.inventory import Inventory, Transaction, StockOrder, StockOrderItem, StockAlert
 from app.models.user import User
-from app.models.log import OperationLog
 from app.models.company import Company
 from app.schemas.inventory import (
     InventoryCreate, 
@@ -20,7 +19,15 @@ from app.schemas.inventory import (
     StockOrderCreate,
     StockOrderUpdate
 )
-from app.models.inventory import OrderStatus
+from app.models.inventory import OrderStatus, DailySales
+from app.services.sales_rollup import SalesRollupService
+from app.services.hot_products import hot_products_leaderboard
+from app.services.data_version import DataVersionService, INVENTORY, LEDGER
+from app.services.stock_events import StockEventService
+from app.services.low_stock import LowStockService
+from app.services.audit import AuditService
+from app.services.archive import ArchiveService, fifo_cost
+from app.models.archive import InventorySnapshot
 
 class InventoryService:
     @staticmethod
@@ -50,6 +57,56 @@ class InventoryService:
         # 分页
         return query.offset(skip).limit(limit).all()
 
+    @staticmethod
+    def get_inventory_rows(
+        db: Session,
+        store_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        search: Optional[str] = None
+    ) -> List[dict]:
+        """获取库存列表（只查询所需列并直接映射为字典，供快速序列化）"""
+        query = db.query(
+            Inventory.id,
+            Inventory.barcode,
+            Inventory.name,
+            Inventory.unit,
+            Inventory.stock,
+            Inventory.warning_stock,
+            Inventory.is_active,
+            Inventory.remark,
+            Inventory.created_at,
+            Inventory.updated_at
+        ).filter(Inventory.store_id == store_id)
+        
+        if search:
+            search = f"%{search}%"
+            query = query.filter(
+                or_(
+                    Inventory.barcode.ilike(search),
+                    Inventory.name.ilike(search)
+                )
+            )
+        
+        rows = query.order_by(Inventory.created_at.desc()).offset(skip).limit(limit).all()
+        
+        return [
+            {
+                "barcode": row.barcode,
+                "name": row.name,
+                "unit": row.unit,
+                "warning_stock": row.warning_stock,
+                "remark": row.remark,
+                "id": row.id,
+                # 与 Inventory 响应模型一致，库存按 Decimal 输出
+                "stock": Decimal(row.stock or 0),
+                "is_active": row.is_active,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at
+            }
+            for row in rows
+        ]
+
     @staticmethod
     def get_inventory_count(
         db: Session,
@@ -128,6 +185,7 @@ class InventoryService:
             )
             
             db.add(db_inventory)
+            DataVersionService.bump(db, store_id, INVENTORY)
             db.commit()
             db.refresh(db_inventory)
             return db_inventory
@@ -155,15 +213,35 @@ class InventoryService:
             )
     
     @staticmethod
-    def update_inventory(db: Session, barcode: str, inventory: InventoryUpdate, store_id: int):
+    def update_inventory(
+        db: Session,
+        barcode: str,
+        inventory: InventoryUpdate,
+        store_id: int,
+        operator_id: Optional[int] = None
+    ):
         db_inventory = InventoryService.get_inventory_by_barcode(db, barcode, store_id)
         if not db_inventory:
             return None
         
         update_data = inventory.model_dump(exclude_unset=True)
+        changes = {
+            field: {"old": getattr(db_inventory, field), "new": value}
+            for field, value in update_data.items()
+            if getattr(db_inventory, field) != value
+        }
         for field, value in update_data.items():
             setattr(db_inventory, field, value)
         
+        if operator_id is not None and changes:
+            AuditService.record(
+                db,
+                store_id=store_id,
+                operator_id=operator_id,
+                operation_type="update_inventory",
+                details={"inventory_id": db_inventory.id, "barcode": barcode, "changes": changes}
+            )
+        DataVersionService.bump(db, store_id, INVENTORY)
         db.commit()
         db.refresh(db_inventory)
         return db_inventory
@@ -227,6 +305,9 @@ class InventoryService:
             )
             
             db.add(transaction)
+            SalesRollupService.record_transactions(db, store_id, [transaction])
+            DataVersionService.bump(db, store_id, INVENTORY, LEDGER)
+            StockEventService.publish(db, store_id, [inventory])
             db.commit()
             db.refresh(inventory)
             return inventory
@@ -265,14 +346,24 @@ class InventoryService:
             )
             
             db.add(transaction)
+            SalesRollupService.record_transactions(db, store_id, [transaction])
+            DataVersionService.bump(db, store_id, INVENTORY, LEDGER)
+            StockEventService.publish(db, store_id, [inventory])
             db.commit()
             db.refresh(inventory)
+            
+            # 更新热销排行
+            hot_products_leaderboard.record_sale(
+                store_id, inventory.barcode, inventory.name,
+                transaction.quantity, transaction.total
+            )
             return inventory
     
     @staticmethod
     def get_inventory_stats(db: Session, store_id: int) -> dict:
-        # 计算库存总值（使用最近的进货价格）
+        # 计算库存总值（使用最近的进货价格，未归档账期内没有进货时取期初快照）
         inventory_values = []
+        snapshots = ArchiveService.get_inventory_snapshots(db, store_id)
         for inv in db.query(Inventory).filter(Inventory.store_id == store_id).all():
             last_in_price = db.query(Transaction.price)\
                 .filter(
@@ -284,54 +375,18 @@ class InventoryService:
                 .first()
             if last_in_price:
                 inventory_values.append(inv.stock * last_in_price[0])
+            elif inv.barcode in snapshots and snapshots[inv.barcode].last_in_price is not None:
+                inventory_values.append(inv.stock * snapshots[inv.barcode].last_in_price)
         
         total_value = sum(inventory_values, Decimal('0'))
         
-        # 获取今日销售额（所有商品）
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now()
-        
-        today_sales = db.query(
-            func.sum(Transaction.total)
-        ).filter(
-            Transaction.type == 'out',
-            Transaction.store_id == store_id,
-            Transaction.timestamp.between(today_start, today_end)
-        ).scalar() or Decimal('0')
-        
-        # 获取近7天销售额（所有商品）
-        week_start = datetime.now() - timedelta(days=7)
-        week_sales = db.query(
-            func.sum(Transaction.total)
-        ).filter(
-            Transaction.type == 'out',
-            Transaction.store_id == store_id,
-            Transaction.timestamp.between(week_start, today_end)
-        ).scalar() or Decimal('0')
-        
-        # 获取库存预警商品列表
-        low_stock_items = db.query(
-            Inventory.barcode,
-            Inventory.name,
-            Inventory.stock,
-            Inventory.warning_stock,
-            Inventory.unit
-        ).filter(
-            Inventory.store_id == store_id,
-            Inventory.stock <= Inventory.warning_stock
-        ).all()
-        
-        # 转换为字典列表
-        low_stock_list = [
-            {
-                "barcode": item.barcode,
-                "name": item.name,
-                "stock": item.stock,
-                "warning_stock": item.warning_stock,
-                "unit": item.unit
-            }
-            for item in low_stock_items
-        ]
+        # 获取今日及近7天销售额（读取销售日汇总）
+        today = datetime.now().date()
+        today_sales = SalesRollupService.get_sales_total(db, store_id, today)
+        week_sales = SalesRollupService.get_sales_total(db, store_id, today - timedelta(days=6))
+        
+        # 获取库存预警商品列表（走部分索引，只扫描低于警戒线的行）
+        low_stock_list = LowStockService.get_low_stock_items(db, store_id)
         
         # 获取热销产品
         hot_products = InventoryService.get_hot_products(db, store_id)
@@ -358,12 +413,22 @@ class InventoryService:
     ):
         """获取交易记录"""
         # 基础查询
+        # 只查询需要的列，避免为每行构造 ORM 对象
         query = (
             db.query(
-                Transaction,
+                Transaction.id,
+                Transaction.barcode,
+                Transaction.type,
                 Inventory.name.label('name'),
+                Transaction.quantity,
+                Transaction.price,
+                Transaction.total,
+                Transaction.timestamp,
+                Transaction.operator_id,
                 User.name.label('operator_name'),
-                Company.name.label('company_name')
+                Transaction.company_id,
+                Company.name.label('company_name'),
+                Transaction.notes
             )
             .join(Inventory, Transaction.barcode == Inventory.barcode)
             .join(User, Transaction.operator_id == User.id)
@@ -389,23 +454,7 @@ class InventoryService:
         transactions = query.offset(skip).limit(limit).all()
         
         # 转换为响应格式
-        items = []
-        for t, name, operator_name, company_name in transactions:
-            items.append({
-                "id": t.id,
-                "barcode": t.barcode,
-                "type": t.type,
-                "name": name,
-                "quantity": t.quantity,
-                "price": t.price,
-                "total": t.total,
-                "timestamp": t.timestamp,
-                "operator_id": t.operator_id,
-                "operator_name": operator_name,
-                "company_id": t.company_id,
-                "company_name": company_name,
-                "notes": t.notes
-            })
+        items = [row._asdict() for row in transactions]
         
         return {
             "items": items,
@@ -419,14 +468,28 @@ class InventoryService:
             return None
         
         try:
-            # 先删除关联的交易记录
+            # 先删除关联的汇总、快照、预警和交易记录
+            db.query(InventorySnapshot).filter(
+                InventorySnapshot.inventory_id == db_inventory.id,
+                InventorySnapshot.store_id == store_id
+            ).delete()
+            db.query(StockAlert).filter(
+                StockAlert.inventory_id == db_inventory.id,
+                StockAlert.store_id == store_id
+            ).delete()
+            db.query(DailySales).filter(
+                DailySales.inventory_id == db_inventory.id,
+                DailySales.store_id == store_id
+            ).delete()
             db.query(Transaction).filter(
                 Transaction.barcode == barcode,
                 Transaction.store_id == store_id
             ).delete()
             # 再删除商品
             db.delete(db_inventory)
+            DataVersionService.bump(db, store_id, INVENTORY, LEDGER)
             db.commit()
+            hot_products_leaderboard.invalidate(store_id)
             return db_inventory
         except Exception as e:
             db.rollback()
@@ -449,8 +512,23 @@ class InventoryService:
         profit_rankings = []
         sales_rankings = []
 
+        ArchiveService.ensure_not_archived(db, start_date)
+
+        # 已归档账期的累计进货和剩余批次
+        snapshots = ArchiveService.get_inventory_snapshots(db, store_id)
+        # 统计期之前已售出的数量，计算 FIFO 成本时先扣除
+        sold_before = dict(
+            db.query(Transaction.barcode, func.sum(Transaction.quantity))
+            .filter(
+                Transaction.store_id == store_id,
+                Transaction.type == 'out',
+                Transaction.timestamp < start_date
+            ).group_by(Transaction.barcode).all()
+        )
+
         # 获取所有商品
         for inv in db.query(Inventory).filter(Inventory.store_id == store_id).all():
+            snapshot = snapshots.get(inv.barcode)
             # 获取销售记录
             out_records = db.query(Transaction)\
                 .filter(
@@ -476,17 +554,13 @@ class InventoryService:
 
             # 计算进货总额
             purchase_total = sum(r.total for r in in_records)
+            if snapshot:
+                purchase_total += snapshot.in_amount
             total_purchase += purchase_total
 
-            # 计算销售成本（使用FIFO方法）
-            cost = Decimal('0')
-            remaining_quantity = sales_quantity
-            for record in in_records:
-                if remaining_quantity <= 0:
-                    break
-                used_quantity = min(record.quantity, remaining_quantity)
-                cost += used_quantity * record.price
-                remaining_quantity -= used_quantity
+            # 计算销售成本（使用FIFO方法，期初剩余批次在前）
+            lots = ArchiveService.opening_lots(snapshot) + [(r.quantity, r.price) for r in in_records]
+            cost = fifo_cost(lots, sold_before.get(inv.barcode, 0), sales_quantity)
             
             total_sales_cost += cost
 
@@ -533,39 +607,14 @@ class InventoryService:
         }
     
     @staticmethod
-    def get_hot_products(db: Session, store_id: int) -> List[dict]:
-        # 获取近7天的日期范围
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=7)
-        
-        # 查询近7天销售额前10的商品
-        hot_products = db.query(
-            Transaction.barcode,
-            Inventory.name,
-            func.sum(Transaction.quantity).label('quantity'),
-            func.sum(Transaction.total).label('revenue')
-        ).join(
-            Inventory, Transaction.barcode == Inventory.barcode
-        ).filter(
-            Transaction.type == 'out',
-            Transaction.store_id == store_id,
-            Transaction.timestamp.between(start_date, end_date)
-        ).group_by(
-            Transaction.barcode,
-            Inventory.name
-        ).order_by(
-            func.sum(Transaction.total).desc()
-        ).limit(10).all()
-        
-        return [
-            {
-                "barcode": item.barcode,
-                "name": item.name,
-                "quantity": item.quantity,
-                "revenue": Decimal(str(item.revenue)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            }
-            for item in hot_products
-        ]
+    def get_hot_products(db: Session, store_id: int, days: int = 7, limit: int = 10) -> List[dict]:
+        """获取近N天销售额前N的商品（读取进程内热销排行）"""
+        return hot_products_leaderboard.get_top(db, store_id, days, limit)
+    
+    @staticmethod
+    def get_daily_sales(db: Session, store_id: int, days: int = 7) -> List[dict]:
+        """获取近N天每日销售额、成本和毛利"""
+        return SalesRollupService.get_daily_sales(db, store_id, days)
     
     @staticmethod
     def get_product_analysis(
@@ -579,6 +628,7 @@ class InventoryService:
         # 设置时间范围
         price_trends = []
         sales_analysis = []
+        ArchiveService.ensure_not_archived(db, start_date)
         
         # 计算每天的间隔
         days_per_point = 1  # 默认每天一个点
@@ -586,6 +636,11 @@ class InventoryService:
         if total_days > 30:
             days_per_point = total_days // 30  # 确保总共有30个数据点
         
+        # 已归档账期的剩余批次
+        opening_lots = ArchiveService.opening_lots(
+            ArchiveService.get_inventory_snapshots(db, store_id, [barcode]).get(barcode)
+        )
+        
         # 生成日期点
         current_date = end_date
         while current_date >= start_date:
@@ -643,19 +698,15 @@ class InventoryService:
             if out_records:
                 total_sales = Decimal(str(sum(r.total for r in out_records)))
                 
-                # 计算销售成本
-                remaining_quantity = 0
-                total_out_quantity = sum(r.quantity for r in out_records)
-                
-                for in_record in in_records:
-                    if remaining_quantity >= total_out_quantity:
-                        break
-                    used_quantity = min(
-                        in_record.quantity,
-                        total_out_quantity - remaining_quantity
-                    )
-                    total_cost += used_quantity * in_record.price
-                    remaining_quantity += used_quantity
+                # 计算销售成本（FIFO，先扣除该时间段之前已售出的数量）
+                sold_before = db.query(func.sum(Transaction.quantity)).filter(
+                    Transaction.barcode == barcode,
+                    Transaction.type == 'out',
+                    Transaction.store_id == store_id,
+                    Transaction.timestamp < point_start
+                ).scalar() or 0
+                lots = opening_lots + [(r.quantity, r.price) for r in in_records]
+                total_cost = fifo_cost(lots, sold_before, sum(r.quantity for r in out_records))
             
             profit = total_sales - total_cost
             
@@ -676,8 +727,9 @@ class InventoryService:
     def get_statistics(db: Session, store_id: int) -> dict:
         """获取仪表盘统计数据"""
         try:
-            # 计算库存总值（使用最近的进货价格）
+            # 计算库存总值（使用最近的进货价格，未归档账期内没有进货时取期初快照）
             inventory_values = []
+            snapshots = ArchiveService.get_inventory_snapshots(db, store_id)
             for inv in db.query(Inventory).filter(Inventory.store_id == store_id).all():
                 last_in_price = db.query(Transaction.price)\
                     .filter(
@@ -689,52 +741,18 @@ class InventoryService:
                     .first()
                 if last_in_price:
                     inventory_values.append(inv.stock * last_in_price[0])
+                elif inv.barcode in snapshots and snapshots[inv.barcode].last_in_price is not None:
+                    inventory_values.append(inv.stock * snapshots[inv.barcode].last_in_price)
             
             total_value = sum(inventory_values, Decimal('0'))
             
-            # 获取今日销售额
-            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_sales = db.query(
-                func.sum(Transaction.total)
-            ).filter(
-                Transaction.type == 'out',
-                Transaction.store_id == store_id,
-                Transaction.timestamp >= today_start
-            ).scalar() or Decimal('0')
+            # 获取今日及近7天销售额（读取销售日汇总）
+            today = datetime.now().date()
+            today_sales = SalesRollupService.get_sales_total(db, store_id, today)
+            week_sales = SalesRollupService.get_sales_total(db, store_id, today - timedelta(days=6))
             
-            # 获取近7天销售额
-            week_start = datetime.now() - timedelta(days=7)
-            week_sales = db.query(
-                func.sum(Transaction.total)
-            ).filter(
-                Transaction.type == 'out',
-                Transaction.store_id == store_id,
-                Transaction.timestamp >= week_start
-            ).scalar() or Decimal('0')
-            
-            # 获取库存预警商品
-            low_stock_items = db.query(
-                Inventory.barcode,
-                Inventory.name,
-                Inventory.stock,
-                Inventory.warning_stock,
-                Inventory.unit
-            ).filter(
-                Inventory.store_id == store_id,
-                Inventory.stock <= Inventory.warning_stock
-            ).all()
-            
-            # 转换为字典列表
-            low_stock_list = [
-                {
-                    "barcode": item.barcode,
-                    "name": item.name,
-                    "stock": item.stock,
-                    "warning_stock": item.warning_stock,
-                    "unit": item.unit
-                }
-                for item in low_stock_items
-            ]
+            # 获取库存预警商品（走部分索引，只扫描低于警戒线的行）
+            low_stock_list = LowStockService.get_low_stock_items(db, store_id)
             
             # 获取热销产品
             hot_products = InventoryService.get_hot_products(db, store_id)
@@ -758,6 +776,7 @@ class InventoryService:
             return None
         
         db_inventory.is_active = not db_inventory.is_active
+        DataVersionService.bump(db, store_id, INVENTORY)
         db.commit()
         db.refresh(db_inventory)
         return db_inventory
@@ -812,11 +831,12 @@ class InventoryService:
             else:
                 inventory.stock += transaction.quantity
             
-            # 创建操作日志
-            log = OperationLog(
-                operation_type="cancel_transaction",
-                operator_id=operator_id,
+            # 创建操作日志（流水会被删除，日志是唯一的记录，随事务一起写入）
+            AuditService.record(
+                db,
                 store_id=store_id,
+                operator_id=operator_id,
+                operation_type="cancel_transaction",
                 details={
                     "transaction_id": transaction.id,
                     "barcode": transaction.barcode,
@@ -827,15 +847,24 @@ class InventoryService:
                     "original_stock": original_stock,
                     "new_stock": inventory.stock,
                     "timestamp": transaction.timestamp.isoformat()
-                }
+                },
+                durable=True
             )
-            db.add(log)
+            
+            # 从销售日汇总中扣除
+            SalesRollupService.record_transactions(db, store_id, [transaction], sign=-1)
             
             # 删除交易记录
             db.delete(transaction)
+            DataVersionService.bump(db, store_id, INVENTORY, LEDGER)
+            StockEventService.publish(db, store_id, [inventory])
             db.commit()
             db.refresh(inventory)
             
+            # 撤销出库后热销排行需重新加载
+            if transaction.type == "out":
+                hot_products_leaderboard.invalidate(store_id)
+            
             return inventory
             
         except Exception as e:
@@ -0,0 +1,310 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from fastapi import HTTPException
+from typing import List, Optional, Tuple
+import csv
+import io
+
+from app.services.data_version import DataVersionService, INVENTORY
+from app.services.hot_products import hot_products_leaderboard
+from app.services.audit import AuditService
+
+# 表头别名 -> 字段
+COLUMN_ALIASES = {
+    "条形码": "barcode",
+    "barcode": "barcode",
+    "商品名称": "name",
+    "名称": "name",
+    "name": "name",
+    "单位": "unit",
+    "unit": "unit",
+    "警戒库存": "warning_stock",
+    "warning_stock": "warning_stock",
+    "备注": "remark",
+    "remark": "remark",
+}
+
+IMPORT_FIELDS = ("barcode", "name", "unit", "warning_stock", "remark")
+
+# warning_stock 为 integer 列
+MAX_WARNING_STOCK = 2 ** 31 - 1
+
+
+def _read_rows(filename: str, content: bytes) -> List[list]:
+    """读取 CSV/XLSX 的所有行（含表头）"""
+    lower = filename.lower()
+    if lower.endswith(".xlsx"):
+        # openpyxl 导入较慢，只在导入 XLSX 时加载
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            return [list(row) for row in sheet.iter_rows(values_only=True)]
+        finally:
+            workbook.close()
+    if lower.endswith(".csv"):
+        # 兼容 Excel 导出的 UTF-8 BOM 和 GBK 编码
+        for encoding in ("utf-8-sig", "gbk"):
+            try:
+                decoded = content.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise HTTPException(status_code=400, detail="无法识别文件编码，请使用 UTF-8 或 GBK")
+        return [row for row in csv.reader(io.StringIO(decoded))]
+    raise HTTPException(status_code=400, detail="只支持 CSV 或 XLSX 文件")
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # Excel 会把纯数字条形码读成浮点数
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+class InventoryImportService:
+    """商品资料批量导入
+
+    行先校验格式，合格的行通过 COPY 写入临时表，再用集合运算与
+    (barcode, store_id)、(name, store_id) 唯一约束比对，最后一条 INSERT ... ON CONFLICT 完成写入。
+    """
+
+    @staticmethod
+    def parse_file(filename: str, content: bytes) -> Tuple[List[dict], List[dict]]:
+        """解析上传文件，返回 (合格行, 错误行)，行号从表头下一行的 2 开始"""
+        rows = _read_rows(filename, content)
+        if not rows:
+            raise HTTPException(status_code=400, detail="文件为空")
+
+        header = []
+        for title in rows[0]:
+            title = _clean(title) or ""
+            header.append(COLUMN_ALIASES.get(title) or COLUMN_ALIASES.get(title.lower()))
+        if "barcode" not in header or "name" not in header:
+            raise HTTPException(status_code=400, detail="缺少必需的列: 条形码、商品名称")
+
+        valid, errors = [], []
+        for line_no, row in enumerate(rows[1:], start=2):
+            record = {field: None for field in IMPORT_FIELDS}
+            for field, value in zip(header, row):
+                if field:
+                    record[field] = _clean(value)
+            if not any(record.values()):
+                continue  # 跳过空行
+
+            error = None
+            if not record["barcode"]:
+                error = "条形码不能为空"
+            elif len(record["barcode"]) > 13:
+                error = "条形码长度不能超过13位"
+            elif not record["name"]:
+                error = "商品名称不能为空"
+            elif len(record["name"]) > 255:
+                error = "商品名称过长"
+            elif record["unit"] and len(record["unit"]) > 20:
+                error = "单位过长"
+            else:
+                try:
+                    warning_stock = int(float(record["warning_stock"])) if record["warning_stock"] else 10
+                    if warning_stock < 0:
+                        raise ValueError
+                    if warning_stock > MAX_WARNING_STOCK:
+                        error = "警戒库存过大"
+                    else:
+                        record["warning_stock"] = warning_stock
+                except (ValueError, OverflowError):
+                    # inf 转整数时为 OverflowError
+                    error = "警戒库存必须是非负整数"
+
+            if error:
+                errors.append({"row": line_no, "barcode": record["barcode"], "name": record["name"], "error": error})
+            else:
+                record["line_no"] = line_no
+                valid.append(record)
+
+        return valid, errors
+
+    @staticmethod
+    def import_rows(
+        db: Session,
+        rows: List[dict],
+        store_id: int,
+        update_existing: bool = True
+    ) -> dict:
+        """批量写入商品，返回 {created, updated, errors}"""
+        if not rows:
+            return {"created": 0, "updated": 0, "errors": []}
+
+        db.execute(text("""
+            CREATE TEMP TABLE inventory_import (
+                line_no integer PRIMARY KEY,
+                barcode varchar(13) NOT NULL,
+                name varchar(255) NOT NULL,
+                unit varchar(20),
+                warning_stock integer NOT NULL,
+                remark text,
+                error text
+            ) ON COMMIT DROP
+        """))
+
+        # 通过 COPY 批量写入临时表
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                row["line_no"], row["barcode"], row["name"],
+                row["unit"], row["warning_stock"], row["remark"]
+            ])
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                "COPY inventory_import (line_no, barcode, name, unit, warning_stock, remark) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+        # 文件内重复：同一条形码或名称只保留第一行
+        db.execute(text("""
+            UPDATE inventory_import t SET error = '文件中条形码重复'
+            FROM (
+                SELECT line_no, row_number() OVER (PARTITION BY barcode ORDER BY line_no) AS rn
+                FROM inventory_import
+            ) d
+            WHERE d.line_no = t.line_no AND d.rn > 1
+        """))
+        db.execute(text("""
+            UPDATE inventory_import t SET error = '文件中商品名称重复'
+            FROM (
+                SELECT line_no, row_number() OVER (PARTITION BY name ORDER BY line_no) AS rn
+                FROM inventory_import
+                WHERE error IS NULL
+            ) d
+            WHERE d.line_no = t.line_no AND d.rn > 1
+        """))
+
+        # 名称已被店内其他条形码的商品使用
+        db.execute(text("""
+            UPDATE inventory_import t SET error = '商品名称已被其他商品使用'
+            FROM inventory i
+            WHERE t.error IS NULL
+              AND i.store_id = :store_id
+              AND i.name = t.name
+              AND i.barcode <> t.barcode
+        """), {"store_id": store_id})
+
+        if not update_existing:
+            db.execute(text("""
+                UPDATE inventory_import t SET error = '条形码已存在'
+                FROM inventory i
+                WHERE t.error IS NULL
+                  AND i.store_id = :store_id
+                  AND i.barcode = t.barcode
+            """), {"store_id": store_id})
+        else:
+            # 更新警戒库存会绕过 ORM 的预警监听，这里按同样规则记录跨越警戒线的商品
+            db.execute(text("""
+                INSERT INTO stock_alerts (store_id, inventory_id, type, stock, warning_stock, created_at)
+                SELECT i.store_id, i.id,
+                       CASE WHEN i.stock <= t.warning_stock THEN 'low' ELSE 'recovered' END,
+                       i.stock, t.warning_stock, now()
+                FROM inventory_import t
+                JOIN inventory i ON i.store_id = :store_id AND i.barcode = t.barcode
+                WHERE t.error IS NULL
+                  AND (i.stock <= i.warning_stock) <> (i.stock <= t.warning_stock)
+            """), {"store_id": store_id})
+
+        # 一条语句完成插入或更新；xmax = 0 表示新插入的行，新商品库存为 0，不高于警戒库存时同时记录预警
+        result = db.execute(text("""
+            WITH upserted AS (
+            INSERT INTO inventory (barcode, name, unit, warning_stock, remark, stock, is_active, store_id, created_at)
+            SELECT barcode, name, unit, warning_stock, remark, 0, true, :store_id, now()
+            FROM inventory_import
+            WHERE error IS NULL
+            ORDER BY line_no
+            ON CONFLICT ON CONSTRAINT uq_inventory_barcode_store DO UPDATE SET
+                name = EXCLUDED.name,
+                unit = EXCLUDED.unit,
+                warning_stock = EXCLUDED.warning_stock,
+                remark = EXCLUDED.remark,
+                updated_at = now()
+            RETURNING id, stock, warning_stock, (xmax = 0) AS inserted
+            ), alerts AS (
+                INSERT INTO stock_alerts (store_id, inventory_id, type, stock, warning_stock, created_at)
+                SELECT :store_id, id, 'low', stock, warning_stock, now()
+                FROM upserted
+                WHERE inserted AND stock <= warning_stock
+            )
+            SELECT inserted FROM upserted
+        """), {"store_id": store_id})
+        inserted = [row.inserted for row in result]
+
+        errors = [
+            {"row": row.line_no, "barcode": row.barcode, "name": row.name, "error": row.error}
+            for row in db.execute(text(
+                "SELECT line_no, barcode, name, error FROM inventory_import WHERE error IS NOT NULL ORDER BY line_no"
+            ))
+        ]
+
+        if inserted:
+            DataVersionService.bump(db, store_id, INVENTORY)
+
+        return {
+            "created": sum(1 for flag in inserted if flag),
+            "updated": sum(1 for flag in inserted if not flag),
+            "errors": errors
+        }
+
+    @staticmethod
+    def import_file(
+        db: Session,
+        filename: str,
+        content: bytes,
+        store_id: int,
+        update_existing: bool = True,
+        operator_id: Optional[int] = None
+    ) -> dict:
+        """解析并导入上传的商品文件，返回导入结果和逐行错误报告"""
+        rows, errors = InventoryImportService.parse_file(filename, content)
+        try:
+            result = InventoryImportService.import_rows(db, rows, store_id, update_existing)
+            if operator_id is not None and (result["created"] or result["updated"]):
+                AuditService.record(
+                    db,
+                    store_id=store_id,
+                    operator_id=operator_id,
+                    operation_type="import_inventory",
+                    details={
+                        "filename": filename,
+                        "created": result["created"],
+                        "updated": result["updated"],
+                        "failed": len(errors) + len(result["errors"])
+                    }
+                )
+            db.commit()
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"导入商品失败: {str(e)}")
+
+        # 商品名称可能被更新
+        if result["updated"]:
+            hot_products_leaderboard.invalidate(store_id)
+
+        total = len(rows) + len(errors)
+        errors = sorted(errors + result["errors"], key=lambda e: e["row"])
+        return {
+            "total": total,
+            "created": result["created"],
+            "updated": result["updated"],
+            "failed": len(errors),
+            "errors": errors
+        }
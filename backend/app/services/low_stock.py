@@ -0,0 +1,138 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, func, tuple_
+from fastapi import HTTPException
+from datetime import timedelta
+from typing import List, Optional
+
+from app.core.config import settings
+from app.models.inventory import Inventory, StockAlert
+
+
+def _is_low(stock: int, warning_stock: int) -> bool:
+    return stock is not None and warning_stock is not None and stock <= warning_stock
+
+
+def _with_default(obj: Inventory, name: str):
+    """新建商品未赋值的字段取列默认值（插入时才会填入）"""
+    value = getattr(obj, name)
+    if value is None:
+        default = Inventory.__table__.c[name].default
+        if default is not None and default.is_scalar:
+            value = default.arg
+    return value
+
+
+@event.listens_for(Session, "before_flush")
+def _record_threshold_crossings(session: Session, flush_context, instances) -> None:
+    """刷新前检查库存或警戒库存有变化的商品，跨越警戒线时写入一条预警事件
+
+    所有通过 ORM 修改库存的路径（出入库、确认单据、撤销流水、修改商品）都会经过这里；
+    新建时库存已不高于警戒库存的商品记录一条 low 事件。
+    """
+    for obj in session.new:
+        if not isinstance(obj, Inventory):
+            continue
+        stock = _with_default(obj, "stock")
+        warning_stock = _with_default(obj, "warning_stock")
+        if _is_low(stock, warning_stock):
+            # 通过关系关联，刷新时按插入顺序填入 inventory_id
+            session.add(StockAlert(
+                store_id=obj.store_id,
+                inventory=obj,
+                type="low",
+                stock=stock,
+                warning_stock=warning_stock
+            ))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Inventory):
+            continue
+        state = inspect(obj)
+        stock_history = state.attrs.stock.history
+        warning_history = state.attrs.warning_stock.history
+        if not stock_history.has_changes() and not warning_history.has_changes():
+            continue
+
+        old_stock = stock_history.deleted[0] if stock_history.deleted else obj.stock
+        old_warning = warning_history.deleted[0] if warning_history.deleted else obj.warning_stock
+        was_low = _is_low(old_stock, old_warning)
+        is_low = _is_low(obj.stock, obj.warning_stock)
+        if was_low == is_low:
+            continue
+
+        session.add(StockAlert(
+            store_id=obj.store_id,
+            inventory_id=obj.id,
+            type="low" if is_low else "recovered",
+            stock=obj.stock,
+            warning_stock=obj.warning_stock
+        ))
+
+
+class LowStockService:
+    """库存预警
+
+    当前预警列表通过部分索引 idx_inventory_low_stock 读取；
+    预警事件流只记录跨越警戒线的变化，供仪表盘和通知增量拉取。
+    """
+
+    @staticmethod
+    def get_low_stock_items(db: Session, store_id: int) -> List[dict]:
+        """当前低于警戒库存的商品"""
+        rows = db.query(
+            Inventory.id,
+            Inventory.barcode,
+            Inventory.name,
+            Inventory.stock,
+            Inventory.warning_stock,
+            Inventory.unit
+        ).filter(
+            Inventory.store_id == store_id,
+            Inventory.stock <= Inventory.warning_stock
+        ).order_by(Inventory.stock - Inventory.warning_stock).all()
+        return [row._asdict() for row in rows]
+
+    @staticmethod
+    def get_alerts(db: Session, store_id: int, after_id: Optional[int] = None, limit: int = 50) -> dict:
+        """按 (created_at, id) 递增返回 after_id 之后的预警事件；不传 after_id 时返回最近的 limit 条
+
+        id 按分配顺序递增，较早分配 id 的事务可能较晚提交，按 id 分页会漏掉这些事件。
+        created_at 为事务开始时间，只返回创建超过 STOCK_ALERT_FEED_LAG 秒的事件，
+        等待这段时间内开始的事务提交；运行时间超过该值的事务中的事件仍可能被跳过（尽力而为）。
+        """
+        query = db.query(
+            StockAlert.id,
+            StockAlert.inventory_id,
+            Inventory.barcode,
+            Inventory.name,
+            StockAlert.type,
+            StockAlert.stock,
+            StockAlert.warning_stock,
+            StockAlert.created_at
+        ).join(
+            Inventory, StockAlert.inventory_id == Inventory.id
+        ).filter(
+            StockAlert.store_id == store_id,
+            StockAlert.created_at <= func.now() - timedelta(seconds=settings.STOCK_ALERT_FEED_LAG)
+        )
+
+        if after_id is not None:
+            cursor = db.query(StockAlert.created_at, StockAlert.id).filter(
+                StockAlert.id == after_id,
+                StockAlert.store_id == store_id
+            ).first()
+            if not cursor:
+                raise HTTPException(status_code=400, detail="无效的分页参数")
+            rows = query.filter(
+                tuple_(StockAlert.created_at, StockAlert.id) > tuple_(cursor.created_at, cursor.id)
+            ).order_by(StockAlert.created_at, StockAlert.id).limit(limit).all()
+        else:
+            rows = list(reversed(
+                query.order_by(StockAlert.created_at.desc(), StockAlert.id.desc()).limit(limit).all()
+            ))
+
+        items = [row._asdict() for row in rows]
+        return {
+            "items": items,
+            "next_after_id": items[-1]["id"] if items else after_id
+        }
@@ -0,0 +1,221 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, select, case, literal
+from sqlalchemy.dialects.postgresql import insert
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional
+from datetime import date, datetime, timedelta
+
+from app.models.inventory import DailySales, Transaction
+from app.models.archive import ArchivePeriod, InventorySnapshot
+
+
+class SalesRollupService:
+    """销售日汇总
+
+    交易流水在写入/撤销时同步累加到 daily_sales，仪表盘和报表只读取汇总行。
+    出库成本按销售时刻的最近进价估算；历史进价被撤销等情况造成的偏差可通过 rebuild 重建修正。
+    """
+
+    @staticmethod
+    def get_last_in_prices(
+        db: Session,
+        store_id: int,
+        inventory_ids: Iterable[int],
+        before: Optional[datetime] = None
+    ) -> Dict[int, Decimal]:
+        """批量获取商品的最近进价"""
+        inventory_ids = set(inventory_ids)
+        if not inventory_ids:
+            return {}
+
+        query = db.query(Transaction.inventory_id, Transaction.price).filter(
+            Transaction.store_id == store_id,
+            Transaction.type == 'in',
+            Transaction.inventory_id.in_(inventory_ids)
+        )
+        if before is not None:
+            query = query.filter(Transaction.timestamp <= before)
+
+        rows = query.distinct(Transaction.inventory_id)\
+            .order_by(Transaction.inventory_id, Transaction.timestamp.desc())\
+            .all()
+        prices = {row.inventory_id: row.price for row in rows}
+
+        # 未归档账期内没有进货的商品取期初快照中的最近进价
+        missing = inventory_ids - prices.keys()
+        if missing:
+            for row in db.query(InventorySnapshot.inventory_id, InventorySnapshot.last_in_price).filter(
+                InventorySnapshot.store_id == store_id,
+                InventorySnapshot.inventory_id.in_(missing),
+                InventorySnapshot.last_in_price.isnot(None)
+            ):
+                prices[row.inventory_id] = row.last_in_price
+        return prices
+
+    @staticmethod
+    def record_transactions(
+        db: Session,
+        store_id: int,
+        transactions: List[Transaction],
+        sign: int = 1
+    ) -> None:
+        """将交易累加到日汇总（sign=-1 表示撤销），在调用方的事务中执行，不提交"""
+        if not transactions:
+            return
+
+        # 撤销时按原交易时刻取进价，新交易按当前最近进价
+        out_ids = [t.inventory_id for t in transactions if t.type == 'out']
+        before = None
+        if sign < 0:
+            before = max((t.timestamp for t in transactions if t.timestamp), default=None)
+        last_prices = SalesRollupService.get_last_in_prices(db, store_id, out_ids, before)
+
+        # 同一商品同一天的多行先在内存中合并，保证一条语句完成写入
+        rows: Dict[tuple, dict] = {}
+        for t in transactions:
+            day = t.timestamp.date() if t.timestamp else date.today()
+            key = (t.inventory_id, day, t.type)
+            row = rows.setdefault(key, {
+                "store_id": store_id,
+                "inventory_id": t.inventory_id,
+                "day": day,
+                "type": t.type,
+                "quantity": 0,
+                "revenue": Decimal('0'),
+                "cost": Decimal('0')
+            })
+            total = Decimal(str(t.total if t.total is not None else t.quantity * t.price))
+            row["quantity"] += sign * t.quantity
+            if t.type == 'out':
+                row["revenue"] += sign * total
+                row["cost"] += sign * t.quantity * last_prices.get(t.inventory_id, Decimal('0'))
+            else:
+                row["cost"] += sign * total
+
+        stmt = insert(DailySales).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_daily_sales_key',
+            set_={
+                "quantity": DailySales.quantity + stmt.excluded.quantity,
+                "revenue": DailySales.revenue + stmt.excluded.revenue,
+                "cost": DailySales.cost + stmt.excluded.cost
+            }
+        )
+        db.execute(stmt)
+
+    @staticmethod
+    def rebuild(db: Session, store_id: Optional[int] = None) -> int:
+        """根据交易流水重建日汇总，返回写入的汇总行数（不提交）
+
+        已归档账期的流水不在热表中，只重建归档截止时间之后的日汇总。
+        """
+        closed_before = db.query(func.max(ArchivePeriod.closed_before)).scalar()
+        delete_query = db.query(DailySales)
+        if store_id is not None:
+            delete_query = delete_query.filter(DailySales.store_id == store_id)
+        if closed_before is not None:
+            delete_query = delete_query.filter(DailySales.day >= closed_before.date())
+        delete_query.delete(synchronize_session=False)
+
+        # 出库成本：销售时刻之前最近一次进价
+        last_in = aliased(Transaction)
+        last_in_price = (
+            select(last_in.price)
+            .where(
+                last_in.inventory_id == Transaction.inventory_id,
+                last_in.store_id == Transaction.store_id,
+                last_in.type == 'in',
+                last_in.timestamp <= Transaction.timestamp
+            )
+            .order_by(last_in.timestamp.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        snapshot_price = (
+            select(InventorySnapshot.last_in_price)
+            .where(
+                InventorySnapshot.inventory_id == Transaction.inventory_id,
+                InventorySnapshot.store_id == Transaction.store_id
+            )
+            .scalar_subquery()
+        )
+
+        day = func.date(Transaction.timestamp)
+        source = select(
+            Transaction.store_id,
+            Transaction.inventory_id,
+            day,
+            Transaction.type,
+            func.sum(Transaction.quantity),
+            func.coalesce(func.sum(case(
+                (Transaction.type == 'out', Transaction.total), else_=literal(0)
+            )), 0),
+            func.coalesce(func.sum(case(
+                (Transaction.type == 'out', Transaction.quantity * func.coalesce(last_in_price, snapshot_price, 0)),
+                else_=Transaction.total
+            )), 0)
+        ).where(
+            Transaction.inventory_id.isnot(None)
+        ).group_by(
+            Transaction.store_id,
+            Transaction.inventory_id,
+            day,
+            Transaction.type
+        )
+        if store_id is not None:
+            source = source.where(Transaction.store_id == store_id)
+        if closed_before is not None:
+            source = source.where(Transaction.timestamp >= closed_before)
+
+        result = db.execute(
+            insert(DailySales).from_select(
+                ["store_id", "inventory_id", "day", "type", "quantity", "revenue", "cost"],
+                source
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def get_sales_total(db: Session, store_id: int, start_day: date) -> Decimal:
+        """获取从 start_day（含）到今天的销售额"""
+        total = db.query(func.sum(DailySales.revenue)).filter(
+            DailySales.store_id == store_id,
+            DailySales.type == 'out',
+            DailySales.day >= start_day
+        ).scalar() or Decimal('0')
+        return Decimal(str(total)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    @staticmethod
+    def get_daily_sales(db: Session, store_id: int, days: int) -> List[dict]:
+        """获取近 days 天（含今天）每天的销售额、成本和毛利"""
+        end_day = date.today()
+        start_day = end_day - timedelta(days=days - 1)
+
+        rows = db.query(
+            DailySales.day,
+            func.sum(DailySales.quantity).label('quantity'),
+            func.sum(DailySales.revenue).label('revenue'),
+            func.sum(DailySales.cost).label('cost')
+        ).filter(
+            DailySales.store_id == store_id,
+            DailySales.type == 'out',
+            DailySales.day >= start_day
+        ).group_by(DailySales.day).all()
+        by_day = {row.day: row for row in rows}
+
+        result = []
+        current = start_day
+        while current <= end_day:
+            row = by_day.get(current)
+            sales = Decimal(str(row.revenue)) if row else Decimal('0')
+            cost = Decimal(str(row.cost)) if row else Decimal('0')
+            result.append({
+                "date": current,
+                "quantity": int(row.quantity) if row else 0,
+                "sales": sales.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                "cost": cost.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                "profit": (sales - cost).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            })
+            current += timedelta(days=1)
+
+        return result
@@ -0,0 +1,127 @@
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import asyncio
+import threading
+
+from app.db.session import SessionLocal
+from app.models.inventory import Inventory
+from app.services.data_version import DataVersionService, INVENTORY
+from app.utils.scanner import scanner
+
+# 每个订阅者最多缓存的未发送事件数，浏览器跟不上时丢弃最早的事件
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+class InventorySnapshotCache:
+    """按条形码缓存商品快照，店铺库存数据版本变化后失效"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[int, str], Tuple[int, Optional[dict]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(db: Session, store_id: int, barcode: str) -> Optional[dict]:
+        row = db.query(
+            Inventory.id,
+            Inventory.barcode,
+            Inventory.name,
+            Inventory.unit,
+            Inventory.stock,
+            Inventory.warning_stock,
+            Inventory.is_active,
+            Inventory.remark
+        ).filter(
+            Inventory.barcode == barcode,
+            Inventory.store_id == store_id
+        ).first()
+        return row._asdict() if row else None
+
+    def get(self, store_id: int, barcode: str) -> Optional[dict]:
+        """返回商品快照，商品不存在时返回 None"""
+        db = SessionLocal()
+        try:
+            version = DataVersionService.get_versions(db, store_id, [INVENTORY])[INVENTORY]
+            key = (store_id, barcode)
+            with self._lock:
+                cached = self._entries.get(key)
+            if cached and cached[0] == version:
+                return cached[1]
+
+            snapshot = self._load(db, store_id, barcode)
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[key] = (version, snapshot)
+            return snapshot
+        finally:
+            db.close()
+
+
+class ScanHub:
+    """把服务端扫码枪的扫码事件推送给订阅的收银页面
+
+    扫码枪分发线程通过 run_coroutine_threadsafe 把条码交给事件循环，
+    按订阅者所在店铺查询商品快照后放入各订阅者的有界队列。
+    """
+
+    def __init__(self, snapshots: InventorySnapshotCache):
+        self.snapshots = snapshots
+        self._subscribers: Dict[asyncio.Queue, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._publish_lock: Optional[asyncio.Lock] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """在事件循环中启用推送（应用启动时调用）"""
+        self._loop = loop
+        self._publish_lock = asyncio.Lock()
+        scanner.add_callback(self._on_scan)
+
+    def detach(self):
+        scanner.remove_callback(self._on_scan)
+        self._loop = None
+
+    def subscribe(self, store_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[queue] = store_id
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _on_scan(self, barcode: str):
+        """扫码枪分发线程中调用"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        asyncio.run_coroutine_threadsafe(self._publish(barcode, datetime.now()), loop)
+
+    async def _publish(self, barcode: str, scanned_at: datetime):
+        # 串行发布，保证事件顺序与扫码顺序一致
+        async with self._publish_lock:
+            for store_id in set(self._subscribers.values()):
+                snapshot = await run_in_threadpool(self.snapshots.get, store_id, barcode)
+                event = {
+                    "type": "scan",
+                    "barcode": barcode,
+                    "scanned_at": scanned_at,
+                    "found": snapshot is not None,
+                    "inventory": snapshot,
+                }
+                for queue, subscriber_store in list(self._subscribers.items()):
+                    if subscriber_store != store_id:
+                        continue
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(event)
+
+
+# 全局实例（每个工作进程一份；扫码枪只应在单个进程中启用）
+inventory_snapshots = InventorySnapshotCache()
+scan_hub = ScanHub(inventory_snapshots)
@@ -0,0 +1,165 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import Dict, Iterable, Optional, Tuple
+import asyncio
+import json
+import logging
+import select
+import threading
+
+import psycopg2
+import psycopg2.extensions
+
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL NOTIFY 频道
+STOCK_CHANNEL = "stock_deltas"
+
+# NOTIFY 负载上限约 8000 字节，每条通知最多携带的商品数
+NOTIFY_CHUNK_SIZE = 300
+
+# 每个订阅者最多缓存的未发送事件数
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class StockEventService:
+    """库存变动通知
+
+    在业务事务内执行 pg_notify，PostgreSQL 只在事务提交后投递，回滚的变动不会发出。
+    各工作进程的 StockEventHub 通过 LISTEN 接收后推送给本进程的 SSE 连接。
+    """
+
+    @staticmethod
+    def publish(db: Session, store_id: int, inventories: Iterable) -> None:
+        """发布商品的最新库存，inventories 为 Inventory 实例（同一商品只保留最后的值）"""
+        latest: Dict[int, int] = {}
+        for inventory in inventories:
+            latest[inventory.id] = inventory.stock
+        items = list(latest.items())
+        for i in range(0, len(items), NOTIFY_CHUNK_SIZE):
+            payload = json.dumps({"s": store_id, "d": items[i:i + NOTIFY_CHUNK_SIZE]}, separators=(",", ":"))
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": STOCK_CHANNEL, "payload": payload})
+
+
+class StockEventHub:
+    """进程内的库存变动分发
+
+    后台线程持有一条独立连接 LISTEN 通知，断线后自动重连；
+    收到的变动经 call_soon_threadsafe 交给事件循环，按店铺放入订阅者队列。
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[asyncio.Queue, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._thread is not None:
+            return
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_loop, name="stock-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._loop = None
+
+    def subscribe(self, store_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[queue] = store_id
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _dispatch(self, store_id: int, items: list):
+        """在事件循环中执行"""
+        event = {
+            "type": "stock",
+            "items": [{"inventory_id": inventory_id, "stock": stock} for inventory_id, stock in items]
+        }
+        for queue, subscriber_store in list(self._subscribers.items()):
+            if subscriber_store != store_id:
+                continue
+            if queue.full():
+                # 客户端跟不上时丢弃积压的增量，通知其重新拉取完整列表
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+            else:
+                queue.put_nowait(event)
+
+    def _resync_all(self):
+        """在事件循环中执行：监听断开期间的变动已丢失，通知所有订阅者重新拉取"""
+        for queue in list(self._subscribers):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "resync"})
+
+    def _connect(self):
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {STOCK_CHANNEL}")
+        return conn
+
+    def _listen_loop(self):
+        backoff = 0.5
+        conn = None
+        lost = False
+        while not self._stop.is_set():
+            try:
+                if conn is None:
+                    conn = self._connect()
+                    backoff = 0.5
+                    if lost:
+                        lost = False
+                        loop = self._loop
+                        if loop is not None:
+                            loop.call_soon_threadsafe(self._resync_all)
+                # 等待通知，超时后检查是否需要停止
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._deliver(notify.payload)
+            except Exception as e:
+                logger.warning(f"库存通知监听中断，{backoff}s 后重连: {str(e)}")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+                    lost = True
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+        if conn is not None:
+            conn.close()
+
+    def _deliver(self, payload: str):
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        loop.call_soon_threadsafe(self._dispatch, data["s"], data["d"])
+
+
+# 全局实例（每个工作进程一份）
+stock_event_hub = StockEventHub()
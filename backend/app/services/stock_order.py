@@ -1,12 +1,17 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from sqlalchemy import or_, update, delete
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 from fastapi import HTTPException
 from app.models.inventory import StockOrder, StockOrderItem, Transaction, Inventory
-from app.schemas.inventory import StockOrderCreate, StockOrderUpdate, UpdateStockOrderRequest
+from app.schemas.inventory import StockOrderCreate, StockOrderUpdate, UpdateStockOrderRequest, StockOrderItemCreate
 from app.core.utils import generate_order_no
 from app.models.company import Company
+from app.models.user import User
+from app.services.sales_rollup import SalesRollupService
+from app.services.hot_products import hot_products_leaderboard
+from app.services.data_version import DataVersionService, ORDERS, INVENTORY, LEDGER
+from app.services.stock_events import StockEventService
 
 class StockOrderService:
     @staticmethod
@@ -84,6 +89,91 @@ class StockOrderService:
             print(f"Error getting orders: {str(e)}")
             raise
 
+    @staticmethod
+    def get_order_rows(
+        db: Session,
+        store_id: int,
+        skip: Optional[int] = None,
+        limit: int = 20,
+        search: Optional[str] = None,
+        type: Optional[str] = None,
+        status: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ):
+        """获取出入库单列表（按列查询并直接映射为字典，供快速序列化）"""
+        query = db.query(
+            StockOrder.id,
+            StockOrder.order_no,
+            StockOrder.type,
+            StockOrder.company_id,
+            Company.name.label('company_name'),
+            StockOrder.operator_id,
+            User.name.label('operator_name'),
+            StockOrder.status,
+            StockOrder.notes,
+            StockOrder.total_amount,
+            StockOrder.created_at
+        ).outerjoin(
+            Company, StockOrder.company_id == Company.id
+        ).outerjoin(
+            User, StockOrder.operator_id == User.id
+        ).filter(StockOrder.store_id == store_id)
+        
+        if search and search.strip():
+            query = query.filter(
+                or_(
+                    StockOrder.order_no.ilike(f"%{search}%"),
+                    Company.name.ilike(f"%{search}%")
+                )
+            )
+        if type:
+            query = query.filter(StockOrder.type == type)
+        if status:
+            query = query.filter(StockOrder.status == status)
+        if start_date:
+            query = query.filter(StockOrder.created_at >= start_date)
+        if end_date:
+            query = query.filter(StockOrder.created_at <= end_date)
+        
+        total = query.count()
+        
+        query = query.order_by(StockOrder.created_at.desc())
+        if skip is not None:
+            query = query.offset(skip)
+        if limit:
+            query = query.limit(limit)
+        
+        orders = []
+        for row in query.all():
+            order = row._asdict()
+            order["total_amount"] = float(order["total_amount"])
+            order["items"] = []
+            orders.append(order)
+        
+        # 一次查询取回本页所有订单的明细
+        if orders:
+            by_id = {order["id"]: order for order in orders}
+            items = db.query(
+                StockOrderItem.id,
+                StockOrderItem.order_id,
+                StockOrderItem.inventory_id,
+                StockOrderItem.barcode,
+                StockOrderItem.quantity,
+                StockOrderItem.price,
+                StockOrderItem.total,
+                StockOrderItem.notes
+            ).filter(
+                StockOrderItem.order_id.in_(by_id.keys())
+            ).order_by(StockOrderItem.id).all()
+            for item in items:
+                by_id[item.order_id]["items"].append(item._asdict())
+        
+        return {
+            "items": orders,
+            "total": total
+        }
+
     @staticmethod
     def get_order(db: Session, order_id: int, store_id: int) -> Optional[StockOrder]:
         """获取出入库单详情"""
@@ -139,28 +229,11 @@ class StockOrderService:
         # 计算总金额
         total_amount = 0
         
+        # 一次性校验所有明细商品
+        StockOrderService._get_order_inventories(db, order.items, store_id, order.type)
+        
         # 添加订单明细
         for item in order.items:
-            # 验证商品是否存在且未被禁用
-            inventory = db.query(Inventory).filter(
-                Inventory.id == item.inventory_id,
-                Inventory.store_id == store_id
-            ).first()
-            
-            if not inventory:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"商品ID {item.inventory_id} 不存在"
-                )
-            
-            # 添加商品状态验证
-            if not inventory.is_active:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"商品 {inventory.name} 已被禁用，无法{order.type == 'in' and '入库' or '出库'}"
-                )
-            
-            # 创建订单明细
             order_item = StockOrderItem(
                 inventory_id=item.inventory_id,
                 barcode=item.barcode,
@@ -177,6 +250,7 @@ class StockOrderService:
         
         try:
             db.add(db_order)
+            DataVersionService.bump(db, store_id, ORDERS)
             db.commit()
             db.refresh(db_order)
             return db_order
@@ -184,6 +258,42 @@ class StockOrderService:
             db.rollback()
             raise HTTPException(status_code=400, detail=str(e))
 
+    @staticmethod
+    def _get_order_inventories(
+        db: Session,
+        items: List[StockOrderItemCreate],
+        store_id: int,
+        order_type: str
+    ) -> Dict[int, Inventory]:
+        """批量校验明细商品是否存在且未被禁用，返回 {商品ID: 商品}"""
+        inventory_ids = {item.inventory_id for item in items}
+        inventories = {}
+        if inventory_ids:
+            inventories = {
+                inventory.id: inventory
+                for inventory in db.query(Inventory).filter(
+                    Inventory.id.in_(inventory_ids),
+                    Inventory.store_id == store_id
+                ).all()
+            }
+        
+        # 按明细顺序报告第一个错误，与逐条校验时的提示保持一致
+        for item in items:
+            inventory = inventories.get(item.inventory_id)
+            if not inventory:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"商品ID {item.inventory_id} 不存在"
+                )
+            
+            if not inventory.is_active:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"商品 {inventory.name} 已被禁用，无法{order_type == 'in' and '入库' or '出库'}"
+                )
+        
+        return inventories
+
     @staticmethod
     def confirm_order(db: Session, order_id: int, store_id: int) -> StockOrder:
         """确认出入库单"""
@@ -198,6 +308,7 @@ class StockOrderService:
             )
             
         try:
+            transactions = []
             # 更新库存
             for item in order.items:
                 inventory = item.inventory
@@ -236,11 +347,25 @@ class StockOrderService:
                     notes=item.notes
                 )
                 db.add(transaction)
+                transactions.append(transaction)
+            
+            # 累加销售日汇总
+            SalesRollupService.record_transactions(db, store_id, transactions)
             
             # 更新订单状态
             order.status = "confirmed"
+            DataVersionService.bump(db, store_id, ORDERS, INVENTORY, LEDGER)
+            StockEventService.publish(db, store_id, [item.inventory for item in order.items])
             db.commit()
             db.refresh(order)
+            
+            # 更新热销排行
+            if order.type == "out":
+                for item in order.items:
+                    hot_products_leaderboard.record_sale(
+                        store_id, item.barcode, item.inventory.name,
+                        item.quantity, item.total
+                    )
             return order
             
         except HTTPException:
@@ -265,6 +390,7 @@ class StockOrderService:
             
         try:
             order.status = "cancelled"
+            DataVersionService.bump(db, store_id, ORDERS)
             db.commit()
             db.refresh(order)
             return order
@@ -290,24 +416,8 @@ class StockOrderService:
         if not order:
             raise ValueError("订单不存在")
         
-        # 添加商品状态验证
-        for item_data in data.items:
-            inventory = db.query(Inventory).filter(
-                Inventory.id == item_data.inventory_id,
-                Inventory.store_id == store_id
-            ).first()
-            
-            if not inventory:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"商品ID {item_data.inventory_id} 不存在"
-                )
-            
-            if not inventory.is_active:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"商品 {inventory.name} 已被禁用，无法{order.type == 'in' and '入库' or '出库'}"
-                )
+        # 一次性校验所有明细商品
+        StockOrderService._get_order_inventories(db, data.items, store_id, order.type)
         
         # 更新基本信息
         order.company_id = data.company_id
@@ -315,29 +425,68 @@ class StockOrderService:
         order.operator_id = operator_id
         order.updated_at = datetime.now()
         
-        # 删除原有的商品明细
-        db.query(StockOrderItem).filter(StockOrderItem.order_id == order_id).delete()
+        # 按商品对比原有明细，只增删改发生变化的行；只取列值，不把明细加载为 ORM 对象
+        existing_items = {}
+        for item in db.query(
+            StockOrderItem.id,
+            StockOrderItem.inventory_id,
+            StockOrderItem.barcode,
+            StockOrderItem.quantity,
+            StockOrderItem.price,
+            StockOrderItem.notes
+        ).filter(StockOrderItem.order_id == order_id).all():
+            existing_items.setdefault(item.inventory_id, []).append(item)
         
-        # 添加新的商品明细
         total_amount = 0
+        changed_items = []
         for item_data in data.items:
             item_total = item_data.quantity * item_data.price  # 计算单项总金额
-            item = StockOrderItem(
-                order_id=order_id,
-                inventory_id=item_data.inventory_id,
-                barcode=item_data.barcode,
-                quantity=item_data.quantity,
-                price=item_data.price,
-                total=item_total,  # 设置单项总金额
-                notes=item_data.notes
-            )
             total_amount += item_total
-            db.add(item)
+            
+            candidates = existing_items.get(item_data.inventory_id)
+            if candidates:
+                # 复用原有明细，仅在内容变化时更新
+                item = candidates.pop(0)
+                if (
+                    item.barcode != item_data.barcode
+                    or item.quantity != item_data.quantity
+                    or item.price != item_data.price
+                    or item.notes != item_data.notes
+                ):
+                    changed_items.append({
+                        "id": item.id,
+                        "barcode": item_data.barcode,
+                        "quantity": item_data.quantity,
+                        "price": item_data.price,
+                        "total": item_total,
+                        "notes": item_data.notes
+                    })
+            else:
+                db.add(StockOrderItem(
+                    order_id=order_id,
+                    inventory_id=item_data.inventory_id,
+                    barcode=item_data.barcode,
+                    quantity=item_data.quantity,
+                    price=item_data.price,
+                    total=item_total,  # 设置单项总金额
+                    notes=item_data.notes
+                ))
+        
+        # 变化的明细按主键批量更新，不再需要的明细一条语句删除
+        if changed_items:
+            db.execute(update(StockOrderItem), changed_items)
+        removed_ids = [item.id for items in existing_items.values() for item in items]
+        if removed_ids:
+            db.execute(
+                delete(StockOrderItem).where(StockOrderItem.id.in_(removed_ids)),
+                execution_options={"synchronize_session": False}
+            )
         
         # 更新总金额
         order.total_amount = total_amount
         
         try:
+            DataVersionService.bump(db, store_id, ORDERS)
             db.commit()
             db.refresh(order)
             return order
@@ -5,6 +5,7 @@ from datetime import datetime
 from typing import List, Optional
 from app.models.user import User, VALID_PERMISSIONS
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.data_version import DataVersionService, LEDGER, ORDERS, FINANCE
 
 # 将 pwd_context 移到类外面作为模块级变量
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -105,8 +106,10 @@ class UserService:
                 db_user.permissions = ','.join(permissions)
         
         # 更新其他字段
-        if user_update.name is not None:
+        if user_update.name is not None and user_update.name != db_user.name:
             db_user.name = user_update.name
+            # 流水、出入库单和其他收支的列表带有操作人姓名，改名后使这些缓存失效
+            DataVersionService.bump(db, store_id, LEDGER, ORDERS, FINANCE)
         if user_update.password is not None:
             db_user.hashed_password = pwd_context.hash(user_update.password)
         if user_update.is_active is not None:
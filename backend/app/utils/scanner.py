@@ -1,66 +1,203 @@
 import serial
+import logging
+import queue
 import threading
-from typing import Optional, Callable
+import time
+from collections import deque
+from typing import Optional, Callable, List
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+class ScannerStats:
+    """扫码计数器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent = deque()  # 最近 10 秒内的扫码时间
+        self.scans = 0          # 已入队的扫码数
+        self.debounced = 0      # 连扫去重丢弃的次数
+        self.dropped = 0        # 队列已满丢弃的次数
+        self.reconnects = 0     # 重连次数
+        self.errors = 0         # 读取错误次数
+
+    def record_scan(self):
+        now = time.monotonic()
+        with self._lock:
+            self.scans += 1
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > 10:
+                self._recent.popleft()
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 10:
+                self._recent.popleft()
+            return {
+                "scans": self.scans,
+                "scans_per_second": round(len(self._recent) / 10, 2),
+                "debounced": self.debounced,
+                "dropped": self.dropped,
+                "reconnects": self.reconnects,
+                "errors": self.errors,
+            }
+
+
 class BarcodeScanner:
+    """串口扫码枪读取器
+
+    读线程使用带超时的阻塞读取（无数据时不占 CPU），按回车/换行切分条码，
+    同一条码在 SCANNER_DEBOUNCE_MS 内重复出现视为连扫抖动并丢弃；
+    合格条码放入有界队列，由分发线程交给回调。串口断开后按指数退避自动重连。
+    """
+
     def __init__(self):
         self.port = settings.SCANNER_PORT
         self.baudrate = settings.SCANNER_BAUDRATE
         self.serial: Optional[serial.Serial] = None
         self.is_running = False
-        self.callback: Optional[Callable[[str], None]] = None
-        
+        self.callbacks: List[Callable[[str], None]] = []
+        self.queue: "queue.Queue[str]" = queue.Queue(maxsize=settings.SCANNER_QUEUE_SIZE)
+        self.stats = ScannerStats()
+        self._last_barcode: Optional[str] = None
+        self._last_scan_at = 0.0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.serial and self.serial.is_open)
+
     def connect(self) -> bool:
         """连接扫码枪"""
         try:
             self.serial = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
-                timeout=1
+                timeout=settings.SCANNER_READ_TIMEOUT
             )
             return True
         except Exception as e:
-            print(f"扫码枪连接失败: {str(e)}")
+            logger.warning(f"扫码枪连接失败: {str(e)}")
             return False
-    
+
     def disconnect(self):
         """断开扫码枪连接"""
         if self.serial and self.serial.is_open:
             self.serial.close()
-    
-    def start_reading(self, callback: Callable[[str], None]):
-        """开始读取扫码数据"""
-        if not self.serial or not self.serial.is_open:
-            if not self.connect():
-                return
-        
-        self.callback = callback
+
+    def add_callback(self, callback: Callable[[str], None]):
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[str], None]):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def start_reading(self, callback: Optional[Callable[[str], None]] = None):
+        """开始读取扫码数据（串口暂不可用时在后台自动重连）"""
+        if callback:
+            self.add_callback(callback)
+        if self.is_running:
+            return
+
         self.is_running = True
-        
-        # 在新线程中读取数据
-        thread = threading.Thread(target=self._read_loop)
-        thread.daemon = True
-        thread.start()
-    
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._read_loop, name="scanner-reader", daemon=True),
+            threading.Thread(target=self._dispatch_loop, name="scanner-dispatch", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
     def stop_reading(self):
         """停止读取扫码数据"""
         self.is_running = False
+        self._stop.set()
         self.disconnect()
-    
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=settings.SCANNER_READ_TIMEOUT * 2)
+        self._threads = []
+
+    def _accept(self, barcode: str):
+        """连扫去重后放入队列，队列满时丢弃最早的一条"""
+        now = time.monotonic()
+        if barcode == self._last_barcode and (now - self._last_scan_at) * 1000 < settings.SCANNER_DEBOUNCE_MS:
+            self._last_scan_at = now
+            self.stats.incr("debounced")
+            return
+        self._last_barcode = barcode
+        self._last_scan_at = now
+
+        try:
+            self.queue.put_nowait(barcode)
+        except queue.Full:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.stats.incr("dropped")
+            self.queue.put_nowait(barcode)
+        self.stats.record_scan()
+
     def _read_loop(self):
-        """读取循环"""
-        while self.is_running and self.serial and self.serial.is_open:
+        """读取循环：阻塞读取直到有数据或超时，断开后指数退避重连"""
+        backoff = 0.5
+        buffer = b""
+        # 曾经连上过，之后每次打开串口都计为一次重连（与重试了几次无关）
+        was_connected = self.connected
+        while not self._stop.is_set():
+            if not self.connected:
+                if not self.connect():
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, settings.SCANNER_RECONNECT_MAX)
+                    continue
+                if was_connected:
+                    self.stats.incr("reconnects")
+                    logger.info("扫码枪已重新连接")
+                was_connected = True
+                backoff = 0.5
+                buffer = b""
+
             try:
-                if self.serial.in_waiting:
-                    barcode = self.serial.readline().decode().strip()
-                    if barcode and self.callback:
-                        self.callback(barcode)
+                # 至少读 1 字节，无数据时阻塞到超时
+                data = self.serial.read(max(1, self.serial.in_waiting))
             except Exception as e:
-                print(f"读取扫码数据错误: {str(e)}")
-                break
-        
-        self.stop_reading()
+                if self._stop.is_set():
+                    break
+                self.stats.incr("errors")
+                logger.warning(f"读取扫码数据错误: {str(e)}")
+                self.disconnect()
+                continue
+
+            if not data:
+                continue
+            buffer += data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                barcode = line.decode(errors="ignore").strip()
+                if barcode:
+                    self._accept(barcode)
+
+    def _dispatch_loop(self):
+        """分发循环：把队列中的条码交给回调"""
+        while not self._stop.is_set():
+            try:
+                barcode = self.queue.get(timeout=settings.SCANNER_READ_TIMEOUT)
+            except queue.Empty:
+                continue
+            for callback in list(self.callbacks):
+                try:
+                    callback(barcode)
+                except Exception as e:
+                    logger.error(f"扫码回调处理失败: {str(e)}")
 
 # 创建全局扫码器实例
-scanner = BarcodeScanner() 
\ No newline at end of file
+scanner = BarcodeScanner()
@@ -12,4 +12,13 @@ errorlog = '/var/log/kucun/error.log'
 # 进程名称
 proc_name = 'kucun_api'
 # 工作模式
-worker_class = 'uvicorn.workers.UvicornWorker' 
\ No newline at end of file
+worker_class = 'uvicorn.workers.UvicornWorker' 
+# 工作进程不再各自建表，迁移在主进程 fork 之前执行一次
+raw_env = ['DB_AUTO_MIGRATE=false']
+
+def on_starting(server):
+    from app.db.migrate import migrate
+    from app.db.session import engine
+    migrate()
+    # 不把主进程的连接带进工作进程
+    engine.dispose()
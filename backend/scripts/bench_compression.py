@@ -0,0 +1,102 @@
+"""响应压缩基准测试
+
+对运行中的服务逐个请求列表接口，对比不压缩与各压缩编码下的传输字节数和耗时。
+
+用法:
+    python scripts/bench_compression.py --base-url http://127.0.0.1:8000 \
+        --username demo --password 123456 --rounds 20 [--json report.json]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+# 需要测量的列表接口
+ENDPOINTS = [
+    "/api/v1/inventory/?page=1&page_size=100",
+    "/api/v1/transactions?limit=100",
+    "/api/v1/stock-orders?page=1&limit=100",
+    "/api/v1/companies/balance?limit=100",
+    "/api/v1/companies/",
+]
+
+ENCODINGS = ["identity", "gzip", "br", "zstd"]
+
+
+def login(base_url: str, username: str, password: str) -> str:
+    """登录并返回访问令牌"""
+    data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    request = urllib.request.Request(f"{base_url}/api/v1/auth/login", data=data, method="POST")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["access_token"]
+
+
+def fetch(base_url: str, path: str, token: str, encoding: str) -> tuple:
+    """请求一次，返回 (实际编码, 传输字节数, 耗时毫秒)"""
+    request = urllib.request.Request(
+        f"{base_url}{path}",
+        headers={"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        # urllib 不会自动解压，读到的就是线上传输的字节
+        body = response.read()
+        used = response.headers.get("Content-Encoding", "identity")
+    elapsed = (time.perf_counter() - start) * 1000
+    return used, len(body), elapsed
+
+
+def run(base_url: str, token: str, rounds: int) -> list:
+    results = []
+    for path in ENDPOINTS:
+        baseline = None
+        for encoding in ENCODINGS:
+            samples = [fetch(base_url, path, token, encoding) for _ in range(rounds)]
+            used = samples[-1][0]
+            if encoding != "identity" and used != encoding:
+                # 服务端未安装该编码
+                continue
+            size = samples[-1][1]
+            latencies = sorted(s[2] for s in samples)
+            if baseline is None:
+                baseline = size
+            results.append({
+                "endpoint": path,
+                "encoding": used,
+                "bytes": size,
+                "ratio": round(size / baseline, 3) if baseline else None,
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应压缩基准测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="demo")
+    parser.add_argument("--password", default="123456")
+    parser.add_argument("--rounds", type=int, default=20, help="每个接口每种编码请求次数")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.username, args.password)
+    results = run(args.base_url, token, args.rounds)
+
+    print(f"{'endpoint':45} {'encoding':9} {'bytes':>10} {'ratio':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(f"{r['endpoint']:45} {r['encoding']:9} {r['bytes']:>10} {r['ratio']:>7} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -0,0 +1,321 @@
+"""热点接口基准测试
+
+先用固定种子和固定截止日期生成确定的数据集（已存在则直接复用），再逐个请求热点接口，
+统计延迟分位数和每次请求执行的 SQL 条数，输出 JSON 报告，便于不同提交之间对比。
+
+默认在进程内直接调用 ASGI 应用（不需要启动服务，可统计 SQL 条数）；
+指定 --base-url 时改为通过 HTTP 请求运行中的服务（不统计 SQL 条数）。
+
+用法:
+    python scripts/bench_endpoints.py --rounds 30 --json report.json
+    python scripts/bench_endpoints.py --json new.json --baseline report.json
+    python scripts/bench_endpoints.py --base-url http://127.0.0.1:8000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import platform
+import subprocess
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.db.session import engine, SessionLocal
+from app.db.migrate import migrate
+from app.models.user import User
+from app.models.inventory import Inventory
+from data_manager import generate_scale_data
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("bench_endpoints")
+logger.setLevel(logging.INFO)
+
+# 数据集参数固定，保证每次生成的数据一致
+DATASET = {
+    "scale": 1,
+    "seed": 20240630,
+    "end_date": "2024-06-30",
+    "days": 365,
+    "products": 500,
+    "companies": 40,
+    "orders_per_day": 80,
+}
+
+# 统计窗口：数据集最后 30 天
+WINDOW_DAYS = 30
+
+
+def build_endpoints(barcode: str) -> list:
+    end = datetime.strptime(DATASET["end_date"], "%Y-%m-%d")
+    start = end - timedelta(days=WINDOW_DAYS - 1)
+    start_date, end_date = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    return [
+        ("inventory", "/api/v1/inventory/?page=1&page_size=20"),
+        ("inventory-barcode", f"/api/v1/inventory/barcode/{barcode}"),
+        ("stats", "/api/v1/stats"),
+        ("statistics", "/api/v1/statistics"),
+        ("performance", f"/api/v1/performance/?start_date={start_date}&end_date={end_date}T23:59:59"),
+        ("analysis", f"/api/v1/analysis/{barcode}?start_date={start_date}&end_date={end_date}T23:59:59"),
+        ("transactions", "/api/v1/transactions?skip=0&limit=100"),
+        ("companies-balance", "/api/v1/companies/balance?skip=0&limit=10"),
+        ("finance-profit", f"/api/v1/finance/profit?start_date={start_date}&end_date={end_date}"),
+    ]
+
+
+def percentile(values: list, p: float) -> float:
+    """最近秩法分位数，values 需已排序"""
+    index = math.ceil(p / 100 * len(values)) - 1
+    return values[max(0, min(len(values) - 1, index))]
+
+
+class QueryCounter:
+    """通过引擎事件统计执行的 SQL 条数"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed_dataset(prefix: str) -> str:
+    """确保基准数据集存在，返回店主用户名"""
+    username = f"{prefix}00001"
+    migrate()
+    db = SessionLocal()
+    try:
+        exists = db.query(User).filter(User.username == username).first() is not None
+    finally:
+        db.close()
+
+    if exists:
+        logger.info(f"复用已有数据集 ({username})")
+    else:
+        logger.info("生成基准数据集...")
+        generate_scale_data(
+            DATASET["scale"],
+            seed=DATASET["seed"],
+            prefix=prefix,
+            end_date=datetime.strptime(DATASET["end_date"], "%Y-%m-%d"),
+            days=DATASET["days"],
+            products=DATASET["products"],
+            companies=DATASET["companies"],
+            orders_per_day=DATASET["orders_per_day"]
+        )
+    return username
+
+
+def pick_barcode(username: str) -> str:
+    """取店铺的第一个商品（生成器中销量最高的商品）"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        return db.query(Inventory.barcode).filter(
+            Inventory.store_id == user.store_id
+        ).order_by(Inventory.id).limit(1).scalar()
+    finally:
+        db.close()
+
+
+class AsgiClient:
+    """在进程内直接调用 ASGI 应用，不经过网络和 lifespan"""
+
+    def __init__(self, app, token: str):
+        self.app = app
+        self.headers = [(b"authorization", f"Bearer {token}".encode())]
+
+    async def get(self, path: str) -> tuple:
+        url = urllib.parse.urlsplit(path)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": url.path,
+            "raw_path": url.path.encode(),
+            "query_string": url.query.encode(),
+            "root_path": "",
+            "headers": self.headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        status = None
+        body = bytearray()
+        done = asyncio.Event()
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # 请求体已发送，之后只在响应结束时报告断开
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body.extend(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status, len(body)
+
+
+class HttpClient:
+    def __init__(self, base_url: str, token: str):
+        self.base_url = base_url
+        self.token = token
+
+    async def get(self, path: str) -> tuple:
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            headers={"Authorization": f"Bearer {self.token}", "Accept-Encoding": "identity"}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read())
+
+
+def login(base_url: str, username: str, password: str) -> str:
+    data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    request = urllib.request.Request(f"{base_url}/api/v1/auth/login", data=data, method="POST")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["access_token"]
+
+
+async def measure(client, endpoints: list, rounds: int, warmup: int, counter: QueryCounter = None) -> list:
+    results = []
+    for name, path in endpoints:
+        for _ in range(warmup):
+            await client.get(path)
+
+        latencies, queries = [], []
+        status, size = None, 0
+        for _ in range(rounds):
+            before = counter.count if counter else 0
+            start = time.perf_counter()
+            # 部分接口会 print 调试信息，不计入输出
+            with contextlib.redirect_stdout(io.StringIO()):
+                status, size = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if counter:
+                queries.append(counter.count - before)
+
+        latencies.sort()
+        results.append({
+            "name": name,
+            "path": path,
+            "status": status,
+            "bytes": size,
+            "rounds": rounds,
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p90_ms": round(percentile(latencies, 90), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "max_ms": round(latencies[-1], 3),
+            "queries": max(queries) if queries else None,
+        })
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def print_results(results: list, baseline: dict = None):
+    previous = {r["name"]: r for r in (baseline or {}).get("results", [])}
+    print(f"{'endpoint':18} {'status':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'queries':>8} {'bytes':>9}  vs baseline")
+    for r in results:
+        line = (f"{r['name']:18} {r['status']:>6} {r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} "
+                f"{r['p99_ms']:>9.2f} {str(r['queries']):>8} {r['bytes']:>9}")
+        old = previous.get(r["name"])
+        if old:
+            delta = (r["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0
+            line += f"  p50 {delta:+.1f}%"
+            if r["queries"] is not None and old.get("queries") is not None and r["queries"] != old["queries"]:
+                line += f", queries {old['queries']} -> {r['queries']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点接口基准测试")
+    parser.add_argument("--base-url", help="通过 HTTP 测试运行中的服务（默认在进程内调用）")
+    parser.add_argument("--prefix", default="bench", help="基准数据集店主用户名前缀 (默认: bench)")
+    parser.add_argument("--rounds", type=int, default=30, help="每个接口的测量次数")
+    parser.add_argument("--warmup", type=int, default=3, help="每个接口的预热次数")
+    parser.add_argument("--json", help="将报告写入 JSON 文件")
+    parser.add_argument("--baseline", help="与之前的 JSON 报告对比")
+    args = parser.parse_args()
+
+    username = seed_dataset(args.prefix)
+    endpoints = build_endpoints(pick_barcode(username))
+
+    if args.base_url:
+        client = HttpClient(args.base_url, login(args.base_url, username, "123456"))
+        counter = None
+    else:
+        from app.main import app
+        from app.core.auth import create_access_token
+        client = AsgiClient(app, create_access_token({"sub": username}))
+        counter = QueryCounter()
+
+    results = asyncio.run(measure(client, endpoints, args.rounds, args.warmup, counter))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "mode": "http" if args.base_url else "in-process",
+            "python": platform.python_version(),
+            "dataset": DATASET,
+            "rounds": args.rounds,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
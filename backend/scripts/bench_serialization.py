@@ -0,0 +1,155 @@
+"""列表接口序列化微基准
+
+对比两条序列化路径（不访问数据库，使用构造的行数据）:
+- 现有路径: ORM 对象 -> response_model 校验 (from_attributes) -> JSON 模式导出 -> json.dumps
+- 快速路径: 查询行 -> dict -> FastJSONResponse (orjson，未安装时为标准库 json)
+
+用法:
+    python scripts/bench_serialization.py [--rows 100 1000] [--repeat 50]
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.responses import FastJSONResponse, orjson
+from app.schemas.inventory import Inventory, TransactionResponse, StockOrderList
+
+
+class InventoryResponse(BaseModel):
+    """与 /inventory/ 接口的响应模型一致"""
+    items: List[Inventory]
+    total: int
+
+
+def make_inventory(n: int) -> list:
+    now = datetime.now()
+    return [
+        {
+            "id": i,
+            "barcode": f"69{i:011d}",
+            "name": f"测试商品{i}号 特级茉莉花茶",
+            "unit": "盒",
+            "stock": Decimal(i % 500),
+            "warning_stock": 10,
+            "is_active": True,
+            "remark": "演示数据",
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def make_transactions(n: int) -> list:
+    now = datetime.now()
+    return [
+        {
+            "id": i,
+            "barcode": f"69{i % 300:011d}",
+            "type": "out" if i % 3 else "in",
+            "name": f"测试商品{i % 300}号",
+            "quantity": i % 20 + 1,
+            "price": Decimal("35.50"),
+            "total": Decimal("35.50") * (i % 20 + 1),
+            "timestamp": now - timedelta(minutes=i),
+            "operator_id": 1,
+            "operator_name": "演示账号",
+            "company_id": i % 10 + 1,
+            "company_name": "新新超市",
+            "notes": None,
+        }
+        for i in range(n)
+    ]
+
+
+def make_orders(n: int) -> list:
+    now = datetime.now()
+    return [
+        {
+            "id": i,
+            "order_no": f"O20240101{i:04d}",
+            "type": "out",
+            "company_id": 1,
+            "company_name": "新新超市",
+            "operator_id": 1,
+            "operator_name": "演示账号",
+            "status": "confirmed",
+            "notes": "演示数据",
+            "total_amount": 1234.5,
+            "created_at": now - timedelta(hours=i),
+            "items": [
+                {
+                    "id": i * 3 + j,
+                    "order_id": i,
+                    "inventory_id": j + 1,
+                    "barcode": f"69{j:011d}",
+                    "quantity": 5,
+                    "price": Decimal("12.00"),
+                    "total": Decimal("60.00"),
+                    "notes": None,
+                }
+                for j in range(3)
+            ],
+        }
+        for i in range(n)
+    ]
+
+
+def to_objects(value):
+    """把 dict 转成属性访问的对象，模拟 ORM 实例"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: to_objects(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [to_objects(v) for v in value]
+    return value
+
+
+def model_path(adapter: TypeAdapter, payload) -> bytes:
+    validated = adapter.validate_python(payload, from_attributes=True)
+    data = adapter.dump_python(validated, mode="json")
+    # 与 starlette JSONResponse.render 相同的参数
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(payload) -> bytes:
+    return FastJSONResponse(payload).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表接口序列化微基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = [
+        ("inventory", InventoryResponse, make_inventory),
+        ("transactions", TransactionResponse, make_transactions),
+        ("stock-orders", StockOrderList, make_orders),
+    ]
+
+    print(f"JSON 引擎: {'orjson' if orjson else 'json'}")
+    print(f"{'endpoint':14} {'rows':>6} {'model ms':>10} {'fast ms':>9} {'speedup':>8}")
+    for name, model, factory in cases:
+        adapter = TypeAdapter(model)
+        for n in args.rows:
+            rows = factory(n)
+            objects = SimpleNamespace(items=to_objects(rows), total=n)
+            payload = {"items": rows, "total": n}
+
+            model_ms = timeit.timeit(lambda: model_path(adapter, objects), number=args.repeat) / args.repeat * 1000
+            fast_ms = timeit.timeit(lambda: fast_path(payload), number=args.repeat) / args.repeat * 1000
+            print(f"{name:14} {n:>6} {model_ms:>10.2f} {fast_ms:>9.2f} {model_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
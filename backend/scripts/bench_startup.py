@@ -0,0 +1,53 @@
+"""工作进程启动耗时测试
+
+每轮启动一个新的 Python 进程，导入 app.main 并执行 lifespan 启动阶段（与 uvicorn 工作进程相同），
+统计导入耗时和到达就绪的总耗时。默认按生产方式关闭自动建表（DB_AUTO_MIGRATE=false）。
+
+用法:
+    python scripts/bench_startup.py [--rounds 5] [--auto-migrate]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行：导入应用并跑完 lifespan 启动阶段
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"import_ms": (imported - started) * 1000, "ready_ms": (ready - started) * 1000}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工作进程启动耗时测试")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--auto-migrate", action="store_true", help="启动时执行建表（开发环境行为）")
+    args = parser.parse_args()
+
+    env = dict(os.environ, DB_AUTO_MIGRATE="true" if args.auto_migrate else "false")
+    samples = []
+    for _ in range(args.rounds):
+        output = subprocess.check_output([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+                                         stderr=subprocess.DEVNULL)
+        samples.append(json.loads(output.decode().strip().splitlines()[-1]))
+
+    for key in ("import_ms", "ready_ms"):
+        values = [s[key] for s in samples]
+        print(f"{key:10} median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""检查财务查询的索引使用
+
+在基准数据集上调用 FinanceService 的列表和统计方法（页码分页、游标分页、利润统计、按月利润表），
+记录它们执行的涉及 payments / other_transactions 的 SQL，用相同参数执行 EXPLAIN，
+列出扫描这两张表的节点和使用的索引。出现顺序扫描时返回非零退出码。
+
+数据量较小时规划器可能认为顺序扫描更便宜，可加 --no-seqscan 禁用顺序扫描，只检查索引是否可用。
+
+用法:
+    python scripts/check_finance_indexes.py
+    python scripts/check_finance_indexes.py --prefix bench --no-seqscan --json finance_plans.json
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+from app.db.session import engine, SessionLocal
+from app.models.user import User
+from app.models.company import Payment
+from app.models.finance import OtherTransaction
+from app.schemas.company import CompanyType
+from app.services.finance import FinanceService
+from bench_endpoints import DATASET, WINDOW_DAYS, seed_dataset
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("check_finance_indexes")
+logger.setLevel(logging.INFO)
+
+TABLES = ("payments", "other_transactions")
+TABLES_RE = re.compile(r"\b(payments|other_transactions)\b")
+
+
+class StatementRecorder:
+    """记录执行过的涉及财务表的 SQL（去重）"""
+
+    def __init__(self):
+        self.statements = {}
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and TABLES_RE.search(statement) and not statement.lstrip().upper().startswith("EXPLAIN"):
+            self.statements.setdefault(statement, parameters)
+
+    def take(self) -> dict:
+        statements, self.statements = self.statements, {}
+        return statements
+
+    def close(self):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def bitmap_indexes(plan: dict) -> list:
+    """Bitmap Heap Scan 下层 Bitmap Index Scan 使用的索引"""
+    if plan["Node Type"] == "Bitmap Index Scan":
+        return [plan["Index Name"]]
+    return [name for child in plan.get("Plans", []) for name in bitmap_indexes(child)]
+
+
+def table_scans(plan: dict) -> list:
+    """计划树中扫描财务表的节点: [(表, 节点类型, 索引)]"""
+    found = []
+    if plan.get("Relation Name") in TABLES:
+        index = plan.get("Index Name")
+        if plan["Node Type"] == "Bitmap Heap Scan":
+            index = "+".join(bitmap_indexes(plan)) or None
+        found.append((plan["Relation Name"], plan["Node Type"], index))
+    for child in plan.get("Plans", []):
+        found += table_scans(child)
+    return found
+
+
+def explain(statement: str, parameters, no_seqscan: bool) -> list:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if no_seqscan:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = cursor.fetchone()[0][0]["Plan"]
+        cursor.close()
+        return table_scans(plan)
+    finally:
+        raw.rollback()
+        raw.close()
+
+
+def build_checks(store_id: int, payment_cursor: int, other_cursor: int) -> list:
+    end = datetime.strptime(DATASET["end_date"], "%Y-%m-%d").date()
+    start = end - timedelta(days=WINDOW_DAYS - 1)
+    return [
+        ("transactions-page", lambda db: FinanceService.get_transactions(
+            db, store_id, start_date=start, end_date=end)),
+        ("transactions-cursor", lambda db: FinanceService.get_transactions(
+            db, store_id, start_date=start, end_date=end, before_id=other_cursor)),
+        ("payments-page", lambda db: FinanceService.get_payment_records(
+            db, store_id, start, end, type=CompanyType.CUSTOMER)),
+        ("payments-cursor", lambda db: FinanceService.get_payment_records(
+            db, store_id, start, end, type=CompanyType.CUSTOMER, before_id=payment_cursor)),
+        ("profit", lambda db: FinanceService.get_profit_statistics(db, store_id, start, end)),
+        ("profit-monthly", lambda db: FinanceService.get_monthly_profit_statement(db, store_id, end.year)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查财务查询的索引使用")
+    parser.add_argument("--prefix", default="bench", help="基准数据集店主用户名前缀 (默认: bench)")
+    parser.add_argument("--no-seqscan", action="store_true", help="禁用顺序扫描，只检查索引是否可用")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    username = seed_dataset(args.prefix)
+
+    # COPY 生成的数据可能还没有统计信息
+    with engine.begin() as conn:
+        for table in TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        # 游标取窗口内最新的一条，模拟翻到第二页
+        payment_cursor = db.query(Payment.id).filter(Payment.store_id == user.store_id)\
+            .order_by(Payment.created_at.desc(), Payment.id.desc()).limit(1).scalar()
+        other_cursor = db.query(OtherTransaction.id).filter(OtherTransaction.store_id == user.store_id)\
+            .order_by(OtherTransaction.transaction_date.desc(), OtherTransaction.id.desc()).limit(1).scalar()
+        checks = build_checks(user.store_id, payment_cursor, other_cursor)
+
+        recorder = StatementRecorder()
+        report, failures = [], 0
+        try:
+            for name, call in checks:
+                call(db)
+                db.rollback()
+                for statement, parameters in recorder.take().items():
+                    scans = explain(statement, parameters, args.no_seqscan)
+                    seq_scans = [table for table, node, _ in scans if node == "Seq Scan"]
+                    failures += bool(seq_scans)
+                    report.append({
+                        "check": name,
+                        "scans": [
+                            {"table": table, "node": node, "index": index}
+                            for table, node, index in scans
+                        ],
+                        "ok": not seq_scans,
+                        "sql": " ".join(statement.split())[:160],
+                    })
+        finally:
+            recorder.close()
+    finally:
+        db.close()
+
+    print(f"{'check':<22}{'status':<12}scans")
+    for row in report:
+        status = "ok" if row["ok"] else "SEQ SCAN"
+        scans = ", ".join(
+            f"{scan['table']}:{scan['index'] or scan['node']}" for scan in row["scans"]
+        )
+        print(f"{row['check']:<22}{status:<12}{scans}")
+        if not row["ok"]:
+            print(f"    {row['sql']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"no_seqscan": args.no_seqscan, "statements": report}, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
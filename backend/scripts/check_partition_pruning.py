@@ -0,0 +1,157 @@
+"""检查流水查询的分区裁剪
+
+在基准数据集上调用 InventoryService / CompanyService 中读取流水的方法，记录它们执行的
+涉及 transactions 的 SQL，用相同参数执行 EXPLAIN，统计计划中实际扫描的月分区数。
+带 timestamp 下界（>= 或 BETWEEN）的语句应只扫描窗口覆盖的月份，否则视为未裁剪并返回非零退出码。
+
+用法:
+    python scripts/check_partition_pruning.py
+    python scripts/check_partition_pruning.py --prefix bench --json pruning.json
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.db.session import engine, SessionLocal
+from app.db.partitions import PARENT_TABLE
+from app.models.user import User
+from app.models.company import Company
+from app.services.inventory import InventoryService
+from app.services.company import CompanyService
+from bench_endpoints import DATASET, WINDOW_DAYS, seed_dataset, pick_barcode
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("check_partition_pruning")
+logger.setLevel(logging.INFO)
+
+TRANSACTIONS_RE = re.compile(r"\btransactions\b")
+# 语句中对流水时间有下界时才可能裁剪
+LOWER_BOUND_RE = re.compile(r"transactions\.timestamp\s+(>=|>|BETWEEN)", re.IGNORECASE)
+
+
+class StatementRecorder:
+    """记录执行过的涉及流水表的 SQL（去重）"""
+
+    def __init__(self):
+        self.statements = {}
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and TRANSACTIONS_RE.search(statement):
+            self.statements.setdefault(statement, parameters)
+
+    def take(self) -> dict:
+        statements, self.statements = self.statements, {}
+        return statements
+
+    def close(self):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def scanned_partitions(plan: dict) -> set:
+    """计划树中出现的流水分区"""
+    found = set()
+    relation = plan.get("Relation Name", "")
+    if relation.startswith(f"{PARENT_TABLE}_"):
+        found.add(relation)
+    for child in plan.get("Plans", []):
+        found |= scanned_partitions(child)
+    return found
+
+
+def explain(statement: str, parameters) -> set:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = cursor.fetchone()[0][0]["Plan"]
+        cursor.close()
+        return scanned_partitions(plan)
+    finally:
+        raw.rollback()
+        raw.close()
+
+
+def months_between(start: datetime, end: datetime) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def build_checks(store_id: int, barcode: str, company_id: int) -> tuple:
+    end = datetime.strptime(DATASET["end_date"], "%Y-%m-%d") + timedelta(hours=23, minutes=59, seconds=59)
+    start = end.replace(hour=0, minute=0, second=0) - timedelta(days=WINDOW_DAYS - 1)
+    return [
+        ("inventory-stats", lambda db: InventoryService.get_inventory_stats(db, store_id)),
+        ("transactions-window", lambda db: InventoryService.get_transactions(
+            db, store_id, start_date=start, end_date=end)),
+        ("performance", lambda db: InventoryService.get_performance_stats(db, start, end, store_id)),
+        ("analysis", lambda db: InventoryService.get_product_analysis(db, barcode, start, end, store_id)),
+        ("company-balances", lambda db: CompanyService.get_company_balances(db, store_id)),
+        ("company-transactions", lambda db: CompanyService.get_company_transactions(db, company_id, store_id)),
+    ], months_between(start, end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查流水查询的分区裁剪")
+    parser.add_argument("--prefix", default="bench", help="基准数据集店主用户名前缀 (默认: bench)")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    username = seed_dataset(args.prefix)
+    barcode = pick_barcode(username)
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        company_id = db.query(Company.id).filter(Company.store_id == user.store_id).order_by(Company.id).limit(1).scalar()
+        total = len(explain(f"SELECT * FROM {PARENT_TABLE}", None))
+        checks, window_months = build_checks(user.store_id, barcode, company_id)
+
+        recorder = StatementRecorder()
+        report, failures = [], 0
+        try:
+            for name, call in checks:
+                call(db)
+                db.rollback()
+                for statement, parameters in recorder.take().items():
+                    partitions = explain(statement, parameters)
+                    bounded = bool(LOWER_BOUND_RE.search(statement))
+                    # 窗口可能跨月，另加默认分区
+                    pruned = not bounded or len(partitions) <= window_months + 1
+                    failures += not pruned
+                    report.append({
+                        "check": name,
+                        "time_bounded": bounded,
+                        "partitions": len(partitions),
+                        "pruned": pruned,
+                        "sql": " ".join(statement.split())[:160],
+                    })
+        finally:
+            recorder.close()
+    finally:
+        db.close()
+
+    print(f"流水分区总数: {total}，统计窗口 {WINDOW_DAYS} 天（{window_months} 个月）")
+    print(f"{'check':<22}{'bounded':>9}{'scanned':>9}  status")
+    for row in report:
+        status = "ok" if row["pruned"] else "NOT PRUNED"
+        print(f"{row['check']:<22}{str(row['time_bounded']):>9}{row['partitions']:>9}  {status}")
+        if not row["pruned"]:
+            print(f"    {row['sql']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"total_partitions": total, "window_months": window_months, "statements": report},
+                      f, ensure_ascii=False, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
-from app.db.session import engine, Base, SessionLocal
+from app.db.session import engine, SessionLocal
 from app.models.user import User
 from app.models.store import Store
-from app.models.inventory import Inventory, Transaction, OrderStatus, StockOrder, StockOrderItem
+from app.models.inventory import Inventory, Transaction, OrderStatus, StockOrder, StockOrderItem, DailySales, StockAlert
 from app.models.log import OperationLog
 from app.services.user import pwd_context
 import logging
@@ -18,6 +18,18 @@ from app.models.company import Company, CompanyType
 from app.core.utils import generate_order_no
 from app.models.finance import OtherTransaction, TransactionType
 from app.models.company import Payment
+from app.services.sales_rollup import SalesRollupService
+from app.services.data_version import DataVersionService, DATA_DOMAINS
+from app.db.partitions import ensure_partitions
+from app.db.migrate import migrate
+from app.services.archive import ArchiveService
+from fastapi import HTTPException
+from sqlalchemy import text
+from psycopg2.extras import execute_values
+from multiprocessing import Pool
+import csv
+import io
+import time
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -324,8 +336,11 @@ def clear_store_data(db: Session, store_id: int):
         StockOrder.store_id == store_id
     ).delete(synchronize_session=False)
     db.query(StockOrder).filter(StockOrder.store_id == store_id).delete()
+    db.query(DailySales).filter(DailySales.store_id == store_id).delete()
     db.query(Transaction).filter(Transaction.store_id == store_id).delete()
     db.query(OperationLog).filter(OperationLog.store_id == store_id).delete()
+    db.query(StockAlert).filter(StockAlert.store_id == store_id).delete()
+    ArchiveService.purge_store(db, store_id)
     db.query(Inventory).filter(Inventory.store_id == store_id).delete()
     db.query(User).filter(
         User.store_id == store_id,
@@ -635,6 +650,10 @@ def initialize_demo_data(db: Session = None):
         # 生成收付款记录
         generate_payments(db, store.id, user.id, start_date, end_date)
         
+        # 重建销售日汇总，并使店铺数据的缓存失效
+        SalesRollupService.rebuild(db, store.id)
+        DataVersionService.bump(db, store.id, *DATA_DOMAINS)
+        
         db.commit()
         logger.info("演示数据初始化成功！")
         
@@ -672,6 +691,10 @@ def reset_demo_data(days: int = 30):
             time_points
         )
         
+        # 重建销售日汇总，并使店铺数据的缓存失效
+        SalesRollupService.rebuild(db, demo_user.store_id)
+        DataVersionService.bump(db, demo_user.store_id, *DATA_DOMAINS)
+        
         db.commit()
         logger.info(f"演示数据重置完成 - {datetime.now()}")
         
@@ -682,6 +705,369 @@ def reset_demo_data(days: int = 30):
     finally:
         db.close()
 
+def rebuild_sales_rollup(store_id: int = None):
+    """根据交易流水重建销售日汇总"""
+    db = SessionLocal()
+    try:
+        count = SalesRollupService.rebuild(db, store_id)
+        db.commit()
+        logger.info(f"销售日汇总重建完成，共 {count} 行")
+    except Exception as e:
+        logger.error(f"重建销售日汇总失败: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def archive_ledger(closed_before: datetime):
+    """归档 closed_before 之前的账期"""
+    db = SessionLocal()
+    try:
+        result = ArchiveService.archive(db, closed_before.date())
+        logger.info(
+            f"归档完成: {result['stores']} 个店铺, 流水 {result['transactions']} 行, "
+            f"收付款 {result['payments']} 行, 操作日志 {result['operation_logs']} 行"
+        )
+    except HTTPException as e:
+        logger.error(f"归档失败: {e.detail}")
+        raise
+    finally:
+        db.close()
+
+# 规模数据生成：--scale N 生成 N 个店铺，每个店铺的规模由以下参数决定
+SCALE_DEFAULTS = {
+    "products": 200,        # 每店商品数
+    "companies": 20,        # 每店往来单位数（供应商、客户各半）
+    "days": 730,            # 生成多少天的流水
+    "orders_per_day": 60,   # 每店日均出库单数
+}
+
+# 每积累多少行执行一次 COPY
+COPY_BATCH_ROWS = 50000
+
+SCALE_PRODUCT_NAMES = ["茉莉花茶", "红茶", "铁观音", "大红袍", "普洱", "龙井", "碧螺春", "白茶", "黑茶", "乌龙茶"]
+
+SCALE_PERMISSIONS = (
+    "inventory,stock_in,stock_out,transactions,analysis,performance,"
+    "users,logs,dashboard"
+)
+
+def _money(cents: int) -> str:
+    """分 -> 两位小数金额字符串，保证 total = quantity * price 精确成立"""
+    return f"{cents // 100}.{cents % 100:02d}"
+
+class _IdAllocator:
+    """从表的自增序列批量预取主键，使 COPY 写入的行可以直接互相引用"""
+
+    def __init__(self, cursor, table: str, block: int = 10000):
+        self.cursor = cursor
+        self.table = table
+        self.block = block
+        self.ids = []
+
+    def next(self) -> int:
+        if not self.ids:
+            self.cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                (self.table, self.block)
+            )
+            self.ids = [row[0] for row in self.cursor.fetchall()]
+            self.ids.reverse()
+        return self.ids.pop()
+
+class _CopyWriter:
+    """按表缓存 CSV 行，累积到一定行数后按外键依赖顺序 COPY 写入
+
+    父记录（商品、单据）必须先于引用它的明细和流水加入。
+    """
+
+    TABLES = [
+        ("inventory", "id, barcode, name, unit, stock, warning_stock, is_active, store_id, created_at"),
+        ("stock_orders", "id, order_no, type, company_id, total_amount, operator_id, store_id, status, notes, created_at"),
+        ("stock_order_items", "id, order_id, inventory_id, barcode, quantity, price, total"),
+        ("transactions", "inventory_id, barcode, type, quantity, price, total, store_id, operator_id, company_id, timestamp, notes"),
+        ("payments", "company_id, amount, type, notes, operator_id, store_id, created_at"),
+        ("other_transactions", "store_id, type, amount, operator_id, transaction_date, notes, created_at, updated_at"),
+    ]
+
+    def __init__(self, cursor, batch_rows: int = COPY_BATCH_ROWS):
+        self.cursor = cursor
+        self.batch_rows = batch_rows
+        self.buffers = {table: io.StringIO() for table, _ in self.TABLES}
+        self.writers = {table: csv.writer(buffer) for table, buffer in self.buffers.items()}
+        self.counts = {table: 0 for table, _ in self.TABLES}
+        self.pending = 0
+
+    def add(self, table: str, row: tuple):
+        self.writers[table].writerow(row)
+        self.counts[table] += 1
+        self.pending += 1
+        if self.pending >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        for table, columns in self.TABLES:
+            buffer = self.buffers[table]
+            if buffer.tell() == 0:
+                continue
+            buffer.seek(0)
+            self.cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            buffer.seek(0)
+            buffer.truncate()
+        self.pending = 0
+
+def generate_scale_store(db: Session, store_no: int, params: dict) -> dict:
+    """生成一个店铺的全部数据，返回各表写入行数
+
+    随机数以 (seed, 店铺序号) 作为种子，同样的参数总是生成同样的数据，与并发进程数无关。
+    """
+    rng = random.Random(f"{params['seed']}:{store_no}")
+    days = params["days"]
+    start_date = params["end_date"] - timedelta(days=days - 1)
+
+    # 店铺、店主和往来单位数量很少，直接用 ORM 写入
+    store = Store(name=f"压测店铺{store_no:05d}", address=f"压测地址{store_no}号")
+    db.add(store)
+    db.flush()
+    owner = User(
+        username=f"{params['prefix']}{store_no:05d}",
+        name=f"压测店主{store_no:05d}",
+        hashed_password=params["password_hash"],
+        is_owner=True,
+        is_active=True,
+        store_id=store.id,
+        permissions=SCALE_PERMISSIONS
+    )
+    companies = [
+        Company(
+            name=f"{'供应商' if i % 2 == 0 else '客户'}{i // 2 + 1:03d}",
+            type=CompanyType.SUPPLIER if i % 2 == 0 else CompanyType.CUSTOMER,
+            contact="压测",
+            is_active=True,
+            store_id=store.id,
+            created_at=start_date
+        )
+        for i in range(max(2, params["companies"]))
+    ]
+    db.add(owner)
+    db.add_all(companies)
+    db.flush()
+    suppliers = [c.id for c in companies if c.type == CompanyType.SUPPLIER]
+    customers = [c.id for c in companies if c.type == CompanyType.CUSTOMER]
+    balances = {c.id: 0 for c in companies}  # 应收/应付余额（分）
+
+    cursor = db.connection().connection.cursor()
+    writer = _CopyWriter(cursor)
+    inventory_ids = _IdAllocator(cursor, "inventory", params["products"])
+    order_ids = _IdAllocator(cursor, "stock_orders")
+    item_ids = _IdAllocator(cursor, "stock_order_items")
+
+    products = []
+    for i in range(params["products"]):
+        cost = rng.randint(500, 30000)
+        product = {
+            "id": inventory_ids.next(),
+            "barcode": f"69{store_no % 1000:03d}{i:08d}",
+            "name": f"{SCALE_PRODUCT_NAMES[i % len(SCALE_PRODUCT_NAMES)]}{i + 1:05d}",
+            "cost": cost,
+            "price": cost * rng.randint(115, 160) // 100,
+            "warning_stock": rng.randint(10, 40),
+            "stock": 0,
+        }
+        products.append(product)
+        writer.add("inventory", (
+            product["id"], product["barcode"], product["name"], "盒", 0,
+            product["warning_stock"], True, store.id, start_date
+        ))
+
+    # 销量按排名长尾分布
+    cum_weights = []
+    total_weight = 0.0
+    for rank in range(len(products)):
+        total_weight += 1 / (rank + 1) ** 0.8
+        cum_weights.append(total_weight)
+
+    order_seq = 0
+
+    def add_order(order_type: str, company_id: int, timestamp: datetime, status: str, lines: list):
+        """lines: [(商品, 数量, 单价分)]，只有已确认的单据生成流水并改变库存"""
+        nonlocal order_seq
+        order_seq += 1
+        order_id = order_ids.next()
+        order_total = sum(quantity * price for _, quantity, price in lines)
+        writer.add("stock_orders", (
+            order_id, f"{'I' if order_type == 'in' else 'O'}{store_no:05d}{order_seq:09d}",
+            order_type, company_id, _money(order_total), owner.id, store.id,
+            status.value, "压测数据", timestamp
+        ))
+        for product, quantity, price in lines:
+            writer.add("stock_order_items", (
+                item_ids.next(), order_id, product["id"], product["barcode"],
+                quantity, _money(price), _money(quantity * price)
+            ))
+            if status == OrderStatus.CONFIRMED:
+                writer.add("transactions", (
+                    product["id"], product["barcode"], order_type, quantity,
+                    _money(price), _money(quantity * price), store.id, owner.id,
+                    company_id, timestamp, f"单据 {order_seq}"
+                ))
+                product["stock"] += quantity if order_type == "in" else -quantity
+        if status == OrderStatus.CONFIRMED:
+            balances[company_id] += order_total
+
+    for day_index in range(days):
+        day = start_date + timedelta(days=day_index)
+
+        # 开店前补货：库存低于警戒值两倍的商品，每 10 个商品一张入库单
+        restock = [p for p in products if p["stock"] < p["warning_stock"] * 2]
+        for i in range(0, len(restock), 10):
+            lines = [(p, rng.randint(50, 200), p["cost"]) for p in restock[i:i + 10]]
+            add_order("in", rng.choice(suppliers), day + timedelta(hours=8, minutes=rng.randint(0, 59)),
+                      OrderStatus.CONFIRMED, lines)
+
+        # 营业时间内的出库单
+        orders_per_day = params["orders_per_day"]
+        order_count = rng.randint(orders_per_day // 2, orders_per_day * 3 // 2)
+        for seconds in sorted(rng.randint(9 * 3600, 21 * 3600) for _ in range(order_count)):
+            picked = {p["id"]: p for p in rng.choices(products, cum_weights=cum_weights, k=rng.randint(1, 5))}
+            lines = []
+            for product in picked.values():
+                quantity = min(rng.randint(1, 10), product["stock"])
+                if quantity > 0:
+                    lines.append((product, quantity, product["price"] * rng.choice((100, 100, 100, 95, 90)) // 100))
+            if not lines:
+                continue
+            status = rng.choices(
+                [OrderStatus.CONFIRMED, OrderStatus.DRAFT, OrderStatus.CANCELLED],
+                weights=[0.9, 0.07, 0.03]
+            )[0]
+            add_order("out", rng.choice(customers), day + timedelta(seconds=seconds), status, lines)
+
+        # 收付款：每个往来单位每天 10% 概率结算部分余额
+        for company_id in suppliers + customers:
+            balance = balances[company_id]
+            if balance <= 0 or rng.random() >= 0.1:
+                continue
+            amount = min(balance * rng.randint(20, 60) // 100, 9999999999)
+            if amount <= 0:
+                continue
+            balances[company_id] -= amount
+            payment_type = "pay" if company_id in suppliers else "receive"
+            writer.add("payments", (
+                company_id, _money(amount), payment_type,
+                f"{'付款' if payment_type == 'pay' else '收款'}结算",
+                owner.id, store.id, day + timedelta(hours=20)
+            ))
+
+        # 其他收支：每月房租、工资，以及随机杂项
+        expenses = []
+        if day.day == 1:
+            expenses.append((TransactionType.EXPENSE, rng.randint(300000, 500000), "房租"))
+        if day.day == 5:
+            expenses.append((TransactionType.EXPENSE, rng.randint(400000, 600000), "工资"))
+        if rng.random() < 0.1:
+            if rng.random() < 0.6:
+                expenses.append((TransactionType.EXPENSE, rng.randint(20000, 100000), "杂项支出"))
+            else:
+                expenses.append((TransactionType.INCOME, rng.randint(10000, 300000), "其他收入"))
+        for transaction_type, amount, notes in expenses:
+            writer.add("other_transactions", (
+                store.id, transaction_type.name, _money(amount), owner.id,
+                day, notes, day, day
+            ))
+
+    writer.flush()
+
+    # 回写最终库存
+    execute_values(
+        cursor,
+        "UPDATE inventory SET stock = v.stock FROM (VALUES %s) AS v(id, stock) WHERE inventory.id = v.id",
+        [(p["id"], p["stock"]) for p in products],
+        page_size=1000
+    )
+    cursor.close()
+
+    SalesRollupService.rebuild(db, store.id)
+    DataVersionService.bump(db, store.id, *DATA_DOMAINS)
+    return writer.counts
+
+def _init_scale_worker():
+    """子进程不能复用父进程的数据库连接"""
+    engine.dispose(close=False)
+
+def _generate_scale_store_task(args: tuple) -> dict:
+    store_no, params = args
+    db = SessionLocal()
+    try:
+        counts = generate_scale_store(db, store_no, params)
+        db.commit()
+        logger.info(f"店铺 {store_no} 生成完成: {counts['transactions']} 条流水")
+        return counts
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def generate_scale_data(
+    scale: int,
+    seed: int = 42,
+    workers: int = 1,
+    prefix: str = "scale",
+    end_date: datetime = None,
+    **overrides
+):
+    """按规模因子生成压测数据：scale 个店铺，每店数据量见 SCALE_DEFAULTS"""
+    params = dict(SCALE_DEFAULTS)
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    end_date = end_date or datetime.now()
+    params.update(
+        seed=seed,
+        prefix=prefix,
+        end_date=datetime(end_date.year, end_date.month, end_date.day),
+        password_hash=pwd_context.hash("123456")
+    )
+
+    usernames = [f"{prefix}{store_no:05d}" for store_no in range(1, scale + 1)]
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.username.in_(usernames)).first():
+            raise ValueError(f"用户名前缀 '{prefix}' 已被使用，请通过 --prefix 指定新的前缀")
+    finally:
+        db.close()
+
+    # 先建好整个时间范围的月分区，避免流水全部落入默认分区
+    with engine.connect() as conn:
+        ensure_partitions(conn, start=(params["end_date"] - timedelta(days=params["days"])).date())
+        conn.commit()
+
+    started = time.perf_counter()
+    tasks = [(store_no, params) for store_no in range(1, scale + 1)]
+    if workers > 1:
+        with Pool(workers, initializer=_init_scale_worker) as pool:
+            results = pool.map(_generate_scale_store_task, tasks, chunksize=1)
+    else:
+        results = [_generate_scale_store_task(task) for task in tasks]
+
+    totals = {}
+    for counts in results:
+        for table, count in counts.items():
+            totals[table] = totals.get(table, 0) + count
+
+    # 更新统计信息，便于后续的执行计划分析
+    with engine.connect() as conn:
+        for table, _ in _CopyWriter.TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+        conn.execute(text("ANALYZE daily_sales"))
+        conn.commit()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    logger.info(f"规模数据生成完成: {scale} 个店铺, 用时 {elapsed:.1f} 秒, {rows / elapsed:.0f} 行/秒")
+    for table, count in totals.items():
+        logger.info(f"  {table}: {count}")
+    return totals
+
 # 店主账号创建函数
 def create_owner(db: Session, store_name: str, store_address: str,
                 username: str, password: str, owner_name: str = None):
@@ -747,6 +1133,37 @@ def parse_args():
     demo_reset.add_argument('--days', type=int, default=30,
                            help='生成多少天的数据 (默认: 30)')
     
+    # 销售日汇总命令
+    rollup_parser = subparsers.add_parser('rollup', help='重建销售日汇总')
+    rollup_parser.add_argument('--store-id', type=int, default=None,
+                               help='只重建指定店铺 (默认: 全部店铺)')
+    
+    # 账期归档命令
+    archive_parser = subparsers.add_parser('archive', help='归档已关账期间的流水、收付款和操作日志')
+    archive_parser.add_argument('--before', type=lambda v: datetime.strptime(v, '%Y-%m-%d'), required=True,
+                                help='归档该日期之前的数据，必须是某月 1 日 YYYY-MM-01')
+    
+    # 规模数据生成命令
+    generate_parser = subparsers.add_parser('generate', help='按规模因子生成压测数据')
+    generate_parser.add_argument('--scale', type=int, required=True,
+                                 help='规模因子，即生成的店铺数')
+    generate_parser.add_argument('--seed', type=int, default=42,
+                                 help='随机种子，相同参数生成相同数据 (默认: 42)')
+    generate_parser.add_argument('--days', type=int, default=None,
+                                 help=f"每店生成多少天的流水 (默认: {SCALE_DEFAULTS['days']})")
+    generate_parser.add_argument('--products', type=int, default=None,
+                                 help=f"每店商品数 (默认: {SCALE_DEFAULTS['products']})")
+    generate_parser.add_argument('--companies', type=int, default=None,
+                                 help=f"每店往来单位数 (默认: {SCALE_DEFAULTS['companies']})")
+    generate_parser.add_argument('--orders-per-day', type=int, default=None,
+                                 help=f"每店日均出库单数 (默认: {SCALE_DEFAULTS['orders_per_day']})")
+    generate_parser.add_argument('--workers', type=int, default=1,
+                                 help='并行生成的进程数 (默认: 1)')
+    generate_parser.add_argument('--prefix', default='scale',
+                                 help='店主用户名前缀 (默认: scale)')
+    generate_parser.add_argument('--end-date', type=lambda v: datetime.strptime(v, '%Y-%m-%d'), default=None,
+                                 help='最后一天的日期 YYYY-MM-DD (默认: 今天)')
+    
     return parser.parse_args()
 
 def show_menu():
@@ -758,9 +1175,10 @@ def show_menu():
 1. 创建店铺和店主账号
 2. 初始化演示数据
 3. 重置演示数据
-4. 退出
+4. 重建销售日汇总
+5. 退出
 
-请选择操作 (1-4): """, end='')
+请选择操作 (1-5): """, end='')
 
 def get_days_input():
     """获取天数输入"""
@@ -778,8 +1196,8 @@ def get_days_input():
             print("请输入有效的数字")
 
 def main():
-    # 确保数据库表已创建
-    Base.metadata.create_all(bind=engine)
+    # 确保数据库表和分区已创建
+    migrate()
     
     while True:
         try:
@@ -800,6 +1218,10 @@ def main():
                 reset_demo_data(days)
                 
             elif choice == '4':
+                logger.info("开始重建销售日汇总...")
+                rebuild_sales_rollup()
+                
+            elif choice == '5':
                 print("感谢使用，再见！")
                 break
                 
@@ -812,9 +1234,41 @@ def main():
             logger.error(f"操作失败: {str(e)}")
             input("\n按回车键继续...")
 
+def run_command(args):
+    """执行命令行子命令"""
+    migrate()
+    
+    if args.command == 'create-owner':
+        create_owner_interactive()
+    elif args.command == 'demo' and args.demo_command == 'init':
+        initialize_demo_data()
+    elif args.command == 'demo' and args.demo_command == 'reset':
+        reset_demo_data(args.days)
+    elif args.command == 'rollup':
+        rebuild_sales_rollup(args.store_id)
+    elif args.command == 'archive':
+        archive_ledger(args.before)
+    elif args.command == 'generate':
+        generate_scale_data(
+            args.scale,
+            seed=args.seed,
+            workers=args.workers,
+            prefix=args.prefix,
+            end_date=args.end_date,
+            days=args.days,
+            products=args.products,
+            companies=args.companies,
+            orders_per_day=args.orders_per_day
+        )
+    else:
+        print("未知命令，使用 -h 查看帮助")
+
 if __name__ == "__main__":
     try:
-        main()
+        if len(sys.argv) > 1:
+            run_command(parse_args())
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n程序已终止")
     except Exception as e:
@@ -0,0 +1,345 @@
+"""出入库并发压力测试
+
+启动 N 个模拟收银台（线程），对运行中的服务集中操作少量热点商品：
+出库、入库、创建并确认出入库单、取消待处理单据和撤销流水。
+结束后输出吞吐量、各操作 p50/p99 延迟、死锁/锁失败重试次数，
+并直接查询数据库校验账实一致：inventory.stock == 期初快照结存 + Σ入库 − Σ出库（已归档的账期取快照）。
+
+用法:
+    python scripts/stress_stock.py --base-url http://127.0.0.1:8000 \
+        --username demo --password 123456 --tills 16 --duration 60 --skus 5 [--json report.json]
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from sqlalchemy import text
+
+# 操作及权重
+OPERATIONS = {
+    "sell": 50,            # 直接出库
+    "receive": 20,         # 直接入库
+    "order_confirm": 20,   # 创建出入库单并确认
+    "cancel": 10,          # 取消待处理单据或撤销一条流水
+}
+
+# 可重试的错误：行锁获取失败、死锁、序列化失败
+RETRYABLE_MARKERS = ("deadlock", "锁定失败", "could not serialize", "lock timeout")
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, detail: str):
+        super().__init__(f"{status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+    @property
+    def retryable(self) -> bool:
+        detail = self.detail.lower()
+        return self.status >= 500 or any(marker in detail for marker in RETRYABLE_MARKERS)
+
+    @property
+    def deadlock(self) -> bool:
+        return "deadlock" in self.detail.lower()
+
+
+class Api:
+    def __init__(self, base_url: str, token: str = None, timeout: float = 30):
+        self.base_url = base_url
+        self.token = token
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body=None, form: dict = None):
+        headers = {"Accept-Encoding": "identity"}
+        data = None
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        elif body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(f"{self.base_url}{path}", data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                raw = response.read()
+        except urllib.error.HTTPError as e:
+            raw = e.read()
+            try:
+                detail = json.loads(raw).get("detail", "")
+            except ValueError:
+                detail = raw.decode(errors="replace")
+            raise ApiError(e.code, str(detail))
+        return json.loads(raw) if raw else None
+
+
+def prepare(api: Api, skus: int, initial_stock: int) -> dict:
+    """确保热点商品和往来单位存在，并为热点商品补足初始库存"""
+    companies = api.request("GET", "/api/v1/companies/")["items"]
+    ids = {}
+    for company_type, name in (("SUPPLIER", "压测供应商"), ("CUSTOMER", "压测客户")):
+        existing = [c for c in companies if c["type"] == company_type]
+        if existing:
+            ids[company_type] = existing[0]["id"]
+        else:
+            ids[company_type] = api.request("POST", "/api/v1/companies/", {"name": name, "type": company_type})["id"]
+
+    products = []
+    for i in range(skus):
+        barcode = f"9900000{i + 1:06d}"
+        try:
+            product = api.request("GET", f"/api/v1/inventory/barcode/{barcode}")
+        except ApiError as e:
+            if e.status != 404:
+                raise
+            product = api.request("POST", "/api/v1/inventory/", {
+                "barcode": barcode, "name": f"压测热点商品{i + 1:02d}", "unit": "件", "warning_stock": 0
+            })
+        if product["stock"] < initial_stock:
+            api.request("POST", "/api/v1/inventory/stock-in", {
+                "barcode": barcode, "quantity": initial_stock - product["stock"],
+                "price": "10.00", "company_id": ids["SUPPLIER"], "notes": "压测初始库存"
+            })
+        products.append({"id": product["id"], "barcode": barcode})
+
+    return {"supplier_id": ids["SUPPLIER"], "customer_id": ids["CUSTOMER"], "products": products}
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)   # 操作 -> 成功请求的耗时（毫秒）
+        self.outcomes = defaultdict(int)     # "操作:结果" -> 次数
+        self.retries = 0
+        self.deadlocks = 0
+
+    def record(self, operation: str, outcome: str, elapsed_ms: float = None):
+        with self.lock:
+            self.outcomes[f"{operation}:{outcome}"] += 1
+            if elapsed_ms is not None:
+                self.latencies[operation].append(elapsed_ms)
+
+    def record_retry(self, error: ApiError):
+        with self.lock:
+            self.retries += 1
+            if error.deadlock:
+                self.deadlocks += 1
+
+
+class Till(threading.Thread):
+    """一个收银台：按权重随机执行操作，直到截止时间"""
+
+    def __init__(self, index: int, api: Api, setup: dict, stats: Stats, deadline: float, seed: int, max_retries: int):
+        super().__init__(name=f"till-{index}", daemon=True)
+        self.api = api
+        self.setup = setup
+        self.stats = stats
+        self.deadline = deadline
+        self.rng = random.Random(f"{seed}:{index}")
+        self.max_retries = max_retries
+
+    def run(self):
+        operations, weights = zip(*OPERATIONS.items())
+        while time.monotonic() < self.deadline:
+            operation = self.rng.choices(operations, weights=weights)[0]
+            start = time.perf_counter()
+            try:
+                outcome = self._with_retry(getattr(self, f"_op_{operation}"))
+                self.stats.record(operation, outcome, (time.perf_counter() - start) * 1000)
+            except ApiError as e:
+                # 业务拒绝（如库存不足）属于预期结果
+                self.stats.record(operation, "rejected" if e.status < 500 else "error")
+            except Exception:
+                self.stats.record(operation, "error")
+
+    def _with_retry(self, func) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func()
+            except ApiError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                self.stats.record_retry(e)
+                time.sleep(min(0.5, 0.01 * 2 ** attempt) * self.rng.random())
+
+    def _product(self) -> dict:
+        return self.rng.choice(self.setup["products"])
+
+    def _op_sell(self) -> str:
+        self.api.request("POST", "/api/v1/inventory/stock-out", {
+            "barcode": self._product()["barcode"], "quantity": self.rng.randint(1, 3),
+            "price": "15.00", "company_id": self.setup["customer_id"]
+        })
+        return "ok"
+
+    def _op_receive(self) -> str:
+        self.api.request("POST", "/api/v1/inventory/stock-in", {
+            "barcode": self._product()["barcode"], "quantity": self.rng.randint(5, 20),
+            "price": "10.00", "company_id": self.setup["supplier_id"]
+        })
+        return "ok"
+
+    def _create_order(self, order_type: str) -> int:
+        products = self.rng.sample(self.setup["products"], min(len(self.setup["products"]), self.rng.randint(1, 3)))
+        order = self.api.request("POST", "/api/v1/stock-orders", {
+            "type": order_type,
+            "company_id": self.setup["supplier_id" if order_type == "in" else "customer_id"],
+            "notes": "压测",
+            "items": [
+                {
+                    "inventory_id": p["id"], "barcode": p["barcode"],
+                    "quantity": self.rng.randint(1, 5) if order_type == "out" else self.rng.randint(5, 20),
+                    "price": "15.00" if order_type == "out" else "10.00"
+                }
+                for p in products
+            ]
+        })
+        return order["id"]
+
+    def _op_order_confirm(self) -> str:
+        order_id = self._create_order("out" if self.rng.random() < 0.6 else "in")
+        self.api.request("POST", f"/api/v1/stock-orders/{order_id}/confirm")
+        return "ok"
+
+    def _op_cancel(self) -> str:
+        if self.rng.random() < 0.5:
+            order_id = self._create_order("out")
+            self.api.request("POST", f"/api/v1/stock-orders/{order_id}/cancel")
+            return "ok"
+        # 撤销热点商品最近的一条流水，多个收银台可能同时撤销同一条
+        barcode = self._product()["barcode"]
+        items = self.api.request("GET", f"/api/v1/transactions?barcode={barcode}&skip=0&limit=5")["items"]
+        if not items:
+            return "empty"
+        self.api.request("DELETE", f"/api/v1/transactions/{self.rng.choice(items)['id']}")
+        return "ok"
+
+
+def check_invariant(store_id: int, barcodes: list) -> list:
+    """校验账实一致，返回不一致的商品"""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(text("""
+            SELECT i.barcode, i.stock,
+                   COALESCE(MAX(s.in_quantity - s.out_quantity), 0)
+                   + COALESCE(SUM(CASE WHEN t.type = 'in' THEN t.quantity ELSE -t.quantity END), 0) AS ledger
+            FROM inventory i
+            LEFT JOIN inventory_snapshots s ON s.inventory_id = i.id
+            LEFT JOIN transactions t ON t.inventory_id = i.id
+            WHERE i.store_id = :store_id AND i.barcode = ANY(:barcodes)
+            GROUP BY i.id, i.barcode, i.stock
+            ORDER BY i.barcode
+        """), {"store_id": store_id, "barcodes": barcodes}).all()
+    finally:
+        db.close()
+    return [
+        {"barcode": row.barcode, "stock": row.stock, "ledger": int(row.ledger)}
+        for row in rows if row.stock != row.ledger
+    ]
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    index = math.ceil(p / 100 * len(values)) - 1
+    return values[max(0, min(len(values) - 1, index))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="出入库并发压力测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="demo")
+    parser.add_argument("--password", default="123456")
+    parser.add_argument("--tills", type=int, default=16, help="并发收银台数")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--skus", type=int, default=5, help="热点商品数")
+    parser.add_argument("--initial-stock", type=int, default=500, help="热点商品的初始库存")
+    parser.add_argument("--max-retries", type=int, default=3, help="锁失败/死锁时的最大重试次数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-check", action="store_true", help="不连接数据库做账实校验")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    api = Api(args.base_url)
+    api.token = api.request("POST", "/api/v1/auth/login",
+                            form={"username": args.username, "password": args.password})["access_token"]
+    me = api.request("GET", "/api/v1/auth/users/me")
+    setup = prepare(api, args.skus, args.initial_stock)
+
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    tills = [
+        Till(i, Api(args.base_url, api.token), setup, stats, deadline, args.seed, args.max_retries)
+        for i in range(args.tills)
+    ]
+    started = time.perf_counter()
+    for till in tills:
+        till.start()
+    for till in tills:
+        till.join()
+    elapsed = time.perf_counter() - started
+
+    completed = sum(len(v) for v in stats.latencies.values())
+    all_latencies = [ms for values in stats.latencies.values() for ms in values]
+    report = {
+        "tills": args.tills,
+        "skus": args.skus,
+        "duration_s": round(elapsed, 2),
+        "completed": completed,
+        "throughput_ops": round(completed / elapsed, 1),
+        "p50_ms": round(percentile(all_latencies, 50), 2) if all_latencies else None,
+        "p99_ms": round(percentile(all_latencies, 99), 2) if all_latencies else None,
+        "retries": stats.retries,
+        "deadlocks": stats.deadlocks,
+        "operations": {
+            operation: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+            }
+            for operation, values in sorted(stats.latencies.items())
+        },
+        "outcomes": dict(sorted(stats.outcomes.items())),
+    }
+
+    if not args.skip_check:
+        mismatches = check_invariant(me["store_id"], [p["barcode"] for p in setup["products"]])
+        report["invariant_ok"] = not mismatches
+        report["mismatches"] = mismatches
+
+    print(f"收银台: {args.tills}  热点商品: {args.skus}  时长: {report['duration_s']}s")
+    print(f"完成操作: {completed}  吞吐量: {report['throughput_ops']} ops/s  "
+          f"p50: {report['p50_ms']} ms  p99: {report['p99_ms']} ms")
+    print(f"重试: {stats.retries}  其中死锁: {stats.deadlocks}")
+    for operation, item in report["operations"].items():
+        print(f"  {operation:14} {item['count']:>7}  p50 {item['p50_ms']:>8} ms  p99 {item['p99_ms']:>8} ms")
+    for outcome, count in report["outcomes"].items():
+        print(f"  {outcome:24} {count:>7}")
+    if "invariant_ok" in report:
+        print("账实校验: " + ("通过" if report["invariant_ok"] else f"失败 {report['mismatches']}"))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if report.get("invariant_ok") is False:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
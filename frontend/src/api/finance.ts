@@ -1,5 +1,5 @@
 import api from './config';
-import type { OtherTransaction, CreateOtherTransactionRequest, TransactionQueryParams, ProfitStatistics, PaymentRecord } from '@/types/finance';
+import type { OtherTransaction, CreateOtherTransactionRequest, TransactionQueryParams, ProfitStatistics, MonthlyProfitStatement, PaymentRecord } from '@/types/finance';
 import type { PaginatedResponse } from '@/api/inventory';
 import { CompanyType } from '@/types/company';
 
@@ -31,6 +31,11 @@ export const getProfitStatistics = (params: { start_date: string; end_date: stri
     return api.get<ProfitStatistics>('/api/v1/finance/profit', { params });
 };
 
+// 获取全年按月利润表
+export const getMonthlyProfitStatement = (year: number) => {
+    return api.get<MonthlyProfitStatement>('/api/v1/finance/profit/monthly', { params: { year } });
+};
+
 // 获取其他收支明细
 export const getOtherTransactions = (params: TransactionQueryParams) => {
     return api.get<{ items: OtherTransaction[]; total: number }>('/api/v1/finance/transactions', { params });
@@ -43,6 +48,7 @@ export const getPaymentRecords = (params: {
     company_type: CompanyType;
     page?: number;
     page_size?: number;
+    before_id?: number;
 }) => {
-    return api.get<{ items: PaymentRecord[]; total: number }>('/api/v1/finance/payment-records', { params });
+    return api.get<{ items: PaymentRecord[]; total: number | null; next_before_id: number | null }>('/api/v1/finance/payment-records', { params });
 }; 
\ No newline at end of file
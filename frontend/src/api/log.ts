@@ -11,10 +11,17 @@ export interface OperationLog {
     created_at: string;
 }
 
+export interface OperationLogPage {
+    items: OperationLog[];
+    next_before_id: number | null;  // 下一页的游标，没有更多时为空
+}
+
 export const getOperationLogs = (params?: {
     start_date?: string;
     end_date?: string;
     operation_type?: string;
+    before_id?: number;
+    limit?: number;
 }) => {
-    return api.get<OperationLog[]>('/api/v1/logs', { params });
+    return api.get<OperationLogPage>('/api/v1/logs', { params });
 }; 
\ No newline at end of file
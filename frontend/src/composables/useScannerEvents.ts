@@ -0,0 +1,80 @@
+import { onMounted, onUnmounted } from 'vue';
+import { BASE_URL } from '../api/config';
+import { getInventoryByBarcode, type Inventory } from '../api/inventory';
+import { useUserStore } from '../stores/user';
+
+interface ScanEvent {
+    type: 'scan';
+    barcode: string;
+    scanned_at: string;
+    found: boolean;
+    inventory: Inventory | null;
+}
+
+/**
+ * 订阅服务端扫码枪的扫码事件（WebSocket /api/v1/ws/scanner）
+ *
+ * 事件自带商品快照，直接交给 onProduct，不再按条形码查询；
+ * 快照缺失时才回退到 GET /inventory/barcode/{barcode}。商品不存在时调用 onNotFound。
+ * 组件挂载时连接、卸载时断开，断线后按退避间隔自动重连。
+ */
+export function useScannerEvents(
+    onProduct: (inventory: Inventory) => void,
+    onNotFound: (barcode: string) => void
+) {
+    let socket: WebSocket | null = null;
+    let reconnectTimer: number | null = null;
+    let backoff = 1000;
+    let closed = false;
+
+    const handleScan = async (event: ScanEvent) => {
+        if (event.inventory) {
+            onProduct(event.inventory);
+            return;
+        }
+        if (!event.found) {
+            onNotFound(event.barcode);
+            return;
+        }
+        try {
+            onProduct(await getInventoryByBarcode(event.barcode));
+        } catch (error) {
+            onNotFound(event.barcode);
+        }
+    };
+
+    const connect = () => {
+        const userStore = useUserStore();
+        if (closed || !userStore.token) return;
+
+        // 浏览器无法为 WebSocket 设置请求头，令牌通过查询参数传递
+        const url = `${BASE_URL.replace(/^http/, 'ws')}/api/v1/ws/scanner?token=${encodeURIComponent(userStore.token)}`;
+        socket = new WebSocket(url);
+        socket.onopen = () => {
+            backoff = 1000;
+        };
+        socket.onmessage = (message) => {
+            const event = JSON.parse(message.data);
+            if (event.type === 'scan') {
+                handleScan(event);
+            }
+        };
+        socket.onclose = (event) => {
+            socket = null;
+            // 1008: 令牌无效；4000: 服务端扫码枪未启用；均不再重连
+            if (closed || event.code === 1008 || event.code === 4000) return;
+            reconnectTimer = window.setTimeout(connect, backoff);
+            backoff = Math.min(backoff * 2, 30000);
+        };
+    };
+
+    onMounted(connect);
+    onUnmounted(() => {
+        closed = true;
+        if (reconnectTimer) {
+            clearTimeout(reconnectTimer);
+        }
+        socket?.close();
+        socket = null;
+    });
+}
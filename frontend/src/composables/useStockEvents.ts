@@ -0,0 +1,56 @@
+import { onMounted, onUnmounted } from 'vue';
+import { BASE_URL } from '../api/config';
+import { useUserStore } from '../stores/user';
+
+export interface StockDelta {
+    inventory_id: number;
+    stock: number;
+}
+
+interface StockEventHandlers {
+    // 收到库存变动，按 inventory_id 就地更新
+    onStock: (items: StockDelta[]) => void;
+    // 可能漏掉了变动（断线重连、服务端积压），需要重新拉取完整数据
+    onResync: () => void;
+}
+
+/**
+ * 订阅本店的库存变动（SSE /api/v1/events/stock）
+ *
+ * 组件挂载时连接、卸载时断开。EventSource 断线后会自动重连，
+ * 重连成功后调用 onResync 补齐断线期间的变动。
+ */
+export function useStockEvents(handlers: StockEventHandlers) {
+    let source: EventSource | null = null;
+    let disconnected = false;
+
+    const connect = () => {
+        const userStore = useUserStore();
+        if (!userStore.token || typeof EventSource === 'undefined') return;
+
+        // EventSource 无法设置请求头，令牌通过查询参数传递
+        source = new EventSource(
+            `${BASE_URL}/api/v1/events/stock?token=${encodeURIComponent(userStore.token)}`
+        );
+        source.addEventListener('stock', (event) => {
+            const data = JSON.parse((event as MessageEvent).data);
+            handlers.onStock(data.items);
+        });
+        source.addEventListener('resync', () => handlers.onResync());
+        source.onopen = () => {
+            if (disconnected) {
+                disconnected = false;
+                handlers.onResync();
+            }
+        };
+        source.onerror = () => {
+            disconnected = true;
+        };
+    };
+
+    onMounted(connect);
+    onUnmounted(() => {
+        source?.close();
+        source = null;
+    });
+}
@@ -28,6 +28,7 @@ export interface TransactionQueryParams {
     type?: TransactionType;
     start_date?: string;
     end_date?: string;
+    before_id?: number;  // 上一页最后一条记录的 id，传入时按游标分页
 }
 
 export interface ProfitStatistics {
@@ -40,6 +41,16 @@ export interface ProfitStatistics {
     profit: number;
 }
 
+export interface MonthlyProfit extends ProfitStatistics {
+    month: number;
+}
+
+export interface MonthlyProfitStatement {
+    year: number;
+    months: MonthlyProfit[];
+    total: ProfitStatistics;
+}
+
 
 export interface PaymentRecord {
     payment_date: string;